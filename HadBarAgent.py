@@ -1,9 +1,214 @@
 from AIPlayerUtils import *
+from collections import OrderedDict
 from Constants import *
 from GameState import GameState
 from Inventory import Inventory
 from Player import Player
-from typing import Dict, List
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+import bisect
+import heapq
+import math
+import os
+import random
+import struct
+import threading
+import time
+import weakref
+
+# The tools (benchmarks, self-play, the opening book builder, game records and tuning)
+# are in the tools package, and the modules only they need are imported where they're used,
+# so importing the agent stays cheap.
+
+# All the distance costs for the drone and worker.
+DIST_REWARDS: Dict[int, float] = {
+    0: 0.70,
+    1: 0.55,
+    2: 0.40,
+    3: 0.30,
+    4: 0.20,
+    5: 0.00,
+    6: -0.15,
+    7: -0.30,
+    8: -0.40,
+    9: -0.45
+}
+
+# The worker doesn't get rewarded or punished by default.
+DEFAULT_WORKER_REWARD = 0.00
+
+# Punish the drone by default (otherwise use DIST_REWARDS).
+DEFAULT_DRONE_REWARD = -0.60
+
+# Punish the agent for something besides a worker blocking my anthill.
+ANTHILL_BLOCKER_PENALTY = 1.00
+
+# Punish the agent if the enemy has one worker.
+ONE_ENEMY_WORKER_PENALTY = 0.85
+
+# The largest approxDist between two coords on the board.
+MAX_DIST = 2 * (BOARD_LENGTH - 1)
+
+# The movement points it takes to step onto grass (same as getMoveCost)
+# for the ants that don't ignore grass.
+GRASS_MOVE_COST = 2
+
+# The rows of my side and of the enemy's side during setup (getPlacement always places
+# as if it were player one).
+MY_SETUP_ROWS = range(0, 4)
+ENEMY_SETUP_ROWS = range(6, 10)
+
+# The default opening book (see OpeningBook and tools.book.build_opening_book).
+# It's rebuilt with "python -m tools --build-book" (against the --opponent)
+# whenever the search or evaluation changes. Without the file, the book is empty.
+OPENING_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 "HadBarAgent_book.bin")
+
+# The search engines getMove can use (see SearchConfig).
+SEARCH_MODES = ("beam", "alphabeta", "expectimax", "mcts")
+
+# How an alpha-beta score in the subtree table relates to the true score.
+EXACT_SCORE, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# The number of killer moves remembered for each ply.
+NUM_KILLER_MOVES = 2
+
+# The root is only searched in parallel when about this many nodes are expected below it
+# (see AIPlayer._parallel_root_work). tools.benchmarks.benchmark_parallel_search puts
+# the break-even for two workers at about 600-800 at depth 2 and 1300 at depth 3
+# (handing out the subtrees costs 4-5 ms), so a depth 2 search is split from the midgame on
+# and openings stay serial.
+PARALLEL_MIN_ROOT_WORK = 1500
+
+# The different attack ranges of the ants.
+ATTACK_RANGES: List[int] = sorted({UNIT_STATS[ant_type][RANGE]
+                                   for ant_type in (QUEEN, WORKER, DRONE, SOLDIER, R_SOLDIER)})
+
+# All the coords on the board.
+BOARD_COORDS: List[tuple] = [(x, y) for x in range(BOARD_LENGTH) for y in range(BOARD_LENGTH)]
+
+
+
+class GeometryTable(dict):
+    """
+    GeometryTable
+
+    A table of precomputed board geometry that builds itself (see build_geometry_tables)
+    the first time it's looked up, so importing the agent doesn't pay for it.
+    Once it's built, lookups are plain dict lookups.
+    """
+
+    def __missing__(self, key):
+        if self:
+            raise KeyError(key)
+        build_geometry_tables()
+        return dict.__getitem__(self, key)
+
+
+# Precomputed geometry of the board (built by build_geometry_tables on first use):
+# DIST_TABLE[a][b] == approxDist(a, b) and
+# ATTACKABLE_TABLE[(coords, range)] == listAttackable(coords, range) for every ant range.
+# The attackable lists are shared, so they must not be modified.
+DIST_TABLE: Dict[tuple, Dict[tuple, int]] = GeometryTable()
+ATTACKABLE_TABLE: Dict[Tuple[tuple, int], List[tuple]] = GeometryTable()
+
+
+class SearchConfig:
+    """
+    SearchConfig
+
+    The options of the search engine of an AIPlayer (everything getMove needs to know
+    about how to search), kept together so they can be handed to the worker processes
+    and the tools as a single object.
+    """
+
+    def __init__(self, search_mode: str = "beam", depth_limit: int = 2, num_best_nodes: int = 5,
+                 time_budget: Optional[float] = None, max_depth: int = 8, num_workers: int = 0,
+                 node_budget: Optional[int] = None, expectimax_samples: int = 4,
+                 random_seed: int = 0, mcts_playouts: int = 256, mcts_batch_size: int = 8,
+                 mcts_exploration: float = 1.0, rollout_depth: int = 8,
+                 route_distances: bool = False, evaluation_table_size: int = 50000,
+                 subtree_table_size: int = 20000, search_tree_size: int = 50000,
+                 node_pool_size: int = 10000, debug_incremental_evaluation: bool = False):
+        """
+        __init__
+
+        Creates a new SearchConfig.
+
+        :param search_mode: "beam" keeps the num_best_nodes statically best children and
+                            averages their scores (see AIPlayer.find_best_move).
+                            "alphabeta" and "expectimax" play out whole turns, with the
+                            opponent minimizing or picking moves at random
+                            (see AIPlayer.search_game_tree).
+                            "mcts" is a Monte Carlo tree search with short greedy playouts
+                            (see AIPlayer.monte_carlo_search).
+        :param depth_limit: The depth of the search tree when no time budget is given.
+        :param num_best_nodes: The number of nodes kept at each level of the search tree.
+        :param time_budget: Seconds per getMove call. If given, the search deepens one ply
+                            at a time until the budget runs out, instead of using depth_limit.
+        :param max_depth: The deepest depth limit tried when searching with a time budget.
+        :param num_workers: If more than 0, the subtrees of the root are searched in parallel
+                            by a pool of this many worker processes (kept alive between turns),
+                            when the search is big enough to pay for it
+                            (see PARALLEL_MIN_ROOT_WORK), with or without a time budget.
+        :param node_budget: The max number of nodes per getMove call for the "alphabeta",
+                            "expectimax" and "mcts" searches (they search until a budget
+                            runs out).
+        :param expectimax_samples: The number of opponent moves sampled at each chance node.
+        :param random_seed: The seed of the expectimax sampling.
+        :param mcts_playouts: The number of playouts per getMove call of the "mcts" search
+                              when it has no time or node budget.
+        :param mcts_batch_size: The number of playouts per round, whose scores are only added
+                                to the tree once the round is over
+                                (see AIPlayer._playout_batch).
+        :param mcts_exploration: The exploration constant of the UCT selection.
+        :param rollout_depth: The max number of moves in a playout before it's scored.
+        :param route_distances: If True, evaluate_game_state measures the distance of
+                                the workers and drones by the movement cost of their shortest
+                                route around the grass (see RoutePlanner) instead of approxDist,
+                                and the search only follows the routes of the workers
+                                on their way somewhere (see AIPlayer._routed_legal_moves).
+        :param evaluation_table_size: Max number of cached evaluate_game_state scores.
+        :param subtree_table_size: Max number of cached subtree (backed-up) scores.
+        :param search_tree_size: Max number of child nodes kept between getMove calls,
+                                 so positions expanded last turn aren't expanded again
+                                 (see SearchTree). 0 turns this off.
+        :param node_pool_size: Max number of spare Nodes kept for reuse (see NodePool).
+        :param debug_incremental_evaluation: If True, every incrementally updated score
+                                             is checked against evaluate_game_state.
+        """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError("Unknown search mode %r (expected one of %s)"
+                             % (search_mode, ", ".join(SEARCH_MODES)))
+        self.search_mode = search_mode
+        self.depth_limit = depth_limit
+        self.num_best_nodes = num_best_nodes
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.num_workers = num_workers
+        self.node_budget = node_budget
+        self.expectimax_samples = expectimax_samples
+        self.random_seed = random_seed
+        self.mcts_playouts = mcts_playouts
+        self.mcts_batch_size = mcts_batch_size
+        self.mcts_exploration = mcts_exploration
+        self.rollout_depth = rollout_depth
+        self.route_distances = route_distances
+        self.evaluation_table_size = evaluation_table_size
+        self.subtree_table_size = subtree_table_size
+        self.search_tree_size = search_tree_size
+        self.node_pool_size = node_pool_size
+        self.debug_incremental_evaluation = debug_incremental_evaluation
+
+    def replace(self, **changes) -> "SearchConfig":
+        """
+        replace
+
+        :param changes: The options to change.
+        :return: A copy of the SearchConfig with the options changed.
+        """
+        options = dict(vars(self))
+        options.update(changes)
+        return SearchConfig(**options)
 
 
 class AIPlayer(Player):
@@ -15,15 +220,100 @@ class AIPlayer(Player):
     Version: September 24, 2018
     """
 
-    def __init__(self, input_player_id: int):
+    def __init__(self, input_player_id: int, config: Optional["SearchConfig"] = None,
+                 opening_book_path: Optional[str] = OPENING_BOOK_PATH, eval_weights=None,
+                 placement_time_budget: float = 0.05, ponder: bool = False,
+                 ponder_positions: int = 8, profile: bool = False,
+                 stats_callback: Optional[Callable[[dict], None]] = None,
+                 stats_log_path: Optional[str] = None, record_path: Optional[str] = None):
         """
         __init__
 
         The constructor for AIPlayer (creates a new player).
 
         :param input_player_id: The player's ID as an integer.
+        :param config: The options of the search (see SearchConfig). None uses the defaults.
+        :param opening_book_path: The opening book getMove checks before searching
+                                  (None for no book). A missing file is an empty book.
+        :param eval_weights: The weights of evaluate_game_state, as EvalWeights or the path
+                             of a weights file (see tools.texel.fit_eval_weights).
+                             None uses DIST_REWARDS and the other constants.
+        :param placement_time_budget: Seconds getPlacement may spend scoring anthill and
+                                      tunnel layouts (the best one found so far is used).
+        :param ponder: If True, the player keeps searching in a worker process after
+                       getMove returns, from the position its move leads to
+                       (see _start_pondering). The next getMove call uses the result
+                       if the game reached one of the pondered positions.
+                       Off by default: it needs a spare CPU (it's skipped without one),
+                       and each getMove call pays for stopping the worker and sending it
+                       the position.
+        :param ponder_positions: Max number of positions searched while pondering.
+        :param profile: If True, every getMove call records its search statistics
+                        (see SearchProfile and _profiled_get_move).
+        :param stats_callback: Called with the statistics of every profiled getMove call.
+        :param stats_log_path: If given, the statistics of every profiled getMove call
+                               are appended to this file as a line of JSON.
+        :param record_path: If given, every position getMove is called with (along with
+                            the move, the search time and nodes) and the outcome of every
+                            game are appended to this game record file
+                            (see tools.records.GameRecordWriter).
         """
         super(AIPlayer, self).__init__(input_player_id, "HadBarAgent")
+        if config is None:
+            config = SearchConfig()
+        self.config = config
+        self._deadline: Optional[float] = None
+        self._process_pool: Optional["ProcessPoolExecutor"] = None
+        # The number of child nodes created by the search (see tools.benchmarks).
+        self.nodes_searched = 0
+        self._node_limit: Optional[int] = None
+        self._root_player: Optional[int] = None
+        self._search_geometry: Optional["StaticGeometry"] = None
+        self._rng = random.Random(config.random_seed)
+        # Move ordering of the alpha-beta search: the moves that caused cutoffs.
+        self._killer_moves: Dict[int, List[tuple]] = {}
+        self._history_scores: Dict[tuple, int] = {}
+
+        if eval_weights is None:
+            eval_weights = EvalWeights()
+        elif isinstance(eval_weights, str):
+            eval_weights = EvalWeights.load(eval_weights)
+        self.eval_weights = eval_weights
+        # The distance rewards as lists indexed by distance, with the defaults filled in.
+        self._worker_rewards = eval_weights.worker_rewards(config.route_distances)
+        self._drone_rewards = eval_weights.drone_rewards()
+        self._hasher = ZobristHasher()
+        # The AntIndex of each state indexed during this getMove call, by its id
+        # (with a weak reference to the state, see _ant_index).
+        self._ant_indexes: Dict[int, Tuple[weakref.ref, AntIndex]] = {}
+        self.evaluation_table = TranspositionTable(config.evaluation_table_size)
+        self.subtree_table = TranspositionTable(config.subtree_table_size)
+        self.search_tree = SearchTree(config.search_tree_size)
+        self.profile = profile
+        self.stats_callback = stats_callback
+        self.stats_log_path = stats_log_path
+        self.last_search_stats: Optional[dict] = None
+        self._profile: Optional[SearchProfile] = None
+        self._profiled_turns = 0
+        self.placement_time_budget = placement_time_budget
+        self._node_pool = NodePool(config.node_pool_size)
+        self.opening_book = OpeningBook(opening_book_path) if opening_book_path else None
+
+        self.ponder = ponder
+        self.ponder_positions = ponder_positions
+        # The number of getMove calls answered by pondering.
+        self.ponder_hits = 0
+        self._ponder_pool: Optional["ProcessPoolExecutor"] = None
+        self._ponder_future = None
+        self._ponder_stop = None
+        self._ponder_results: Dict[int, tuple] = {}
+        # Set by another process to stop the search of this player (see stop_pondering).
+        self._stop_event = None
+        self.game_record = None
+        if record_path:
+            # Imported here, since only the tools read the records back.
+            from tools.records import GameRecordWriter
+            self.game_record = GameRecordWriter(record_path)
 
     def getPlacement(self, current_state):
         """
@@ -35,373 +325,3638 @@ class AIPlayer(Player):
         :return: The coordinates of where the construction items should be placed.
         """
 
-        # implemented by students to return their next move
+        taken = {constr.coords for inventory in current_state.inventories
+                 for constr in inventory.constrs}
         if current_state.phase == SETUP_PHASE_1:    # stuff on my side
-            num_to_place = 11
-            moves = []
-            for i in range(0, num_to_place):
-                move = None
-                while move is None:
-                    # Choose any x location
-                    x = random.randint(0, 9)
-                    # Choose any y location on your side of the board
-                    y = random.randint(0, 3)
-                    # Set the move if this space is empty
-                    if current_state.board[x][y].constr is None and (x, y) not in moves:
-                        move = (x, y)
-                moves.append(move)
-            return moves
+            anthill_coords, tunnel_coords = self._place_anthill_and_tunnel(taken)
+            return [anthill_coords, tunnel_coords] + \
+                self._place_grass(taken | {anthill_coords, tunnel_coords}, anthill_coords)
         elif current_state.phase == SETUP_PHASE_2:   # stuff on foe's side
-            num_to_place = 2
-            moves = []
-            for i in range(0, num_to_place):
-                move = None
-                while move is None:
-                    # Choose any x location
-                    x = random.randint(0, 9)
-                    # Choose any y location on enemy side of the board
-                    y = random.randint(6, 9)
-                    # Set the move if this space is empty
-                    if current_state.board[x][y].constr is None and (x, y) not in moves:
-                        move = (x, y)
-                moves.append(move)
-            return moves
+            return self._place_enemy_food(current_state, taken)
         else:
             return [(0, 0)]
 
-    def getMove(self, current_state) -> Move:
+    def _place_anthill_and_tunnel(self, taken: set) -> Tuple[tuple, tuple]:
+        """
+        _place_anthill_and_tunnel
+
+        The enemy will put my food wherever it's the furthest from my anthill and tunnel,
+        so they're placed to minimize the worst-case distance from a cell on my side to
+        the closest of the two. On a tie, the anthill is kept further from the front.
+        Layouts are scored until the placement time budget runs out.
+
+        :param taken: The coords that already have a construction.
+        :return: The coords of my anthill and my tunnel.
+        """
+        deadline = time.perf_counter() + self.placement_time_budget
+        my_side = [coords for coords in BOARD_COORDS if coords[1] in MY_SETUP_ROWS]
+        free_cells = [coords for coords in my_side if coords not in taken]
+        # The distance from each free cell to every cell of my side.
+        side_dists = {coords: [DIST_TABLE[coords][cell] for cell in my_side]
+                      for coords in free_cells}
+
+        best_layout = None
+        best_score = None
+        for anthill_coords in free_cells:
+            anthill_dists = side_dists[anthill_coords]
+            for tunnel_coords in free_cells:
+                if tunnel_coords == anthill_coords:
+                    continue
+                worst_dist = max(map(min, anthill_dists, side_dists[tunnel_coords]))
+                score = (worst_dist, anthill_coords[1])
+                if best_score is None or score < best_score:
+                    best_layout = (anthill_coords, tunnel_coords)
+                    best_score = score
+            if time.perf_counter() > deadline:
+                break
+        return best_layout
+
+    def _place_grass(self, taken: set, anthill_coords: tuple) -> List[tuple]:
+        """
+        _place_grass
+
+        The grass goes on the front row of my side (then the row behind it) to slow down
+        the enemy, starting with the cells closest to my anthill.
+
+        :param taken: The coords that already have a construction.
+        :param anthill_coords: The coords of my anthill.
+        :return: The coords of the 9 grass.
+        """
+        free_cells = [coords for coords in BOARD_COORDS
+                      if coords[1] in MY_SETUP_ROWS and coords not in taken]
+        free_cells.sort(key=lambda coords: (-coords[1], DIST_TABLE[coords][anthill_coords]))
+        return free_cells[:9]
+
+    def _place_enemy_food(self, current_state, taken: set) -> List[tuple]:
+        """
+        _place_enemy_food
+
+        The enemy's food goes on the free cells of its side that are the furthest from its
+        anthill and tunnel, so its workers have the longest trips.
+
+        :param current_state: The state of the game.
+        :param taken: The coords that already have a construction.
+        :return: The coords of the 2 food.
+        """
+        enemy_buildings = [constr.coords for constr in
+                           getConstrList(current_state, None, (ANTHILL, TUNNEL))
+                           if constr.coords[1] in ENEMY_SETUP_ROWS]
+        free_cells = [coords for coords in BOARD_COORDS
+                      if coords[1] in ENEMY_SETUP_ROWS and coords not in taken]
+        if enemy_buildings:
+            free_cells.sort(key=lambda coords: -min(DIST_TABLE[coords][building]
+                                                    for building in enemy_buildings))
+        return free_cells[:2]
+
+    def getMove(self, current_state, time_budget: Optional[float] = None) -> Move:
         """
         getMove
 
         Gets the next move from the player. The search tree is used to make this decision.
 
         :param current_state: The state of the current game (GameState).
+        :param time_budget: Seconds to search for (defaults to the constructor's time_budget).
+                            Without a budget, the search uses the fixed depth_limit.
+        :return: The move to be made.
+        """
+        if time_budget is None:
+            time_budget = self.config.time_budget
+        self.stop_pondering()
+        # The game may have changed the states since the last call.
+        self._ant_indexes.clear()
+        start_time = time.perf_counter()
+        nodes_searched = self.nodes_searched
+        if self.profile:
+            move = self._profiled_get_move(current_state, time_budget)
+        else:
+            move = self._get_move(current_state, time_budget)
+        if self.game_record is not None:
+            self.game_record.write_move(self.playerId, current_state, move,
+                                        (time.perf_counter() - start_time) * 1e3,
+                                        self.nodes_searched - nodes_searched)
+        if self.ponder:
+            self._start_pondering(current_state, move, time_budget)
+        return move
+
+    def _get_move(self, current_state, time_budget: Optional[float]) -> Move:
+        """
+        _get_move
+
+        Runs the search engine of the player (see getMove).
+
+        :param current_state: The state of the current game (GameState).
+        :param time_budget: Seconds to search for (None for no time limit).
+        :return: The move to be made.
+        """
+        book_move = self._book_move(current_state)
+        if book_move is not None:
+            return book_move
+        pondered_move = self._pondered_move(current_state)
+        if pondered_move is not None:
+            return pondered_move
+        if self.config.search_mode == "mcts":
+            return self.monte_carlo_search(current_state, time_budget)
+        if self.config.search_mode != "beam":
+            return self.search_game_tree(current_state, time_budget)
+        if time_budget is None:
+            return self.find_best_move(current_state, 0)
+        return self.iterative_deepening(current_state, time_budget)
+
+    def _book_move(self, current_state) -> Optional[Move]:
+        """
+        _book_move
+
+        Looks the state up in the opening book (by ZobristHasher.hash_opening).
+        The book only stores where the move starts and ends (seen from my side of the board),
+        so the move is looked up among the legal moves (which also makes sure it's legal).
+
+        :param current_state: The state of the current game (GameState).
+        :return: The legal move of the book, or None if the state isn't in the book.
+        """
+        if self.opening_book is None or not len(self.opening_book):
+            return None
+        position_key, flipped = self._hasher.hash_opening(current_state)
+        book_move_key = self.opening_book.lookup(position_key)
+        if book_move_key is None:
+            return None
+        if flipped:
+            book_move_key = _flip_move_key(book_move_key)
+        return self._legal_move(current_state, book_move_key)
+
+    def _legal_move(self, current_state, move_key: tuple) -> Optional[Move]:
+        """
+        _legal_move
+
+        :param current_state: The state of the current game (GameState).
+        :param move_key: The _move_key of a move.
+        :return: The legal move with that key, or None if there's no such move.
+        """
+        for move in listAllLegalMoves(current_state):
+            if _move_key(move) == move_key:
+                return move
+        return None
+
+    def _pondered_move(self, current_state) -> Optional[Move]:
+        """
+        _pondered_move
+
+        Looks the state up among the positions searched while pondering
+        (they're only kept for a single getMove call).
+
+        :param current_state: The state of the current game (GameState).
+        :return: The legal move found for the state, or None if it wasn't pondered.
+        """
+        if not self._ponder_results:
+            return None
+        state_hash = self._hasher.hash_state(current_state)
+        move_key = self._ponder_results.get(state_hash[0] ^ state_hash[1])
+        self._ponder_results = {}
+        if move_key is None:
+            return None
+        move = self._legal_move(current_state, move_key)
+        if move is not None:
+            self.ponder_hits += 1
+        return move
+
+    def _start_pondering(self, current_state, move: Move, time_budget: Optional[float]) -> None:
+        """
+        _start_pondering
+
+        Starts searching the positions the game is expected to reach in the ponder process,
+        while the opponent (or the referee) is busy. The process has its own player
+        (and tables), which lives as long as the process.
+        A background thread would hold the GIL while the game runs (making both players
+        slower instead of using idle time), so pondering runs in its own process,
+        and only when there's a CPU to spare for it.
+
+        :param current_state: The state getMove was called with.
+        :param move: The move getMove returned.
+        :param time_budget: The time budget of every pondered search.
+        """
+        if _available_cpus() < 2:
+            return
+        ponder_pool = self._get_ponder_pool()
+        predicted_state = current_state.fastclone()
+        self.make_move(predicted_state, move, full_rules=True)
+        self._ponder_results = {}
+        self._ponder_future = ponder_pool.submit(_ponder_task, predicted_state,
+                                                 current_state.whoseTurn, time_budget,
+                                                 self.ponder_positions)
+
+    def _get_ponder_pool(self) -> "ProcessPoolExecutor":
+        """
+        _get_ponder_pool
+
+        The pool is only started the first time it's needed, and then kept alive
+        until shutdown_workers is called.
+
+        :return: The single-process pool used by _start_pondering.
+        """
+        if self._ponder_pool is None:
+            # Imported here, so importing the agent doesn't load multiprocessing.
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+            self._ponder_stop = multiprocessing.Event()
+            self._ponder_pool = ProcessPoolExecutor(
+                max_workers=1, initializer=_init_ponder_worker,
+                initargs=(self.playerId, self._ponder_config(), self.eval_weights,
+                          self._ponder_stop))
+        return self._ponder_pool
+
+    def _ponder_config(self) -> "SearchConfig":
+        """
+        _ponder_config
+
+        :return: The search options of the player that searches in the background
+                 (see _start_pondering).
+        """
+        return self.config.replace(time_budget=None, num_workers=0,
+                                   debug_incremental_evaluation=False)
+
+    def stop_pondering(self) -> None:
+        """
+        stop_pondering
+
+        Stops the search of the ponder process (if it's running) and waits for it to end.
+        The positions it finished stay available to the next getMove call.
+        """
+        if self._ponder_future is not None:
+            self._ponder_stop.set()
+            try:
+                self._ponder_results = self._ponder_future.result()
+            finally:
+                self._ponder_stop.clear()
+                self._ponder_future = None
+
+    def _ponder(self, search_state, me: int, time_budget: Optional[float],
+                ponder_positions: int, results: Dict[int, tuple]) -> None:
+        """
+        _ponder
+
+        The background search (runs on the player of the ponder process, see _ponder_task).
+        First my expected moves are searched until I end my turn. Then the opponent's
+        expected moves are played out, and my best move is searched for the positions
+        where the opponent ends its turn after each of them (the whole turn first).
+
+        :param search_state: The position my last move leads to (modified).
+        :param me: My player ID.
+        :param time_budget: The time budget of every search.
+        :param ponder_positions: Max number of positions to search.
+        :param results: Filled with the _move_key of my best move in each searched position
+                        (keyed by its full hash).
+        """
+        try:
+            while search_state.whoseTurn == me and len(results) < ponder_positions:
+                move = self._ponder_search(search_state, time_budget, results)
+                self.make_move(search_state, move, full_rules=True)
+
+            reply_states = []
+            while search_state.whoseTurn != me and len(reply_states) < ponder_positions:
+                reply = self._ponder_search(search_state, time_budget, None)
+                ended_state = search_state.fastclone()
+                self.make_move(ended_state, Move(END, None, None), full_rules=True)
+                reply_states.append(ended_state)
+                if reply.moveType == END:
+                    break
+                self.make_move(search_state, reply, full_rules=True)
+
+            for reply_state in reversed(reply_states):
+                if len(results) >= ponder_positions:
+                    break
+                self._ponder_search(reply_state, time_budget, results)
+        except SearchTimeout:
+            pass
+
+    def _ponder_search(self, search_state, time_budget: Optional[float],
+                       results: Optional[Dict[int, tuple]]) -> Move:
+        """
+        _ponder_search
+
+        Searches a single position in the ponder process.
+
+        :param search_state: The position to search.
+        :param time_budget: The time budget of the search.
+        :param results: If given, the best move is stored in it (see _ponder).
+        :return: The best move of whoever's turn it is.
+        """
+        move = self._get_move(search_state, time_budget)
+        # A search that was stopped part of the way through can't be trusted.
+        if self._stop_event.is_set():
+            raise SearchTimeout()
+        if results is not None:
+            state_hash = self._hasher.hash_state(search_state)
+            results[state_hash[0] ^ state_hash[1]] = _move_key(move)
+        return move
+
+    def _profiled_get_move(self, current_state, time_budget: Optional[float]) -> Move:
+        """
+        _profiled_get_move
+
+        getMove with the search statistics recorded: the time and nodes of the search,
+        the time spent in each phase (see SearchProfile), the average branching factor
+        at each depth, the hit rates of the tables during the search and the chosen line.
+        The statistics are kept in last_search_stats and reported to the stats_callback
+        and the stats_log_path.
+
+        :param current_state: The state of the current game (GameState).
+        :param time_budget: Seconds to search for (None for no time limit).
         :return: The move to be made.
         """
-        return self.find_best_move(current_state, 0)
+        import json
+        table_stats = self.transposition_stats()
+        nodes_searched = self.nodes_searched
+        self._profile = SearchProfile()
+        start_time = time.perf_counter()
+        try:
+            move = self._get_move(current_state, time_budget)
+            search_time = time.perf_counter() - start_time
+            profile = self._profile
+        finally:
+            self._profile = None
+
+        tables = {}
+        for name, stats in self.transposition_stats().items():
+            hits = stats["hits"] - table_stats[name]["hits"]
+            misses = stats["misses"] - table_stats[name]["misses"]
+            tables[name] = {"hits": hits, "misses": misses,
+                            "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+
+        self._profiled_turns += 1
+        search_stats = {
+            "turn": self._profiled_turns,
+            "player": self.playerId,
+            "search_mode": self.config.search_mode,
+            "time_ms": search_time * 1e3,
+            "nodes": self.nodes_searched - nodes_searched,
+            "phases_ms": {phase: seconds * 1e3
+                          for phase, seconds in sorted(profile.phase_times.items())},
+            "branching": {str(depth): profile.children[depth] / profile.expansions[depth]
+                          for depth in sorted(profile.expansions)},
+            "tables": tables,
+            "line": [_describe_move(line_move)
+                     for line_move in self._principal_line(current_state, move, profile)]
+        }
+        self.last_search_stats = search_stats
+        if self.stats_callback is not None:
+            self.stats_callback(search_stats)
+        if self.stats_log_path is not None:
+            with open(self.stats_log_path, "a") as stats_log:
+                stats_log.write(json.dumps(search_stats) + "\n")
+        return move
+
+    def _principal_line(self, current_state, move: Move, profile: "SearchProfile") -> List[Move]:
+        """
+        _principal_line
+
+        Follows the best move of every searched position, starting with the chosen move.
+
+        :param current_state: The state the move was chosen in (left unchanged).
+        :param move: The chosen move.
+        :param profile: The SearchProfile of the search.
+        :return: The line of moves the search expects.
+        """
+        search_state = current_state.fastclone()
+        state_hash = self._hasher.hash_state(search_state)
+        line = []
+        while move is not None and len(line) <= len(profile.best_moves):
+            line.append(move)
+            undo_record = self.make_move(search_state, move, self.config.search_mode != "beam")
+            state_hash = self._hasher.hash_move(state_hash, undo_record)
+            move = profile.best_moves.get(state_hash[0] ^ state_hash[1])
+        return line
 
     def getAttack(self, current_state, attacking_ant, enemy_locations):
         """
         getAttack
 
-        Gets the attack to be made from the player.
-        Just attacks a random enemy.
+        Gets the attack to be made from the player.
+        Just attacks a random enemy.
+
+        :param current_state: A clone of the current state (GameState).
+        :param attacking_ant: The ant currently making the attack (Ant).
+        :param enemy_locations: The locations of the enemies that can be attacked (Location[])
+        :return:
+        """
+        return enemy_locations[random.randint(0, len(enemy_locations) - 1)]
+
+    def registerWin(self, has_won):
+        """
+        registerWin
+
+        This agent doesn't learn, but the transposition tables are cleared
+        since positions from this game won't show up in the next one.
+
+        :param has_won: Whether the agent has won or not.
+        """
+        self.stop_pondering()
+        self._ponder_results = {}
+        if self._ponder_pool is not None:
+            self._ponder_pool.submit(_end_pondered_game, has_won)
+        if self.game_record is not None:
+            self.game_record.write_outcome(self.playerId, has_won)
+        self._ant_indexes.clear()
+        self.evaluation_table.clear()
+        self.subtree_table.clear()
+        self.search_tree.clear()
+
+    def transposition_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        transposition_stats
+
+        :return: The hit/miss counters of the evaluation and subtree tables
+                 and of the search tree.
+        """
+        return {
+            "evaluation": self.evaluation_table.stats(),
+            "subtree": self.subtree_table.stats(),
+            "search_tree": self.search_tree.stats()
+        }
+
+    def _has_unwanted_conditions(self, num_workers: int, num_drones: int, num_soldiers: int,
+                                 num_r_soldiers: int) -> bool:
+        """
+        Helper function that checks for unwanted conditions in the GameState.
+        If these exist, my agent will evaluate the game state at -0.99.
+
+        :param num_workers: The number of my workers.
+        :param num_drones: The number of my drones.
+        :param num_soldiers: The number of my soldiers.
+        :param num_r_soldiers: The number of my ranged soldiers.
+        :return: True (unwanted condition exist), otherwise False.
+        """
+
+        # Want one worker no matter what.
+        if num_workers != 1:
+            return True
+
+        # Want no ranged soldiers or soldiers.
+        # Also want only 1 drone (although 0 initially is okay).
+        if num_r_soldiers or num_soldiers or num_drones not in [0, 1]:
+            return True
+        return False
+
+    def _worker_distance(self, worker_coords: tuple, carrying: bool,
+                         geometry: "StaticGeometry", me: int) -> int:
+        """
+        _worker_distance
+
+        :param worker_coords: The coords of the worker.
+        :param carrying: Whether the worker is carrying food.
+        :param geometry: The StaticGeometry of the board.
+        :param me: The player that owns the worker.
+        :return: How far the worker is from where it needs to go.
+        """
+        if self.config.route_distances:
+            return geometry.routes.travel_cost(geometry.worker_targets(me, carrying), WORKER,
+                                               worker_coords)
+        # If the worker is carrying food, need to get to my anthill or tunnel.
+        if carrying:
+            return geometry.dropoff_dist[me][worker_coords]
+        # If the worker is not carrying food, need to get to the food source.
+        else:
+            return geometry.food_dist[me][worker_coords]
+
+    def _drone_distance(self, drone_coords: tuple, enemy_worker_coords: tuple,
+                        geometry: "StaticGeometry") -> int:
+        """
+        _drone_distance
+
+        :param drone_coords: The coords of the drone.
+        :param enemy_worker_coords: The coords of the (only) enemy worker.
+        :param geometry: The StaticGeometry of the board.
+        :return: How far the drone is from the enemy worker.
+        """
+        if self.config.route_distances:
+            return geometry.routes.travel_cost((enemy_worker_coords,), DRONE, drone_coords)
+        return DIST_TABLE[drone_coords][enemy_worker_coords]
+
+    def evaluate_game_state(self, current_state) -> float:
+        """
+        evaluate_game_state
+
+        Given a game state, calculates an evaluation score between -1.0 and 1.0.
+        The agent's main objectives are to gather food and kill the enemy worker
+        (see _evaluation_terms and EvaluationTerms.score).
+
+        :param current_state: The current game state.
+        :return: The evaluation score (float)
+        """
+        return self._evaluation_terms(current_state).evaluation()
+
+    def evaluation_features(self, current_state: GameState) -> Optional[List[float]]:
+        """
+        evaluation_features
+
+        The features of evaluate_game_state for tools.texel.fit_eval_weights,
+        in the order of EvalWeights.NAMES: the number of my workers and drones at each distance
+        (the drones only count when the enemy has one worker), and -1 for each penalty.
+        Their dot product with EvalWeights.to_vector is the score before it's clamped.
+
+        :param current_state: The current game state.
+        :return: The features, or None if the score doesn't depend on the weights
+                 (an unwanted condition or a winner).
+        """
+        terms = self._evaluation_terms(current_state)
+        if terms.unwanted or terms.winner is not None:
+            return None
+
+        features = [0.0] * len(EvalWeights.NAMES)
+        max_reward_dist = len(DIST_REWARDS)
+        # With route_distances, the workers past the last distance count toward it
+        # (see EvalWeights.worker_rewards).
+        max_worker_feature = max_reward_dist - 1 if self.config.route_distances \
+            else max_reward_dist
+        for dist in terms.worker_dists:
+            features[min(dist, max_worker_feature)] += 1.0
+        if terms.blocked_anthill:
+            features[max_reward_dist + 2] -= 1.0
+        if terms.enemy_worker_coords is not None:
+            features[max_reward_dist + 3] -= 1.0
+            for dist in terms.drone_dists:
+                features[dist if dist < max_reward_dist else max_reward_dist + 1] += 1.0
+        return features
+
+    def _evaluation_terms(self, current_state,
+                          geometry: Optional["StaticGeometry"] = None) -> "EvaluationTerms":
+        """
+        _evaluation_terms
+
+        Splits the evaluation of a state into its per-ant and global terms
+        (see EvaluationTerms). Every way of scoring a state goes through here:
+        evaluate_game_state adds the terms up, evaluation_features counts them,
+        and _incremental_evaluation swaps in the terms a move changed.
+        The state is read straight from its inventories (in a single pass),
+        since building its SearchState costs more than the evaluation itself.
+
+        :param current_state: The state to evaluate (scored for the player whose turn it is).
+        :param geometry: The StaticGeometry of the state, if known.
+        :return: The EvaluationTerms of the state.
+        """
+        me = current_state.whoseTurn
+        if geometry is None:
+            geometry = StaticGeometry.from_game_state(current_state)
+        my_anthill = geometry.anthill_coords[me]
+        my_ants: Dict[int, list] = {WORKER: [], DRONE: [], SOLDIER: [], R_SOLDIER: []}
+        enemy_workers = []
+        # Same as getAntAt: the first ant found at the coords wins.
+        ant_at_anthill = None
+        for player in (PLAYER_ONE, PLAYER_TWO):
+            for ant in current_state.inventories[player].ants:
+                if ant_at_anthill is None and ant.coords == my_anthill:
+                    ant_at_anthill = ant
+                if player == me:
+                    if ant.type in my_ants:
+                        my_ants[ant.type].append(ant)
+                elif ant.type == WORKER:
+                    enemy_workers.append(ant)
+
+        terms = EvaluationTerms(me, geometry, self.eval_weights, self._worker_rewards,
+                                self._drone_rewards)
+        terms.unwanted = self._has_unwanted_conditions(len(my_ants[WORKER]), len(my_ants[DRONE]),
+                                                       len(my_ants[SOLDIER]),
+                                                       len(my_ants[R_SOLDIER]))
+        # Nothing else matters to the score of an unwanted state.
+        if terms.unwanted:
+            return terms
+        terms.winner = getWinner(current_state)
+        terms.blocked_anthill = ant_at_anthill is not None and ant_at_anthill.type != WORKER
+
+        # Agent is rewarded for gathering food...
+        terms.workers = my_ants[WORKER]
+        terms.worker_dists = [self._worker_distance(worker.coords, worker.carrying, geometry, me)
+                              for worker in terms.workers]
+
+        # ...and for killing the enemy workers (it only cares if there is exactly one).
+        if len(enemy_workers) == 1:
+            enemy_worker_coords = enemy_workers[0].coords
+            terms.enemy_worker_coords = enemy_worker_coords
+            terms.drones = my_ants[DRONE]
+            terms.drone_dists = [self._drone_distance(drone.coords, enemy_worker_coords, geometry)
+                                 for drone in terms.drones]
+        return terms
+
+    def _incremental_evaluation(self, terms: "EvaluationTerms",
+                                undo_record: "UndoRecord") -> Optional[float]:
+        """
+        _incremental_evaluation
+
+        Scores the state right after make_move by only redoing the terms the move changed.
+        That's only possible for a MOVE_ANT that doesn't kill an ant or capture my anthill:
+        then the ant counts, food counts and winner are the same as the parent's,
+        and only the mover's term (and maybe the anthill blocker) can change.
+
+        :param terms: The EvaluationTerms of the state before the move.
+        :param undo_record: The UndoRecord returned by make_move.
+        :return: The evaluation score, or None if it has to be done from scratch.
+        """
+        mover = undo_record.mover
+        if mover is None or undo_record.victim_index is not None or \
+                undo_record.anthill is not None or undo_record.built_ant is not None:
+            return None
+        if terms.unwanted:
+            return -0.99
+
+        me = terms.me
+        geometry = terms.geometry
+        my_anthill = geometry.anthill_coords[me]
+
+        blocked_anthill = terms.blocked_anthill
+        if mover.coords == my_anthill:
+            blocked_anthill = mover.type != WORKER
+        elif undo_record.mover_coords == my_anthill:
+            blocked_anthill = False
+
+        worker_dists = terms.worker_dists
+        drone_dists = terms.drone_dists
+        for slot, worker in enumerate(terms.workers):
+            if worker is mover:
+                worker_dists = list(worker_dists)
+                worker_dists[slot] = self._worker_distance(mover.coords, mover.carrying,
+                                                           geometry, me)
+        for slot, drone in enumerate(terms.drones):
+            if drone is mover:
+                drone_dists = list(drone_dists)
+                drone_dists[slot] = self._drone_distance(mover.coords, terms.enemy_worker_coords,
+                                                         geometry)
+        return terms.score(blocked_anthill, worker_dists, drone_dists)
+
+    def _expand(self, search_state, state_hash: Tuple[int, int]) -> List["Node"]:
+        """
+        _expand
+
+        Creates a scored child node for every legal move from the search state.
+        Each move is made in place, scored and unmade again,
+        so the nodes only hold the move and not the resulting state.
+
+        :param search_state: The GameState to expand (left unchanged).
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :return: The list of child nodes (in the order of listAllLegalMoves,
+                 see _routed_legal_moves for route_distances).
+        """
+        # The children may still be around from an earlier search (even an earlier turn).
+        all_nodes = self.search_tree.get(search_state, state_hash, self._node_pool)
+        if all_nodes is not None:
+            self.nodes_searched += len(all_nodes)
+            return all_nodes
+
+        profile = self._profile
+        if profile is not None:
+            profile.start_lap()
+        # The layout of the board is the same for all the children.
+        geometry = StaticGeometry.from_game_state(search_state)
+        if self.config.route_distances:
+            all_legal_moves = self._routed_legal_moves(search_state, geometry)
+        else:
+            all_legal_moves = listAllLegalMoves(search_state)
+        all_nodes = []
+        if profile is not None:
+            profile.lap("move_generation")
+
+        # Children that aren't in the evaluation table are scored incrementally
+        # from the terms of this state, or (if that isn't possible) from scratch.
+        terms = self._evaluation_terms(search_state, geometry)
+
+        # END stays a candidate: once my ants have moved, it may be the only legal move.
+        for move in all_legal_moves:
+            undo_record = self.make_move(search_state, move)
+            next_state_hash = self._hasher.hash_move(state_hash, undo_record)
+            node = self._node_pool.acquire(move, None,
+                                           self.evaluation_table.get(next_state_hash[0]),
+                                           next_state_hash)
+            if node.state_evaluation is None:
+                node.state_evaluation = self._incremental_evaluation(terms, undo_record)
+                if node.state_evaluation is None:
+                    node.state_evaluation = \
+                        self._evaluation_terms(search_state, geometry).evaluation()
+                elif self.config.debug_incremental_evaluation:
+                    self._check_incremental_evaluation(search_state, node.state_evaluation)
+                self.evaluation_table.put(next_state_hash[0], node.state_evaluation)
+            self.unmake_move(search_state, undo_record)
+            all_nodes.append(node)
+        if profile is not None:
+            profile.lap("children")
+        self.nodes_searched += len(all_nodes)
+        self.search_tree.put(search_state, state_hash, all_nodes)
+        return all_nodes
+
+    def _routed_legal_moves(self, search_state, geometry: "StaticGeometry") -> List[Move]:
+        """
+        _routed_legal_moves
+
+        listAllLegalMoves for route_distances, where a worker on its way to its food
+        or dropoff only follows its shortest route (see route_move): the evaluation only
+        rewards it for the route cost it has left, so its moves to the other cells it can
+        reach would only widen the expansion (and their paths aren't listed at all).
+        A worker that can't get any closer keeps all of its moves, and so does a worker
+        with ants in its way (patching its route costs more than searching them).
+        Otherwise the moves are the same, and in the same order.
+
+        :param search_state: The current GameState.
+        :param geometry: The StaticGeometry of search_state.
+        :return: The moves.
+        """
+        me = search_state.whoseTurn
+        occupied = {ant.coords for inventory in search_state.inventories[:2]
+                    for ant in inventory.ants}
+        moves = []
+        for ant in search_state.inventories[me].ants:
+            if ant.hasMoved:
+                continue
+            if ant.type == WORKER:
+                targets = geometry.worker_targets(me, ant.carrying)
+                path = None if targets is None else \
+                    geometry.routes.route(ant.coords, targets, WORKER, occupied, patch=False)
+                if path is not None:
+                    moves.append(Move(MOVE_ANT, path, None))
+                    continue
+            for path in listAllMovementPaths(search_state, ant.coords,
+                                             UNIT_STATS[ant.type][MOVEMENT],
+                                             UNIT_STATS[ant.type][IGNORES_GRASS]):
+                if ant.type != QUEEN or isPathOkForQueen(path):
+                    moves.append(Move(MOVE_ANT, path, None))
+        moves.extend(listAllBuildMoves(search_state))
+        moves.append(Move(END, None, None))
+        return moves
+
+    def _check_incremental_evaluation(self, current_state, incremental_score: float) -> None:
+        """
+        _check_incremental_evaluation
+
+        Debug check that an incrementally updated score matches evaluate_game_state.
+
+        :param current_state: The state that was scored.
+        :param incremental_score: The score from _incremental_evaluation.
+        """
+        full_score = self.evaluate_game_state(current_state)
+        if full_score != incremental_score:
+            raise AssertionError("Incremental evaluation %r doesn't match evaluate_game_state %r"
+                                 % (incremental_score, full_score))
+
+    def find_best_move(self, current_state, current_depth, state_hash=None, depth_limit=None):
+        """
+        find_best_move
+
+        The best move is found by recursively traversing the search tree (see _search).
+        The search walks a single copy of the current state, so current_state isn't changed.
+
+        :param current_state: The current GameState.
+        :param current_depth: The current depth level in the tree.
+        :param state_hash: The (position, moved) hash pair of current_state, if already known.
+        :param depth_limit: The depth to search to (defaults to the depth_limit of the player).
+        :return: The Move that the agent wishes to perform
+                 (or the score of current_state if current_depth > 0).
+        """
+        return self._search(current_state.fastclone(), current_depth, state_hash, depth_limit)
+
+    def _search(self, search_state, current_depth, state_hash=None, depth_limit=None):
+        """
+        _search                      <!-- RECURSIVE -->
+
+        The best move is found by recursively traversing the search tree.
+        An average of the evaluation scores is used to determine an overall score.
+        Evaluation scores and backed-up subtree scores are cached in the transposition tables,
+        so a position reached through different move orders is only searched once.
+        Moves are made and unmade on search_state, which is restored before returning.
+
+        :param search_state: The current GameState (modified in place during the search).
+        :param current_depth: The current depth level in the tree.
+        :param state_hash: The (position, moved) hash pair of search_state, if already known.
+        :param depth_limit: The depth to search to (defaults to the depth_limit of the player).
+        :return: The Move that the agent wishes to perform
+                 (or the score of search_state if current_depth > 0).
+        """
+
+        if depth_limit is None:
+            depth_limit = self.config.depth_limit
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise SearchTimeout()
+        if state_hash is None:
+            state_hash = self._hasher.hash_state(search_state)
+
+        # The subtree score only depends on the position, the hasMoved flags and the depth left.
+        subtree_key = (state_hash[0] ^ state_hash[1], depth_limit - current_depth)
+        if current_depth > 0:
+            subtree_score = self.subtree_table.get(subtree_key)
+            if subtree_score is not None:
+                return subtree_score
+
+        child_nodes = self._expand(search_state, state_hash)
+        if self._profile is not None:
+            self._profile.record_expansion(current_depth, len(child_nodes))
+        best_nodes = self._get_best_nodes(child_nodes)
+        if current_depth == 0 < depth_limit and \
+                self._searches_root_in_parallel(len(child_nodes), len(best_nodes), depth_limit):
+            subtree_scores = self._search_root_in_parallel(search_state, best_nodes, depth_limit,
+                                                           self._deadline)
+            if None in subtree_scores:
+                self._node_pool.release(child_nodes)
+                raise SearchTimeout()
+            for node, subtree_score in zip(best_nodes, subtree_scores):
+                node.state_evaluation = subtree_score
+        elif current_depth < depth_limit:
+            for node in best_nodes:
+                undo_record = self.make_move(search_state, node.move)
+                try:
+                    node.state_evaluation = self._search(search_state, current_depth + 1,
+                                                         node.state_hash, depth_limit)
+                finally:
+                    self.unmake_move(search_state, undo_record)
+
+        # The children are only needed until this level returns.
+        if current_depth > 0:
+            subtree_score = self.average_evaluation_score(best_nodes)
+            self.subtree_table.put(subtree_key, subtree_score)
+            if self._profile is not None:
+                self._profile.best_moves[subtree_key[0]] = \
+                    max(best_nodes, key=lambda x: x.state_evaluation).move
+            self._node_pool.release(child_nodes)
+            return subtree_score
+        else:
+            # Citation: https://stackoverflow.com/questions/13067615/
+            # python-getting-the-max-value-of-y-from-a-list-of-objects
+            best_move = max(best_nodes, key=lambda x: x.state_evaluation).move
+            self._node_pool.release(child_nodes)
+            return best_move
+
+    def _parallel_root_work(self, num_children: int, num_best_nodes: int,
+                            depth_limit: int) -> int:
+        """
+        _parallel_root_work
+
+        Estimates the number of nodes the search below the root creates: every level
+        keeps num_best_nodes children, and each of them has about as many children as the root.
+
+        :param num_children: The number of children of the root.
+        :param num_best_nodes: The number of children of the root that are searched.
+        :param depth_limit: The depth to search to.
+        :return: The estimated number of nodes.
+        """
+        return num_children * num_best_nodes ** depth_limit
+
+    def _searches_root_in_parallel(self, num_children: int, num_best_nodes: int,
+                                   depth_limit: int) -> bool:
+        """
+        _searches_root_in_parallel
+
+        :param num_children: The number of children of the root.
+        :param num_best_nodes: The number of children of the root that are searched.
+        :param depth_limit: The depth to search to.
+        :return: Whether the subtrees of the root are searched by the process pool
+                 (see PARALLEL_MIN_ROOT_WORK).
+        """
+        return self.config.num_workers > 0 and depth_limit > 0 and \
+            self._parallel_root_work(num_children, num_best_nodes, depth_limit) >= \
+            PARALLEL_MIN_ROOT_WORK
+
+    def _search_root_in_parallel(self, search_state, root_nodes: List["Node"], depth_limit: int,
+                                 deadline: Optional[float] = None) -> List[Optional[float]]:
+        """
+        _search_root_in_parallel
+
+        Searches the subtree of every root node in the process pool.
+        Each worker only gets the SearchState of its subtree's root, without its geometry
+        (see SearchState.__getstate__).
+
+        :param search_state: The root GameState (left unchanged).
+        :param root_nodes: The root nodes to search (in the order to hand them out).
+        :param depth_limit: The depth to search to.
+        :param deadline: The time.perf_counter() time to stop searching at (None for no limit).
+        :return: The subtree score of each root node, in the order of root_nodes
+                 (None for the subtrees that didn't finish before the deadline).
+        """
+        subtree_states = []
+        for node in root_nodes:
+            undo_record = self.make_move(search_state, node.move)
+            subtree_states.append(SearchState.from_game_state(search_state))
+            self.unmake_move(search_state, undo_record)
+
+        # The clock of perf_counter isn't shared between processes, so the workers
+        # get the deadline in wall-clock time (a subtree may wait for a free worker).
+        stop_time = None if deadline is None else time.time() + deadline - time.perf_counter()
+        process_pool = self._get_process_pool()
+        futures = [process_pool.submit(_search_subtree, subtree_state, depth_limit, stop_time)
+                   for subtree_state in subtree_states]
+        return [future.result() for future in futures]
+
+    def _get_process_pool(self) -> "ProcessPoolExecutor":
+        """
+        _get_process_pool
+
+        The pool is only started the first time it's needed, and then kept alive
+        (along with the transposition tables of its workers) until shutdown_workers is called.
+
+        :return: The process pool used by _search_root_in_parallel.
+        """
+        if self._process_pool is None:
+            # Imported here, so importing the agent doesn't load multiprocessing.
+            from concurrent.futures import ProcessPoolExecutor
+            worker_config = self.config.replace(num_workers=0, time_budget=None)
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.config.num_workers, initializer=_init_search_worker,
+                initargs=(self.playerId, worker_config, self.eval_weights))
+        return self._process_pool
+
+    def shutdown_workers(self) -> None:
+        """
+        shutdown_workers
+
+        Stops the worker processes of the parallel search and the ponder process
+        (if they were started).
+        """
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+        if self._ponder_pool is not None:
+            self.stop_pondering()
+            self._ponder_pool.shutdown()
+            self._ponder_pool = None
+
+    def iterative_deepening(self, current_state, time_budget: float) -> Move:
+        """
+        iterative_deepening
+
+        Anytime version of find_best_move.
+        The root is searched with depth limits 0, 1, 2, ... until the time budget runs out,
+        and the best move of the deepest finished search is returned.
+        Each search starts with the best root move of the previous one, so if time runs out
+        part of the way through, the moves that did finish can still be compared against it.
+
+        :param current_state: The current GameState.
+        :param time_budget: The number of seconds to search for.
+        :return: The Move that the agent wishes to perform.
+        """
+        start_time = time.perf_counter()
+        search_state = current_state.fastclone()
+        state_hash = self._hasher.hash_state(search_state)
+
+        # Depth limit 0 is just the static evaluation of the best root nodes.
+        child_nodes = self._expand(search_state, state_hash)
+        root_nodes = self._get_best_nodes(child_nodes)
+        static_evaluations = [node.state_evaluation for node in root_nodes]
+        best_index = static_evaluations.index(max(static_evaluations))
+        last_search_time = time.perf_counter() - start_time
+
+        self._deadline = start_time + time_budget
+        try:
+            for depth_limit in range(1, self.config.max_depth + 1):
+                # Every extra ply multiplies the work by about num_best_nodes,
+                # so don't start a search that has no chance of finishing.
+                search_start_time = time.perf_counter()
+                if self._deadline - search_start_time < \
+                        last_search_time * self.config.num_best_nodes:
+                    break
+
+                # Search the previous best move first, then the rest in their static order.
+                search_order = [best_index] + [i for i in range(len(root_nodes))
+                                               if i != best_index]
+                scores: Dict[int, float] = {}
+                try:
+                    if self._searches_root_in_parallel(len(child_nodes), len(root_nodes),
+                                                       depth_limit):
+                        subtree_scores = self._search_root_in_parallel(
+                            search_state, [root_nodes[i] for i in search_order], depth_limit,
+                            self._deadline)
+                        scores = {i: score for i, score in zip(search_order, subtree_scores)
+                                  if score is not None}
+                        if len(scores) < len(search_order):
+                            raise SearchTimeout()
+                    else:
+                        for i in search_order:
+                            undo_record = self.make_move(search_state, root_nodes[i].move)
+                            try:
+                                scores[i] = self._search(search_state, 1,
+                                                         root_nodes[i].state_hash, depth_limit)
+                            finally:
+                                self.unmake_move(search_state, undo_record)
+                except SearchTimeout:
+                    # Only trust the partial search if the previous best move was re-searched.
+                    if best_index in scores:
+                        best_index = max(sorted(scores), key=lambda i: scores[i])
+                    break
+
+                # Ties go to the earlier node, just like in find_best_move.
+                best_index = max(range(len(root_nodes)), key=lambda i: scores[i])
+                last_search_time = time.perf_counter() - search_start_time
+        finally:
+            self._deadline = None
+        return root_nodes[best_index].move
+
+    def search_game_tree(self, current_state, time_budget: Optional[float] = None) -> Move:
+        """
+        search_game_tree
+
+        The "alphabeta" and "expectimax" search engines.
+        Unlike find_best_move, these follow the turns of the game: every ant moves once,
+        END hands the turn to the opponent, and the opponent's moves are searched as well.
+        All leaves are scored from my point of view (see _root_evaluation).
+        With a time or node budget, the root is searched with depth limits 1, 2, ...
+        (previous best move first) until the budget runs out;
+        otherwise it's searched once with the depth_limit of the player.
+
+        :param current_state: The current GameState.
+        :param time_budget: The number of seconds to search for (None for no time limit).
+        :return: The Move that the agent wishes to perform.
+        """
+        start_time = time.perf_counter()
+        search_state = current_state.fastclone()
+        state_hash = self._hasher.hash_state(search_state)
+        self._root_player = search_state.whoseTurn
+        self._killer_moves = {}
+        self._history_scores = {}
+        self._rng = random.Random(self.config.random_seed ^ state_hash[0])
+        # Food, anthills and tunnels never change during the search.
+        self._search_geometry = StaticGeometry.from_game_state(search_state)
+
+        root_moves = list(self.generate_moves(search_state, 0, self._search_geometry))
+        best_move = root_moves[0]
+        if time_budget is None and self.config.node_budget is None:
+            depth_limits = [self.config.depth_limit]
+        else:
+            depth_limits = range(1, self.config.max_depth + 1)
+        if time_budget is not None:
+            self._deadline = start_time + time_budget
+        if self.config.node_budget is not None:
+            self._node_limit = self.nodes_searched + self.config.node_budget
+        try:
+            for depth_limit in depth_limits:
+                root_moves.remove(best_move)
+                root_moves.insert(0, best_move)
+                searched_move, finished = self._search_root(search_state, state_hash,
+                                                            root_moves, depth_limit)
+                # A move only beats the previous best if it scored higher, so even
+                # an unfinished search can be trusted once the first move is done.
+                if searched_move is not None:
+                    best_move = searched_move
+                if not finished:
+                    break
+        finally:
+            self._deadline = None
+            self._node_limit = None
+        return best_move
+
+    def _search_root(self, search_state, state_hash: Tuple[int, int], root_moves: List[Move],
+                     depth_limit: int) -> Tuple[Optional[Move], bool]:
+        """
+        _search_root
+
+        Searches every root move to depth_limit (see _search_game_tree).
+
+        :param search_state: The root GameState (left unchanged).
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :param root_moves: The legal moves of the root, in the order to search them.
+        :param depth_limit: The depth to search to.
+        :return: The best move (ties go to the earlier move, None if no move was finished)
+                 and whether the search finished before the budget ran out.
+        """
+        alpha = -float("inf")
+        best_move = None
+        if self._profile is not None:
+            self._profile.record_expansion(0, len(root_moves))
+        try:
+            for move in root_moves:
+                if self.config.search_mode == "alphabeta":
+                    score = self._search_child(search_state, state_hash, move, depth_limit,
+                                               alpha, float("inf"), 0)
+                else:
+                    score = self._search_child(search_state, state_hash, move, depth_limit,
+                                               -float("inf"), float("inf"), 0)
+                if best_move is None or score > alpha:
+                    best_move = move
+                    alpha = score
+        except SearchTimeout:
+            return best_move, False
+        return best_move, True
+
+    def _search_child(self, search_state, state_hash: Tuple[int, int], move: Move,
+                      depth_left: int, alpha: float, beta: float, ply: int) -> float:
+        """
+        _search_child
+
+        Makes the move, searches the resulting state and takes the move back.
+
+        :param search_state: The GameState to make the move on (restored before returning).
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :param move: The move to search.
+        :param depth_left: The depth left to search, including this move.
+        :param alpha: The score I'm already guaranteed.
+        :param beta: The score the opponent is already guaranteed.
+        :param ply: The ply of search_state in the search tree.
+        :return: The score of the child state.
+        """
+        if self._profile is not None:
+            self._profile.start_lap()
+        undo_record = self.make_move(search_state, move, full_rules=True)
+        try:
+            child_hash = self._hasher.hash_move(state_hash, undo_record)
+            if self._profile is not None:
+                self._profile.lap("children")
+            return self._search_game_tree(search_state, child_hash, depth_left - 1,
+                                          alpha, beta, ply + 1)
+        finally:
+            self.unmake_move(search_state, undo_record)
+
+    def _search_game_tree(self, search_state, state_hash: Tuple[int, int], depth_left: int,
+                          alpha: float, beta: float, ply: int) -> float:
+        """
+        _search_game_tree            <!-- RECURSIVE -->
+
+        Alpha-beta (or expectimax) search of the game tree below search_state.
+        My moves maximize the score. In "alphabeta" mode the opponent's moves minimize it;
+        in "expectimax" mode the opponent plays one of expectimax_samples random moves.
+        Scores are cached in the subtree table along with whether they're exact or a bound.
+
+        :param search_state: The current GameState (modified in place during the search).
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :param depth_left: The depth left to search.
+        :param alpha: The score I'm already guaranteed.
+        :param beta: The score the opponent is already guaranteed.
+        :param ply: The ply of search_state in the search tree.
+        :return: The score of search_state (from my point of view).
+        """
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+        if self._node_limit is not None and self.nodes_searched >= self._node_limit:
+            raise SearchTimeout()
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise SearchTimeout()
+        self.nodes_searched += 1
+
+        if depth_left == 0 or getWinner(search_state) is not None:
+            return self._root_evaluation(search_state, state_hash)
+
+        subtree_key = (state_hash[0] ^ state_hash[1], depth_left, self._root_player,
+                       self.config.search_mode)
+        table_entry = self.subtree_table.get(subtree_key)
+        if table_entry is not None:
+            subtree_score, bound = table_entry
+            if bound == EXACT_SCORE or (bound == LOWER_BOUND and subtree_score >= beta) or \
+                    (bound == UPPER_BOUND and subtree_score <= alpha):
+                return subtree_score
+
+        moves = self.generate_moves(search_state, ply, self._search_geometry)
+        maximizing = search_state.whoseTurn == self._root_player
+
+        # Chance node: the average over a sample of the opponent's moves.
+        if self.config.search_mode == "expectimax" and not maximizing:
+            moves = list(moves)
+            if len(moves) > self.config.expectimax_samples:
+                moves = self._rng.sample(moves, self.config.expectimax_samples)
+            subtree_score = sum(self._search_child(search_state, state_hash, move, depth_left,
+                                                   -float("inf"), float("inf"), ply)
+                                for move in moves) / len(moves)
+            self.subtree_table.put(subtree_key, (subtree_score, EXACT_SCORE))
+            if self._profile is not None:
+                self._profile.record_expansion(ply, len(moves))
+            return subtree_score
+
+        # The moves are generated lazily, so after a cutoff the rest are never created.
+        original_alpha, original_beta = alpha, beta
+        subtree_score = -float("inf") if maximizing else float("inf")
+        best_move = None
+        num_searched = 0
+        for move in moves:
+            score = self._search_child(search_state, state_hash, move, depth_left,
+                                       alpha, beta, ply)
+            num_searched += 1
+            if score > subtree_score if maximizing else score < subtree_score:
+                subtree_score = score
+                best_move = move
+            if maximizing:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                self._record_cutoff(move, depth_left, ply)
+                break
+        if self._profile is not None:
+            self._profile.record_expansion(ply, num_searched)
+            self._profile.best_moves[subtree_key[0]] = best_move
+
+        if subtree_score <= original_alpha:
+            bound = UPPER_BOUND
+        elif subtree_score >= original_beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT_SCORE
+        self.subtree_table.put(subtree_key, (subtree_score, bound))
+        return subtree_score
+
+    def _root_evaluation(self, search_state, state_hash: Tuple[int, int]) -> float:
+        """
+        _root_evaluation
+
+        evaluate_game_state always scores a state for the player whose turn it is,
+        so on the opponent's turn the turn is flipped to me while the state is scored.
+
+        :param search_state: The GameState to score (left unchanged).
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :return: The evaluation score of search_state from my point of view.
+        """
+        whose_turn = search_state.whoseTurn
+        position_hash = state_hash[0]
+        if whose_turn != self._root_player:
+            position_hash = self._hasher.switch_turn(position_hash, whose_turn)
+        evaluation_score = self.evaluation_table.get(position_hash)
+        if evaluation_score is None:
+            if self._profile is not None:
+                self._profile.start_lap()
+            search_state.whoseTurn = self._root_player
+            try:
+                evaluation_score = self._evaluation_terms(search_state,
+                                                          self._search_geometry).evaluation()
+            finally:
+                search_state.whoseTurn = whose_turn
+            self.evaluation_table.put(position_hash, evaluation_score)
+            if self._profile is not None:
+                self._profile.lap("evaluation")
+        return evaluation_score
+
+    def monte_carlo_search(self, current_state, time_budget: Optional[float] = None) -> Move:
+        """
+        monte_carlo_search
+
+        The "mcts" search engine: Monte Carlo tree search with UCT selection.
+        Like search_game_tree, it follows the turns of the game and scores everything
+        from my point of view. Every round, mcts_batch_size leaves are picked
+        (see _playout_batch), each one gets a short greedy playout, and the scores of the
+        states the playouts stop in are added to the tree once the round is over.
+        It's anytime: it runs until the time or node budget runs out
+        (or for mcts_playouts playouts if there's neither), and plays the most visited move.
+
+        :param current_state: The current GameState.
+        :param time_budget: The number of seconds to search for (None for no time limit).
+        :return: The Move that the agent wishes to perform.
+        """
+        start_time = time.perf_counter()
+        search_state = current_state.fastclone()
+        self._root_player = search_state.whoseTurn
+        self._history_scores = {}
+        self._search_geometry = StaticGeometry.from_game_state(search_state)
+        deadline = start_time + time_budget if time_budget is not None else None
+        node_limit = self.nodes_searched + self.config.node_budget \
+            if self.config.node_budget is not None else None
+
+        root = MCTSNode(None, search_state.whoseTurn)
+        num_playouts = 0
+        while True:
+            num_playouts += self._playout_batch(search_state, root)
+            if self._stop_event is not None and self._stop_event.is_set():
+                break
+            if deadline is not None or node_limit is not None:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                if node_limit is not None and self.nodes_searched >= node_limit:
+                    break
+            elif num_playouts >= self.config.mcts_playouts:
+                break
+            if not root.children and not root.untried_moves:
+                break
+
+        if self._profile is not None:
+            self._record_mcts_line(search_state, root)
+        if not root.children:
+            return Move(END, None, None)
+        # The most visited move; ties go to the better score, then to the earlier move.
+        return max(root.children,
+                   key=lambda child: (child.visits, child.total_score / child.visits)).move
+
+    def _playout_batch(self, search_state, root: "MCTSNode") -> int:
+        """
+        _playout_batch
+
+        A round of the Monte Carlo tree search. For each playout: select a leaf with UCT
+        (see _select_child), expand one of its untried moves (in generate_moves order),
+        and play the playout policy (see _playout_move) for up to rollout_depth moves.
+        A visit is counted on the way down, so the playouts of a round spread out
+        over different leaves. The state each playout stops in is scored from my point
+        of view (see _root_evaluation), and once the round is over, the scores are added
+        along their paths.
+
+        :param search_state: The root GameState (left unchanged).
+        :param root: The root MCTSNode.
+        :return: The number of playouts played.
+        """
+        paths = []
+        scores = []
+        for _ in range(self.config.mcts_batch_size):
+            node = root
+            node.visits += 1
+            path = [node]
+            undo_records = []
+
+            # Selection
+            while node.untried_moves is not None and not node.untried_moves and node.children:
+                node = self._select_child(node)
+                node.visits += 1
+                path.append(node)
+                undo_records.append(self.make_move(search_state, node.move, full_rules=True))
+
+            # Expansion
+            if node.untried_moves is None:
+                if self._profile is not None:
+                    self._profile.start_lap()
+                if getWinner(search_state) is not None:
+                    node.untried_moves = []
+                else:
+                    node.untried_moves = list(self.generate_moves(
+                        search_state, None, self._search_geometry))[::-1]
+                if self._profile is not None:
+                    self._profile.lap("move_generation")
+                    self._profile.record_expansion(len(path) - 1, len(node.untried_moves))
+            if node.untried_moves:
+                move = node.untried_moves.pop()
+                undo_records.append(self.make_move(search_state, move, full_rules=True))
+                node = MCTSNode(move, search_state.whoseTurn)
+                path[-1].children.append(node)
+                node.visits += 1
+                path.append(node)
+                self.nodes_searched += 1
+
+            # Playout
+            if self._profile is not None:
+                self._profile.start_lap()
+            for _ in range(self.config.rollout_depth):
+                if getWinner(search_state) is not None:
+                    break
+                undo_records.append(self.make_move(search_state,
+                                                   self._playout_move(search_state),
+                                                   full_rules=True))
+                self.nodes_searched += 1
+
+            if self._profile is not None:
+                self._profile.lap("playouts")
+
+            # The end state is scored from my point of view (see _root_evaluation).
+            whose_turn = search_state.whoseTurn
+            search_state.whoseTurn = self._root_player
+            try:
+                scores.append(self._evaluation_terms(search_state,
+                                                     self._search_geometry).evaluation())
+            finally:
+                search_state.whoseTurn = whose_turn
+            if self._profile is not None:
+                self._profile.lap("evaluation")
+            for undo_record in reversed(undo_records):
+                self.unmake_move(search_state, undo_record)
+            paths.append(path)
+
+        for path, score in zip(paths, scores):
+            for node in path:
+                node.total_score += score
+        return len(paths)
+
+    def _select_child(self, node: "MCTSNode") -> "MCTSNode":
+        """
+        _select_child
+
+        UCT: the child with the best average score for the player to move
+        plus an exploration bonus for children that haven't been visited much.
+
+        :param node: A fully expanded MCTSNode.
+        :return: The child to follow.
+        """
+        log_visits = math.log(node.visits)
+        sign = 1.0 if node.player == self._root_player else -1.0
+        exploration = self.config.mcts_exploration
+        best_child = None
+        best_value = -float("inf")
+        for child in node.children:
+            value = sign * child.total_score / child.visits + \
+                exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best_child = child
+                best_value = value
+        return best_child
+
+    def _playout_move(self, search_state) -> Move:
+        """
+        _playout_move
+
+        The cheap playout policy: the first of the workers and drones (of the player to move)
+        that can get closer to its target follows its shortest route (see _route_move),
+        or else the queen steps to the adjacent cell that gets it the closest to its target
+        (see _target_distance). When none of them can, the turn ends. The movement paths
+        of the ants aren't listed (that costs far more than the rest of the playout),
+        and nothing is built.
+
+        :param search_state: The current GameState.
+        :return: The move of the playout.
+        """
+        me = search_state.whoseTurn
+        geometry = self._search_geometry
+        enemy_workers = [ant.coords for ant in search_state.inventories[1 - me].ants
+                         if ant.type == WORKER]
+        occupied = None
+        for ant in search_state.inventories[me].ants:
+            if ant.hasMoved or ant.type not in (WORKER, DRONE, QUEEN):
+                continue
+            if ant.type != QUEEN:
+                if occupied is None:
+                    occupied = {other.coords for inventory in search_state.inventories[:2]
+                                for other in inventory.ants}
+                move = self._route_move(ant, me, geometry, enemy_workers, occupied)
+                if move is not None:
+                    return move
+                continue
+            target_dist = self._target_distance(ant, me, geometry, enemy_workers)
+            if target_dist is None:
+                continue
+            best_step = None
+            best_dist = target_dist(ant.coords)
+            for step in listReachableAdjacent(search_state, ant.coords,
+                                              UNIT_STATS[ant.type][MOVEMENT],
+                                              UNIT_STATS[ant.type][IGNORES_GRASS]):
+                if ant.type == QUEEN and not isPathOkForQueen([ant.coords, step]):
+                    continue
+                dist = target_dist(step)
+                if dist < best_dist:
+                    best_step = step
+                    best_dist = dist
+            if best_step is not None:
+                return Move(MOVE_ANT, [ant.coords, best_step], None)
+        return Move(END, None, None)
+
+    def _record_mcts_line(self, search_state, root: "MCTSNode") -> None:
+        """
+        _record_mcts_line
+
+        Records the most visited line of the Monte Carlo tree as the best moves
+        of the profile (see _principal_line).
+
+        :param search_state: The root GameState (left unchanged).
+        :param root: The root MCTSNode.
+        """
+        state_hash = self._hasher.hash_state(search_state)
+        undo_records = []
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            self._profile.best_moves[state_hash[0] ^ state_hash[1]] = node.move
+            undo_records.append(self.make_move(search_state, node.move, full_rules=True))
+            state_hash = self._hasher.hash_move(state_hash, undo_records[-1])
+        for undo_record in reversed(undo_records):
+            self.unmake_move(search_state, undo_record)
+
+    def generate_moves(self, search_state, ply: Optional[int] = None,
+                       geometry: Optional["StaticGeometry"] = None) -> Iterator[Move]:
+        """
+        generate_moves
+
+        Lazy, ordered version of listAllLegalMoves, generated in stages so a cutoff
+        also saves the moves that weren't generated yet.
+        Moves that take an ant to the same cell are only generated once (the first path
+        listAllMovementPaths finds is used), since they lead to the same state.
+        The killer moves of the ply come first, and only need the paths of their own ants.
+        Then each ant's moves are generated in turn (the ants that may reach an enemy
+        this turn first), and yielded in order of: whether it puts an enemy in range,
+        its history score, and how much closer it brings the ant to its target
+        (workers: food or a dropoff, drones: enemy workers, soldiers: the enemy anthill,
+        queen: off my anthill). The build moves come next (by history score), and END last.
+
+        :param search_state: The current GameState.
+        :param ply: The ply of search_state in the search tree (None for no killer moves).
+        :param geometry: The StaticGeometry of the state, if known.
+        :return: The legal moves, in the order to search them.
+        """
+        me = search_state.whoseTurn
+        my_inventory = search_state.inventories[me]
+        if geometry is None:
+            geometry = StaticGeometry.from_game_state(search_state)
+        history_scores = self._history_scores
+
+        unmoved_ants: Dict[tuple, Ant] = {}
+        for ant in my_inventory.ants:
+            if not ant.hasMoved:
+                unmoved_ants.setdefault(ant.coords, ant)
+        ant_paths: Dict[tuple, Dict[tuple, list]] = {}
+
+        def paths_of(ant: Ant) -> Dict[tuple, list]:
+            """ The first legal path to each of the cells the ant can move to. """
+            paths = ant_paths.get(ant.coords)
+            if paths is None:
+                paths = {}
+                for path in listAllMovementPaths(search_state, ant.coords,
+                                                 UNIT_STATS[ant.type][MOVEMENT],
+                                                 UNIT_STATS[ant.type][IGNORES_GRASS]):
+                    if ant.type == QUEEN and not isPathOkForQueen(path):
+                        continue
+                    paths.setdefault(path[-1], path)
+                ant_paths[ant.coords] = paths
+            return paths
+
+        # The killer moves are tried before anything else is generated.
+        yielded_keys = set()
+        for move_key in (self._killer_moves.get(ply, []) if ply is not None else []):
+            move_type, start, dest, _ = move_key
+            if move_type == MOVE_ANT and start in unmoved_ants:
+                path = paths_of(unmoved_ants[start]).get(dest)
+                if path is not None:
+                    yielded_keys.add(move_key)
+                    yield Move(MOVE_ANT, path, None)
+
+        enemy_coords = {ant.coords for ant in search_state.inventories[1 - me].ants}
+        enemy_workers = [ant.coords for ant in search_state.inventories[1 - me].ants
+                         if ant.type == WORKER]
+
+        def may_attack(ant: Ant) -> bool:
+            """ Whether an enemy is close enough that the ant may get it in range this turn. """
+            reach = UNIT_STATS[ant.type][MOVEMENT] + UNIT_STATS[ant.type][RANGE]
+            return any(DIST_TABLE[ant.coords][coords] <= reach for coords in enemy_coords)
+
+        # One stage per ant (the sort is stable, so equal ants keep their order).
+        ants = sorted(unmoved_ants.values(), key=lambda ant: not may_attack(ant))
+        for ant in ants:
+            attack_range = UNIT_STATS[ant.type][RANGE]
+            target_dist = self._target_distance(ant, me, geometry, enemy_workers)
+            start_dist = target_dist(ant.coords) if target_dist is not None else 0
+
+            # (sort key, move) pairs; the index keeps the order of equal moves stable.
+            ordered_moves = []
+            for dest, path in paths_of(ant).items():
+                move_key = (MOVE_ANT, ant.coords, dest, None)
+                if move_key in yielded_keys:
+                    continue
+                attacks = any(coords in enemy_coords
+                              for coords in ATTACKABLE_TABLE[(dest, attack_range)])
+                progress = start_dist - target_dist(dest) if target_dist is not None else 0
+                ordered_moves.append(((-attacks, -history_scores.get(move_key, 0), -progress,
+                                       len(ordered_moves)), Move(MOVE_ANT, path, None)))
+            ordered_moves.sort(key=lambda sort_key_and_move: sort_key_and_move[0])
+            for _, move in ordered_moves:
+                yield move
+
+        build_moves = listAllBuildMoves(search_state)
+        build_moves.sort(key=lambda move: -history_scores.get(_move_key(move), 0))
+        for move in build_moves:
+            yield move
+        yield Move(END, None, None)
+
+    def _target_distance(self, ant: Ant, me: int, geometry: "StaticGeometry",
+                         enemy_workers: List[tuple]) -> Optional[Callable[[tuple], int]]:
+        """
+        _target_distance
+
+        Where an ant wants to go (see _route_targets), measured by the movement cost
+        of its shortest route around the grass (see RoutePlanner),
+        and for the queen, whether it's off my anthill.
+
+        :param ant: One of my ants.
+        :param me: My player ID.
+        :param geometry: The StaticGeometry of the state.
+        :param enemy_workers: The coords of the enemy workers.
+        :return: The distance from a cell to the ant's target (None if it has no target).
+        """
+        if ant.type == QUEEN:
+            my_anthill = geometry.anthill_coords[me]
+            return lambda coords: -1 if coords == my_anthill else 0
+        targets = self._route_targets(ant, me, geometry, enemy_workers)
+        if targets is None:
+            return None
+        grid = geometry.routes.cost_grid(targets, ant.type)
+        return lambda coords: grid.get(coords, RoutePlanner.UNREACHABLE)
+
+    def _route_targets(self, ant: Ant, me: int, geometry: "StaticGeometry",
+                       enemy_workers: List[tuple]) -> Optional[tuple]:
+        """
+        _route_targets
+
+        Where an ant wants to go: workers to food or a dropoff, drones to the enemy workers
+        and soldiers to the enemy anthill.
+
+        :param ant: One of my ants.
+        :param me: My player ID.
+        :param geometry: The StaticGeometry of the state.
+        :param enemy_workers: The coords of the enemy workers.
+        :return: The coords of the ant's targets (None if it has none).
+        """
+        if ant.type == WORKER:
+            return geometry.worker_targets(me, ant.carrying)
+        elif ant.type == DRONE and enemy_workers:
+            return tuple(enemy_workers)
+        elif ant.type in (SOLDIER, R_SOLDIER) and geometry.anthill_coords[1 - me] is not None:
+            return geometry.anthill_coords[1 - me],
+        return None
+
+    def route_move(self, current_state: GameState, ant: Ant) -> Optional[Move]:
+        """
+        route_move
+
+        The best move of an ant toward its target (see _route_targets): as far along
+        its shortest route around the grass and the other ants as its movement allows.
+
+        :param current_state: The current GameState.
+        :param ant: An ant (that hasn't moved) of the player whose turn it is.
+        :return: The move, or None if the ant has no target or can't get closer to it.
+        """
+        me = current_state.whoseTurn
+        enemy_workers = [other.coords for other in current_state.inventories[1 - me].ants
+                         if other.type == WORKER]
+        occupied = {other.coords for inventory in current_state.inventories[:2]
+                    for other in inventory.ants}
+        return self._route_move(ant, me, StaticGeometry.from_game_state(current_state),
+                                enemy_workers, occupied)
+
+    def _route_move(self, ant: Ant, me: int, geometry: "StaticGeometry",
+                    enemy_workers: List[tuple], occupied: set) -> Optional[Move]:
+        """
+        _route_move
+
+        :param ant: One of my ants.
+        :param me: My player ID.
+        :param geometry: The StaticGeometry of the state.
+        :param enemy_workers: The coords of the enemy workers.
+        :param occupied: The coords of all the ants.
+        :return: The move of the ant along its route (see route_move), or None.
+        """
+        targets = self._route_targets(ant, me, geometry, enemy_workers)
+        if targets is None:
+            return None
+        path = geometry.routes.route(ant.coords, targets, ant.type, occupied)
+        return Move(MOVE_ANT, path, None) if path is not None else None
+
+    def _record_cutoff(self, move: Move, depth_left: int, ply: int) -> None:
+        """
+        _record_cutoff
+
+        Remembers a move that caused a cutoff, so it's tried early in similar positions.
+
+        :param move: The move that caused the cutoff.
+        :param depth_left: The depth left below the move's parent (deeper cutoffs count more).
+        :param ply: The ply of the move's parent.
+        """
+        move_key = _move_key(move)
+        killer_moves = self._killer_moves.setdefault(ply, [])
+        if move_key not in killer_moves:
+            killer_moves.insert(0, move_key)
+            del killer_moves[NUM_KILLER_MOVES:]
+        self._history_scores[move_key] = self._history_scores.get(move_key, 0) + \
+            depth_left * depth_left
+
+    def _get_best_nodes(self, nodes: list) -> list:
+        """
+        _get_best_nodes
+
+        Helper function used for finding the best nodes to prune the tree properly.
+
+        :param nodes: The list of nodes to check.
+        :return: The best nodes (number determined by the num_best_nodes of the player).
+        """
+        # Same as sorted(reverse=True)[:num_best_nodes] (ties keep their order),
+        # without sorting the whole list.
+        return heapq.nlargest(self.config.num_best_nodes, nodes,
+                              key=lambda node: node.state_evaluation)
+
+    def average_evaluation_score(self, nodes: list) -> float:
+        """
+        Helper method to determine the overall evaluation score of a list of nodes.
+        The average method is used.
+
+        :param nodes: The list of nodes to check.
+        :return: The average evaluation score of all the checked nodes.
+        """
+        return sum(node.state_evaluation for node in nodes) / len(nodes)
+
+    def getNextState(self, currentState, move):
+        """
+        Revised version of getNextState from AIPlayerUtils.
+        Copied from Nux's email to the class.
+
+        :param currentState: The current GameState.
+        :param move: The move to be performed.
+        :return: The next GameState from the specified move.
+        """
+
+        # variables I will need
+        myGameState = currentState.fastclone()
+        myInv = getCurrPlayerInventory(myGameState)
+        me = myGameState.whoseTurn
+        myAnts = myInv.ants
+        myTunnels = myInv.getTunnels()
+        myAntHill = myInv.getAnthill()
+        # The clone has the same ants in the same order as currentState,
+        # so they're found with the index of currentState (and then by their position).
+        antIndex = self._ant_index(currentState)
+
+        # If enemy ant is on my anthill or tunnel update capture health
+        ant = antIndex.ant_at(myAntHill.coords)
+        if ant is not None:
+            if ant.player != me:
+                myAntHill.captureHealth -= 1
+
+        # If an ant is built update list of ants
+        antTypes = [WORKER, DRONE, SOLDIER, R_SOLDIER]
+        if move.moveType == BUILD:
+            if move.buildType in antTypes:
+                ant = Ant(myInv.getAnthill().coords, move.buildType, me)
+                myInv.ants.append(ant)
+                # Update food count depending on ant built
+                if move.buildType == WORKER:
+                    myInv.foodCount -= 1
+                elif move.buildType == DRONE or move.buildType == R_SOLDIER:
+                    myInv.foodCount -= 2
+                elif move.buildType == SOLDIER:
+                    myInv.foodCount -= 3
+            # ants are no longer allowed to build tunnels, so this is an error
+            elif move.buildType == TUNNEL:
+                print("Attempted tunnel build in getNextState()")
+                return currentState
+
+        # If an ant is moved update their coordinates and has moved
+        elif move.moveType == MOVE_ANT:
+            newCoord = move.coordList[-1]
+            startingCoord = move.coordList[0]
+            ant = antIndex.ant_at(startingCoord, me)
+            if ant is not None:
+                ant = myAnts[antIndex.position(ant)]
+                ant.coords = newCoord
+                # TODO: should this be set true? Design decision
+                ant.hasMoved = False
+                # Only the cells the ant left and moved to changed, and only a cell it shared
+                # with another ant can change the attack target, so then the clone is indexed.
+                if startingCoord in antIndex.stacked:
+                    antIndex = AntIndex(myGameState)
+                # Attack the first enemy in range (if there is one)
+                foundAnt = antIndex.attack_target(newCoord, UNIT_STATS[ant.type][RANGE], me)
+                if foundAnt is not None:
+                    enemyAnts = myGameState.inventories[1 - me].ants
+                    position = antIndex.position(foundAnt)
+                    foundAnt = enemyAnts[position]
+                    foundAnt.health = foundAnt.health - UNIT_STATS[ant.type][ATTACK]
+                    # If an enemy is attacked and loses all its health
+                    # remove it from the other players
+                    # inventory (the last ant takes its place, see AntIndex.remove)
+                    if foundAnt.health <= 0:
+                        enemyAnts[position] = enemyAnts[-1]
+                        enemyAnts.pop()
+        return myGameState
+
+    def make_move(self, search_state, move, full_rules: bool = False) -> "UndoRecord":
+        """
+        make_move
+
+        In-place version of getNextState: performs the move on search_state itself
+        and records just enough to take it back with unmake_move.
+        The resulting state is identical to the one getNextState returns.
+
+        :param search_state: The GameState to perform the move on (modified in place).
+        :param move: The move to be performed.
+        :param full_rules: If True, the moved ant is marked as moved and END ends the turn
+                           (see _end_turn), like in the real game.
+                           Otherwise END changes nothing, just like in getNextState.
+        :return: The UndoRecord that unmake_move needs to restore search_state.
+        """
+        me = search_state.whoseTurn
+        my_inventory = search_state.inventories[me]
+        undo_record = UndoRecord(me, my_inventory.foodCount)
+
+        # ants are no longer allowed to build tunnels, so nothing changes
+        # (like in getNextState, but without its debugging print on the search's hot path)
+        if move.moveType == BUILD and move.buildType == TUNNEL:
+            return undo_record
+
+        # If enemy ant is on my anthill update capture health
+        my_anthill = my_inventory.getAnthill()
+        ant_index = self._ant_index(search_state)
+        ant = ant_index.ant_at(my_anthill.coords)
+        if ant is not None and ant.player != me:
+            undo_record.anthill = my_anthill
+            undo_record.anthill_capture_health = my_anthill.captureHealth
+            my_anthill.captureHealth -= 1
+
+        # If an ant is built update list of ants and the food count
+        if move.moveType == BUILD:
+            if move.buildType in (WORKER, DRONE, SOLDIER, R_SOLDIER):
+                built_ant = Ant(my_anthill.coords, move.buildType, me)
+                ant_index.append(built_ant)
+                undo_record.built_ant = built_ant
+                if move.buildType == WORKER:
+                    my_inventory.foodCount -= 1
+                elif move.buildType == DRONE or move.buildType == R_SOLDIER:
+                    my_inventory.foodCount -= 2
+                elif move.buildType == SOLDIER:
+                    my_inventory.foodCount -= 3
+
+        # If an ant is moved update its coordinates and attack the first enemy in range
+        elif move.moveType == MOVE_ANT:
+            starting_coord = move.coordList[0]
+            ant = ant_index.ant_at(starting_coord, me)
+            if ant is not None:
+                undo_record.mover = ant
+                undo_record.mover_coords = ant.coords
+                undo_record.mover_has_moved = ant.hasMoved
+                ant.coords = move.coordList[-1]
+                ant.hasMoved = full_rules
+                ant_index.move(ant, starting_coord)
+                found_ant = ant_index.attack_target(ant.coords, UNIT_STATS[ant.type][RANGE], me)
+                if found_ant is not None:
+                    undo_record.victim = found_ant
+                    undo_record.victim_health = found_ant.health
+                    found_ant.health -= UNIT_STATS[ant.type][ATTACK]
+                    if found_ant.health <= 0:
+                        undo_record.victim_index = ant_index.remove(found_ant)
+
+        elif move.moveType == END and full_rules:
+            self._end_turn(search_state, undo_record)
+        return undo_record
+
+    def _end_turn(self, search_state, undo_record: "UndoRecord") -> None:
+        """
+        _end_turn
+
+        Ends the turn like the game does: my workers pick up food they're standing on
+        or drop off food at my anthill or tunnel, my ants can move again,
+        and it becomes the opponent's turn.
+
+        :param search_state: The GameState to end the turn of (modified in place).
+        :param undo_record: The UndoRecord of the END move.
+        """
+        me = search_state.whoseTurn
+        my_inventory = search_state.inventories[me]
+        food_coords = [food.coords for food in getConstrList(search_state, None, (FOOD,))]
+        dropoff_coords = [my_inventory.getAnthill().coords] + \
+                         [tunnel.coords for tunnel in my_inventory.getTunnels()]
+
+        undo_record.ended_turn = True
+        undo_record.turn_ants = []
+        for ant in my_inventory.ants:
+            carrying = ant.carrying
+            if ant.type == WORKER:
+                if not carrying and ant.coords in food_coords:
+                    ant.carrying = True
+                elif carrying and ant.coords in dropoff_coords:
+                    ant.carrying = False
+                    my_inventory.foodCount += 1
+                    undo_record.food_dropped += 1
+            if ant.hasMoved or ant.carrying != carrying:
+                undo_record.turn_ants.append((ant, ant.hasMoved, carrying))
+                ant.hasMoved = False
+        search_state.whoseTurn = 1 - me
+
+    def _ant_index(self, search_state) -> "AntIndex":
+        """
+        _ant_index
+
+        The indexes are kept by the player rather than on the GameStates, and only until
+        the next getMove call, so a state the game changed in between is indexed again.
+        They're keyed weakly: an index goes away with its state (and never outlives it
+        to be found by a new state with the same id).
+
+        :param search_state: A GameState (changed only by make_move and unmake_move
+                             since the start of the getMove call).
+        :return: The AntIndex of the state (created the first time it's needed).
+        """
+        state_id = id(search_state)
+        entry = self._ant_indexes.get(state_id)
+        if entry is not None and entry[0]() is search_state:
+            return entry[1]
+        ant_indexes = self._ant_indexes
+
+        def forget(state_ref: weakref.ref) -> None:
+            # Only if the entry is still the one of the dead state.
+            if ant_indexes.get(state_id, (None,))[0] is state_ref:
+                del ant_indexes[state_id]
+
+        ant_index = AntIndex(search_state)
+        ant_indexes[state_id] = (weakref.ref(search_state, forget), ant_index)
+        return ant_index
+
+    def unmake_move(self, search_state, undo_record: "UndoRecord") -> None:
+        """
+        unmake_move
+
+        Takes back a move made by make_move, restoring search_state exactly
+        (including the order of the ant lists).
+
+        :param search_state: The GameState the move was performed on.
+        :param undo_record: The UndoRecord returned by make_move.
+        """
+        if undo_record.ended_turn:
+            search_state.whoseTurn = undo_record.player
+            for ant, has_moved, carrying in undo_record.turn_ants:
+                ant.hasMoved = has_moved
+                ant.carrying = carrying
+        ant_index = self._ant_index(search_state)
+        if undo_record.victim is not None:
+            if undo_record.victim_index is not None:
+                ant_index.restore(undo_record.victim, undo_record.victim_index)
+            undo_record.victim.health = undo_record.victim_health
+        if undo_record.mover is not None:
+            moved_coords = undo_record.mover.coords
+            undo_record.mover.coords = undo_record.mover_coords
+            undo_record.mover.hasMoved = undo_record.mover_has_moved
+            ant_index.move(undo_record.mover, moved_coords)
+        if undo_record.built_ant is not None:
+            ant_index.pop(undo_record.built_ant)
+        if undo_record.anthill is not None:
+            undo_record.anthill.captureHealth = undo_record.anthill_capture_health
+        search_state.inventories[undo_record.player].foodCount = undo_record.food_count
+
+
+class AntIndex:
+    """
+    AntIndex
+
+    The ant on every occupied cell of a GameState and the position of every ant
+    in its ant list, so finding the ant at some coords (the attack target of a move,
+    the ant on my anthill) doesn't scan the ant lists the way getAntAt does,
+    and neither does taking a killed ant out of its list (see remove).
+    Like getAntAt, the first ant in getAntList wins when ants share a cell;
+    the cells that hold more than one ant are rescanned whenever they change.
+    make_move and unmake_move keep the index of a state up to date
+    (see AIPlayer._ant_index), so a state that has been changed any other way
+    needs a new index. The index only holds the ant lists of the state, not the state.
+    """
+    __slots__ = ("ant_lists", "cells", "stacked", "positions")
+
+    def __init__(self, current_state: GameState):
+        """
+        __init__
+
+        Indexes the ants of a GameState.
+
+        :param current_state: The GameState to index.
+        """
+        self.ant_lists: Tuple[List[Ant], List[Ant]] = (current_state.inventories[PLAYER_ONE].ants,
+                                                       current_state.inventories[PLAYER_TWO].ants)
+        self.cells: Dict[tuple, Ant] = {}
+        self.stacked = set()
+        # The position of each ant in its ant list, by its id.
+        self.positions: Dict[int, int] = {}
+        for ants in self.ant_lists:
+            for position, ant in enumerate(ants):
+                self.positions[id(ant)] = position
+                if ant.coords in self.cells:
+                    self.stacked.add(ant.coords)
+                else:
+                    self.cells[ant.coords] = ant
+
+    def ant_at(self, coords: tuple, player: Optional[int] = None) -> Optional[Ant]:
+        """
+        ant_at
+
+        :param coords: The coords to look at.
+        :param player: If given, only that player's ants count.
+        :return: The ant at the coords (the same one getAntAt returns), or None.
+        """
+        ant = self.cells.get(coords)
+        if player is None or ant is None or (ant.player == player and
+                                             coords not in self.stacked):
+            return ant
+        for other_ant in self.ant_lists[player]:
+            if other_ant.coords == coords:
+                return other_ant
+        return None
+
+    def position(self, ant: Ant) -> int:
+        """
+        position
+
+        :param ant: An indexed ant.
+        :return: Its position in its ant list.
+        """
+        return self.positions[id(ant)]
+
+    def attack_target(self, coords: tuple, attack_range: int, player: int) -> Optional[Ant]:
+        """
+        attack_target
+
+        :param coords: The coords of the ant that just moved.
+        :param attack_range: Its range.
+        :param player: The player that owns it.
+        :return: The first enemy ant in its range (in the order of ATTACKABLE_TABLE), or None.
+        """
+        cells = self.cells
+        for target_coords in ATTACKABLE_TABLE[(coords, attack_range)]:
+            ant = cells.get(target_coords)
+            if ant is not None and ant.player != player:
+                return ant
+        return None
+
+    def append(self, ant: Ant) -> None:
+        """
+        append
+
+        Puts a new ant at the end of its ant list.
+
+        :param ant: The ant.
+        """
+        ants = self.ant_lists[ant.player]
+        self.positions[id(ant)] = len(ants)
+        ants.append(ant)
+        self._occupy(ant)
+
+    def pop(self, ant: Ant) -> None:
+        """
+        pop
+
+        Takes back append.
+
+        :param ant: The last ant in its ant list.
+        """
+        self.ant_lists[ant.player].pop()
+        del self.positions[id(ant)]
+        self._vacate(ant, ant.coords)
+
+    def remove(self, ant: Ant) -> int:
+        """
+        remove
+
+        Takes an ant out of its ant list in constant time: the last ant in the list
+        takes its place. Nothing the search does depends on the order of the ant lists
+        (see ZobristHasher), and restore puts it back.
+
+        :param ant: The ant.
+        :return: The position it had.
+        """
+        ants = self.ant_lists[ant.player]
+        position = self.positions.pop(id(ant))
+        last_ant = ants.pop()
+        if last_ant is not ant:
+            ants[position] = last_ant
+            self.positions[id(last_ant)] = position
+        self._vacate(ant, ant.coords)
+        return position
+
+    def restore(self, ant: Ant, position: int) -> None:
+        """
+        restore
+
+        Takes back remove, restoring the order of the ant list.
+
+        :param ant: The ant that was removed.
+        :param position: The position remove returned.
+        """
+        ants = self.ant_lists[ant.player]
+        if position == len(ants):
+            ants.append(ant)
+        else:
+            ants.append(ants[position])
+            self.positions[id(ants[position])] = len(ants) - 1
+            ants[position] = ant
+        self.positions[id(ant)] = position
+        self._occupy(ant)
+
+    def move(self, ant: Ant, old_coords: tuple) -> None:
+        """
+        move
+
+        :param ant: An ant whose coords were just changed.
+        :param old_coords: Its coords before the move.
+        """
+        self._vacate(ant, old_coords)
+        self._occupy(ant)
+
+    def _occupy(self, ant: Ant) -> None:
+        """
+        _occupy
+
+        :param ant: An ant that is now on its cell.
+        """
+        occupant = self.cells.get(ant.coords)
+        if occupant is None:
+            self.cells[ant.coords] = ant
+        elif occupant is not ant:
+            self._rescan(ant.coords)
+
+    def _vacate(self, ant: Ant, coords: tuple) -> None:
+        """
+        _vacate
+
+        :param ant: An ant that is no longer on the cell.
+        :param coords: The coords of the cell.
+        """
+        if coords in self.stacked or self.cells.get(coords) is not ant:
+            self._rescan(coords)
+        else:
+            del self.cells[coords]
+
+    def _rescan(self, coords: tuple) -> None:
+        """
+        _rescan
+
+        Finds the ants on a cell the slow way (for cells that hold more than one ant).
+
+        :param coords: The coords of the cell.
+        """
+        ants = [ant for ants in self.ant_lists for ant in ants if ant.coords == coords]
+        if ants:
+            self.cells[coords] = ants[0]
+        else:
+            self.cells.pop(coords, None)
+        if len(ants) > 1:
+            self.stacked.add(coords)
+        else:
+            self.stacked.discard(coords)
+
+
+class SearchTimeout(Exception):
+    """
+    SearchTimeout
+
+    Raised inside the search when the time budget of the current getMove call runs out.
+    """
+    pass
+
+
+class UndoRecord:
+    """
+    UndoRecord
+
+    The undo log of a single make_move call.
+    Only the pieces a move can touch are recorded:
+    the moved ant, the attacked (or killed) ant, my anthill, a built ant and my food count.
+    An END move made with the full rules also records the turn and, for each of my ants
+    it changed, the (ant, hasMoved, carrying) it had before.
+    """
+    __slots__ = ("player", "food_count", "mover", "mover_coords", "mover_has_moved",
+                 "victim", "victim_health", "victim_index", "anthill",
+                 "anthill_capture_health", "built_ant", "ended_turn", "turn_ants",
+                 "food_dropped")
+
+    def __init__(self, player: int, food_count: int):
+        """
+        __init__
+
+        Creates a new, empty UndoRecord.
+
+        :param player: The player that made the move.
+        :param food_count: The player's food count before the move.
+        """
+        self.player = player
+        self.food_count = food_count
+        self.mover: Optional[Ant] = None
+        self.mover_coords = None
+        self.mover_has_moved = False
+        self.victim: Optional[Ant] = None
+        self.victim_health = 0
+        self.victim_index: Optional[int] = None
+        self.anthill: Optional[Construction] = None
+        self.anthill_capture_health = 0
+        self.built_ant: Optional[Ant] = None
+        self.ended_turn = False
+        self.turn_ants: Optional[List[tuple]] = None
+        self.food_dropped = 0
+
+
+class EvalWeights:
+    """
+    EvalWeights
+
+    The weights of evaluate_game_state: the reward for a worker or drone at each
+    distance in DIST_REWARDS, the rewards for being further away than that,
+    and the two penalties. The defaults are the module constants.
+    As a vector (see to_vector) they line up with AIPlayer.evaluation_features.
+    """
+    NAMES = tuple(["dist_%d" % dist for dist in sorted(DIST_REWARDS)] +
+                  ["default_worker_reward", "default_drone_reward",
+                   "anthill_blocker_penalty", "one_enemy_worker_penalty"])
+
+    def __init__(self, dist_rewards: Optional[Dict[int, float]] = None,
+                 default_worker_reward: float = DEFAULT_WORKER_REWARD,
+                 default_drone_reward: float = DEFAULT_DRONE_REWARD,
+                 anthill_blocker_penalty: float = ANTHILL_BLOCKER_PENALTY,
+                 one_enemy_worker_penalty: float = ONE_ENEMY_WORKER_PENALTY):
+        """
+        __init__
+
+        Creates new EvalWeights.
+
+        :param dist_rewards: The reward at each distance (DIST_REWARDS if None).
+        :param default_worker_reward: The reward for a worker further away than that.
+        :param default_drone_reward: The reward for a drone further away than that.
+        :param anthill_blocker_penalty: The penalty for something besides a worker
+                                        being on my anthill.
+        :param one_enemy_worker_penalty: The penalty for the enemy having one worker.
+        """
+        self.dist_rewards = dict(DIST_REWARDS if dist_rewards is None else dist_rewards)
+        self.default_worker_reward = default_worker_reward
+        self.default_drone_reward = default_drone_reward
+        self.anthill_blocker_penalty = anthill_blocker_penalty
+        self.one_enemy_worker_penalty = one_enemy_worker_penalty
+
+    def worker_rewards(self, route_distances: bool = False) -> List[float]:
+        """
+        worker_rewards
+
+        The distances past the last one in dist_rewards get default_worker_reward,
+        unless they're route costs (see AIPlayer route_distances): then a detour around
+        the grass can take a worker past the last distance, and default_worker_reward
+        (which pays better than the last distances by default) would reward the detour,
+        so they get the reward of the last distance instead.
+        The drones ignore grass, so their route costs are the same as approxDist.
+
+        :param route_distances: Whether the distances are route costs.
+        :return: The rewards for the worker, indexed by distance.
+        """
+        last_dist = max(self.dist_rewards)
+        rewards = [self.dist_rewards.get(dist, self.default_worker_reward)
+                   for dist in range(MAX_DIST + 1)]
+        if route_distances:
+            rewards[last_dist + 1:] = [rewards[last_dist]] * (MAX_DIST - last_dist)
+        return rewards
+
+    def drone_rewards(self) -> List[float]:
+        """
+        drone_rewards
+
+        :return: The rewards for the drone, indexed by distance.
+        """
+        return [self.dist_rewards.get(dist, self.default_drone_reward)
+                for dist in range(MAX_DIST + 1)]
+
+    def to_vector(self) -> List[float]:
+        """
+        to_vector
+
+        :return: The weights in the order of NAMES.
+        """
+        return [self.dist_rewards[dist] for dist in sorted(self.dist_rewards)] + \
+            [self.default_worker_reward, self.default_drone_reward,
+             self.anthill_blocker_penalty, self.one_enemy_worker_penalty]
+
+    @classmethod
+    def from_vector(cls, vector: List[float]) -> "EvalWeights":
+        """
+        from_vector
+
+        :param vector: The weights in the order of NAMES.
+        :return: The EvalWeights.
+        """
+        num_dists = len(cls.NAMES) - 4
+        return cls(dict(enumerate(vector[:num_dists])), *vector[num_dists:])
+
+    def to_dict(self) -> Dict[str, float]:
+        """
+        to_dict
+
+        :return: The weights keyed by their NAMES.
+        """
+        return dict(zip(self.NAMES, self.to_vector()))
+
+    @classmethod
+    def from_dict(cls, weights: Dict[str, float]) -> "EvalWeights":
+        """
+        from_dict
+
+        :param weights: The weights keyed by their NAMES (missing ones get the defaults).
+        :return: The EvalWeights.
+        """
+        defaults = cls().to_dict()
+        return cls.from_vector([weights.get(name, defaults[name]) for name in cls.NAMES])
+
+    @classmethod
+    def load(cls, path: str) -> "EvalWeights":
+        """
+        load
+
+        :param path: The path of a weights file (JSON, see save).
+        :return: The EvalWeights.
+        """
+        import json
+        with open(path) as weights_file:
+            return cls.from_dict(json.load(weights_file))
+
+    def save(self, path: str) -> None:
+        """
+        save
+
+        :param path: The path of the weights file.
+        """
+        import json
+        with open(path, "w") as weights_file:
+            json.dump(self.to_dict(), weights_file, indent=2)
+
+
+class EvaluationTerms:
+    """
+    EvaluationTerms
+
+    evaluate_game_state split into its terms:
+    the distance of each of my workers from its food or dropoff
+    (see AIPlayer._worker_distance), the distance of each of my drones from the enemy worker
+    (see AIPlayer._drone_distance), and the global terms (unwanted conditions,
+    something blocking my anthill, the enemy having one worker, and the winner).
+    A move only changes a few of these, so the score of a child can be found
+    by swapping in the new terms and adding them up again (see _incremental_evaluation).
+    """
+    __slots__ = ("me", "geometry", "weights", "worker_rewards", "drone_rewards", "winner",
+                 "unwanted", "blocked_anthill", "workers", "worker_dists", "drones",
+                 "drone_dists", "enemy_worker_coords")
+
+    def __init__(self, me: int, geometry: "StaticGeometry", weights: "EvalWeights",
+                 worker_rewards: List[float], drone_rewards: List[float]):
+        """
+        __init__
+
+        Creates new, empty EvaluationTerms (see AIPlayer._evaluation_terms).
+
+        :param me: The player the state is scored for.
+        :param geometry: The StaticGeometry of the state.
+        :param weights: The weights of the evaluation (for the penalties).
+        :param worker_rewards: The rewards and punishments for the worker, indexed by distance.
+        :param drone_rewards: The rewards and punishments for the drone, indexed by distance.
+        """
+        self.me = me
+        self.geometry = geometry
+        self.weights = weights
+        self.worker_rewards = worker_rewards
+        self.drone_rewards = drone_rewards
+        self.winner: Optional[int] = None
+        self.unwanted = False
+        self.blocked_anthill = False
+        # My workers and drones (the Ants), and their distances in the same order.
+        self.workers: List[Ant] = []
+        self.worker_dists: List[int] = []
+        self.drones: List[Ant] = []
+        self.drone_dists: List[int] = []
+        self.enemy_worker_coords: Optional[tuple] = None
+
+    def evaluation(self) -> float:
+        """
+        evaluation
+
+        :return: The evaluation score of the state the terms are for.
+        """
+        return self.score(self.blocked_anthill, self.worker_dists, self.drone_dists)
+
+    def score(self, blocked_anthill: bool, worker_dists: List[int],
+              drone_dists: List[int]) -> float:
+        """
+        score
+
+        Adds the terms up: the rewards for gathering food, then the rewards for killing
+        the enemy workers, and the result is clamped (or replaced by the score of the winner).
+        This is the only place the score of a state is worked out.
+
+        :param blocked_anthill: Whether something besides a worker is on my anthill.
+        :param worker_dists: The distances of my workers.
+        :param drone_dists: The distances of my drones.
+        :return: The evaluation score (float)
+        """
+        if self.unwanted:
+            return -0.99
+
+        gather_food_score = 0.0
+        if blocked_anthill:
+            gather_food_score -= self.weights.anthill_blocker_penalty
+        worker_rewards = self.worker_rewards
+        for dist in worker_dists:
+            gather_food_score += worker_rewards[dist]
+
+        kill_enemy_workers_score = 0.0
+        if self.enemy_worker_coords is not None:
+            kill_enemy_workers_score -= self.weights.one_enemy_worker_penalty
+            drone_rewards = self.drone_rewards
+            for dist in drone_dists:
+                kill_enemy_workers_score += drone_rewards[dist]
+
+        evaluation_score = 0.0
+        evaluation_score += gather_food_score
+        evaluation_score += kill_enemy_workers_score
+
+        if self.winner == 1:
+            return 1.0
+        elif self.winner == 0:
+            return -1.0
+        if evaluation_score >= 1.0:
+            return 0.99
+        elif evaluation_score <= -1.0:
+            return -0.99
+        return evaluation_score
+
+
+class Node:
+    __slots__ = ("move", "state", "state_evaluation", "state_hash")
+
+    def __init__(self, move: Move, state: GameState, state_evaluation: float,
+                 state_hash: Tuple[int, int] = None):
+        """
+        Node
+
+        Class that represents a single node in the search tree.
+
+        :param move: The move that is taken from the parent node to the current node.
+        :param state: The resulting state of the move.
+        :param state_evaluation: The state evaluation score for the node.
+        :param state_hash: The (position, moved) hash pair of the state (see ZobristHasher).
+        """
+        self.move = move
+        self.state = state
+        self.state_evaluation = state_evaluation
+        self.state_hash = state_hash
+
+
+class MCTSNode:
+    """
+    MCTSNode
+
+    A node of the Monte Carlo search tree (see AIPlayer.monte_carlo_search).
+    The total score is from the root player's point of view.
+    """
+    __slots__ = ("move", "player", "children", "untried_moves", "visits", "total_score")
+
+    def __init__(self, move: Optional[Move], player: int):
+        """
+        __init__
+
+        Creates a new, unvisited MCTSNode.
+
+        :param move: The move that leads to the node (None for the root).
+        :param player: The player whose turn it is in the node.
+        """
+        self.move = move
+        self.player = player
+        self.children: List[MCTSNode] = []
+        # Not generated yet (None), then the moves still to expand (the next one last).
+        self.untried_moves: Optional[List[Move]] = None
+        self.visits = 0
+        self.total_score = 0.0
+
+
+class NodePool:
+    """
+    NodePool
+
+    Spare Nodes for the search to reuse, so a turn doesn't allocate a new Node for every
+    child it creates. The search releases a level's children when the level returns;
+    at most max_free spare Nodes are kept.
+    """
+    def __init__(self, max_free: int):
+        """
+        __init__
+
+        Creates a new, empty NodePool.
+
+        :param max_free: The max number of spare Nodes kept.
+        """
+        self.max_free = max_free
+        self._free: List[Node] = []
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self, move: Move, state: Optional[GameState], state_evaluation: Optional[float],
+                state_hash: Tuple[int, int] = None) -> Node:
+        """
+        acquire
+
+        :param move: The move that is taken from the parent node to the current node.
+        :param state: The resulting state of the move (None if it isn't kept).
+        :param state_evaluation: The state evaluation score for the node.
+        :param state_hash: The (position, moved) hash pair of the state.
+        :return: A spare Node (or a new one) set to the given values.
+        """
+        if not self._free:
+            return Node(move, state, state_evaluation, state_hash)
+        node = self._free.pop()
+        node.move = move
+        node.state = state
+        node.state_evaluation = state_evaluation
+        node.state_hash = state_hash
+        return node
+
+    def release(self, nodes: List[Node]) -> None:
+        """
+        release
+
+        Gives Nodes back to the pool. They must not be used after this.
+
+        :param nodes: The Nodes to give back.
+        """
+        room = self.max_free - len(self._free)
+        for node in nodes[:room]:
+            node.move = node.state = node.state_hash = None
+        self._free.extend(nodes[:room])
+
+
+class ZobristHasher:
+    """
+    ZobristHasher
+
+    Hashes a GameState by XOR-ing together a 64-bit key for every piece in it
+    (ants, constructions, food counts and whoseTurn).
+    The keys are derived from the pieces themselves instead of a random generator,
+    so the same position hashes to the same value in every process.
+
+    Two hashes are kept apart:
+    the position hash covers everything evaluate_game_state depends on,
+    and the moved hash covers the hasMoved flags, which only matter for move generation.
+    """
+    def __init__(self):
+        """
+        __init__
+
+        Creates a new ZobristHasher with an empty key cache.
+        """
+        self._keys: Dict[tuple, int] = {}
+
+    def _key(self, *parts) -> int:
+        """
+        _key
+
+        :param parts: The values that identify a piece.
+        :return: The 64-bit key for the piece.
+        """
+        key = self._keys.get(parts)
+        if key is None:
+            import hashlib
+            digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+            key = int.from_bytes(digest, "little")
+            self._keys[parts] = key
+        return key
+
+    def _ant_key(self, ant: Ant) -> int:
+        return self._key("ant", ant.player, ant.type, ant.coords, ant.health, ant.carrying)
+
+    def _moved_key(self, ant: Ant) -> int:
+        return self._key("moved", ant.coords) if ant.hasMoved else 0
+
+    def _constr_key(self, constr: Construction) -> int:
+        return self._key("constr", constr.type, constr.coords, constr.captureHealth,
+                         getattr(constr, "player", None))
+
+    def switch_turn(self, position_hash: int, whose_turn: int) -> int:
+        """
+        switch_turn
+
+        :param position_hash: The position hash of a state.
+        :param whose_turn: The player whose turn it is in the state.
+        :return: The position hash of the same state with the other player to move.
+        """
+        return position_hash ^ self._key("turn", whose_turn) ^ self._key("turn", 1 - whose_turn)
+
+    def hash_state(self, current_state: GameState) -> Tuple[int, int]:
+        """
+        hash_state
+
+        Hashes a state from scratch.
+
+        :param current_state: The GameState to hash.
+        :return: The (position hash, moved hash) pair.
+        """
+        position_hash = self._key("turn", current_state.whoseTurn)
+        moved_hash = 0
+        for inventory in current_state.inventories:
+            for ant in inventory.ants:
+                position_hash ^= self._ant_key(ant)
+                moved_hash ^= self._moved_key(ant)
+            for constr in inventory.constrs:
+                position_hash ^= self._constr_key(constr)
+        for player in (PLAYER_ONE, PLAYER_TWO):
+            position_hash ^= self._key("food", player, current_state.inventories[player].foodCount)
+        return position_hash, moved_hash
+
+    def hash_opening(self, current_state: GameState) -> Tuple[int, bool]:
+        """
+        hash_opening
+
+        Hashes only what the best move early in the game depends on, so positions
+        that only differ where the enemy can't matter yet share a hash (see OpeningBook):
+        my ants (with their hasMoved flags), anthill, tunnel and food count, the grass and
+        the enemy ants on my half of the board, the food my workers go for
+        (see StaticGeometry.closest_food), and the enemy worker my drones go for.
+        The coords are seen from my side of the board (rows 0 to 3), so both players
+        share the same hashes.
+
+        :param current_state: The GameState to hash (for the player whose turn it is).
+        :return: The hash, and whether the board was flipped to see it from my side.
+        """
+        me = current_state.whoseTurn
+        geometry = StaticGeometry.from_game_state(current_state)
+        flipped = geometry.anthill_coords[me] is not None and \
+            geometry.anthill_coords[me][1] not in MY_SETUP_ROWS
+
+        def seen(coords: tuple) -> tuple:
+            return _flip_coords(coords) if flipped else coords
+
+        key = self._key
+        opening_hash = key("opening food", current_state.inventories[me].foodCount) ^ \
+            key("opening target", seen(geometry.closest_food[me])
+                if geometry.closest_food[me] is not None else None)
+        for constr in current_state.inventories[me].constrs:
+            opening_hash ^= key("opening constr", constr.type, seen(constr.coords),
+                                constr.captureHealth)
+        for coords in geometry.grass_coords:
+            if seen(coords)[1] < BOARD_LENGTH // 2:
+                opening_hash ^= key("opening grass", seen(coords))
+
+        has_drone = False
+        for ant in current_state.inventories[me].ants:
+            opening_hash ^= key("opening ant", True, ant.type, seen(ant.coords), ant.health,
+                                ant.carrying, ant.hasMoved)
+            has_drone = has_drone or ant.type == DRONE
+        enemy_workers = []
+        for ant in current_state.inventories[1 - me].ants:
+            if seen(ant.coords)[1] < BOARD_LENGTH // 2:
+                opening_hash ^= key("opening ant", False, ant.type, seen(ant.coords),
+                                    ant.health, ant.carrying)
+            if ant.type == WORKER:
+                enemy_workers.append(ant)
+        # My drones only chase the enemy worker if there is exactly one.
+        if has_drone and len(enemy_workers) == 1:
+            opening_hash ^= key("opening prey", seen(enemy_workers[0].coords))
+        return opening_hash, flipped
+
+    def hash_move(self, parent_hash: Tuple[int, int],
+                  undo_record: UndoRecord) -> Tuple[int, int]:
+        """
+        hash_move
+
+        Incrementally hashes the state right after make_move.
+        Only the pieces listed in the undo record are XOR-ed out and back in.
+
+        :param parent_hash: The (position hash, moved hash) pair of the state before the move.
+        :param undo_record: The UndoRecord returned by make_move.
+        :return: The (position hash, moved hash) pair of the state after the move.
+        """
+        position_hash, moved_hash = parent_hash
+        key = self._key
+
+        mover = undo_record.mover
+        if mover is not None:
+            position_hash ^= key("ant", mover.player, mover.type, undo_record.mover_coords,
+                                 mover.health, mover.carrying) ^ self._ant_key(mover)
+            if undo_record.mover_has_moved:
+                moved_hash ^= key("moved", undo_record.mover_coords)
+            moved_hash ^= self._moved_key(mover)
+
+        victim = undo_record.victim
+        if victim is not None:
+            position_hash ^= key("ant", victim.player, victim.type, victim.coords,
+                                 undo_record.victim_health, victim.carrying)
+            if undo_record.victim_index is None:
+                position_hash ^= self._ant_key(victim)
+            else:
+                moved_hash ^= self._moved_key(victim)
+
+        anthill = undo_record.anthill
+        if anthill is not None:
+            position_hash ^= key("constr", anthill.type, anthill.coords,
+                                 undo_record.anthill_capture_health,
+                                 getattr(anthill, "player", None)) ^ self._constr_key(anthill)
+
+        built_ant = undo_record.built_ant
+        if built_ant is not None:
+            position_hash ^= self._ant_key(built_ant)
+            moved_hash ^= self._moved_key(built_ant)
+            position_hash ^= key("food", undo_record.player, undo_record.food_count)
+            position_hash ^= key("food", undo_record.player, undo_record.food_count -
+                                 UNIT_STATS[built_ant.type][COST])
+
+        if undo_record.ended_turn:
+            position_hash = self.switch_turn(position_hash, undo_record.player)
+            for ant, has_moved, carrying in undo_record.turn_ants:
+                if has_moved:
+                    moved_hash ^= key("moved", ant.coords)
+                if carrying != ant.carrying:
+                    position_hash ^= key("ant", ant.player, ant.type, ant.coords, ant.health,
+                                         carrying) ^ self._ant_key(ant)
+            if undo_record.food_dropped:
+                position_hash ^= key("food", undo_record.player, undo_record.food_count)
+                position_hash ^= key("food", undo_record.player,
+                                     undo_record.food_count + undo_record.food_dropped)
+        return position_hash, moved_hash
+
+
+class TranspositionTable:
+    """
+    TranspositionTable
+
+    A bounded cache from hash keys to search results.
+    When the table is full, the least recently used entry is evicted.
+    Hits and misses are counted so the cache can be tuned.
+    """
+    def __init__(self, max_entries: int):
+        """
+        __init__
+
+        Creates a new, empty TranspositionTable.
+
+        :param max_entries: The max number of entries kept before evicting.
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable):
+        """
+        get
+
+        :param key: The key to look up.
+        :return: The cached value, or None on a miss.
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value) -> None:
+        """
+        put
+
+        Stores a value, evicting the least recently used entry if the table is full.
+
+        :param key: The key to store the value under.
+        :param value: The value to store (must not be None).
+        """
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        clear
+
+        Removes all entries (the counters are kept).
+        """
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        hit_rate
+
+        :return: The fraction of lookups that were hits (0.0 if there were no lookups).
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        stats
+
+        :return: The counters of the table as a dictionary.
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate
+        }
+
+
+class SearchProfile:
+    """
+    SearchProfile
+
+    The statistics collected during a single profiled getMove call:
+    the seconds spent in each phase of expanding nodes ("move_generation",
+    "children" for making, hashing and incrementally scoring the moves, and "evaluation"
+    for the full evaluation of the rest), the number of expansions and children at each
+    depth, and the best move found in each searched position (keyed by its full hash).
+    """
+    __slots__ = ("phase_times", "expansions", "children", "best_moves", "_lap_start")
+
+    def __init__(self):
+        """
+        __init__
+
+        Creates a new, empty SearchProfile.
+        """
+        self.phase_times: Dict[str, float] = {}
+        self.expansions: Dict[int, int] = {}
+        self.children: Dict[int, int] = {}
+        self.best_moves: Dict[int, Move] = {}
+        self._lap_start = 0.0
+
+    def start_lap(self) -> None:
+        """
+        start_lap
+
+        Starts timing a phase.
+        """
+        self._lap_start = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """
+        lap
+
+        Adds the time since the last lap (or start_lap) to a phase, and starts the next one.
+
+        :param phase: The name of the phase that just finished.
+        """
+        lap_end = time.perf_counter()
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + lap_end - self._lap_start
+        self._lap_start = lap_end
+
+    def record_expansion(self, depth: int, num_children: int) -> None:
+        """
+        record_expansion
+
+        :param depth: The depth of the expanded position.
+        :param num_children: The number of its children that were created (or searched).
+        """
+        self.expansions[depth] = self.expansions.get(depth, 0) + 1
+        self.children[depth] = self.children.get(depth, 0) + num_children
+
+
+class SearchTree:
+    """
+    SearchTree
+
+    The expanded nodes of the beam search, kept between getMove calls.
+    For every expanded position it stores the children's moves, hashes and evaluation
+    scores, so the subtree under the move that was actually played can be searched again
+    next turn without generating, making or scoring its moves.
+
+    In the real game the ant that was just moved has hasMoved set (the search never sets
+    it), so positions are matched by their position hash, and a stored expansion is reused
+    as long as every ant that had moved then has still moved now.
+    The children of the ants that have moved since are dropped, which leaves exactly
+    the moves (in the same order) that listAllLegalMoves would give.
+
+    The number of stored child nodes is capped; the least recently used expansions
+    (usually the parts of the tree that weren't played) are evicted first.
+    """
+    def __init__(self, max_nodes: int):
+        """
+        __init__
+
+        Creates a new, empty SearchTree.
+
+        :param max_nodes: The max number of child nodes kept before evicting.
+        """
+        self.max_nodes = max_nodes
+        self.num_nodes = 0
+        # position hash -> (moved hash, moved coords, [(move, child hash pair, score)])
+        self._expansions: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._expansions)
+
+    @staticmethod
+    def _moved_coords(search_state) -> frozenset:
+        """
+        _moved_coords
+
+        :param search_state: A GameState.
+        :return: The coords of the ants of the current player that have moved.
+        """
+        my_ants = search_state.inventories[search_state.whoseTurn].ants
+        return frozenset(ant.coords for ant in my_ants if ant.hasMoved)
+
+    def get(self, search_state, state_hash: Tuple[int, int],
+            node_pool: Optional["NodePool"] = None) -> Optional[List["Node"]]:
+        """
+        get
+
+        :param search_state: The GameState to look up.
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :param node_pool: The NodePool to take the new nodes from (if any).
+        :return: New child nodes of search_state (in the order of listAllLegalMoves),
+                 or None if it hasn't been expanded.
+        """
+        new_node = node_pool.acquire if node_pool is not None else Node
+        expansion = self._expansions.get(state_hash[0])
+        if expansion is None:
+            self.misses += 1
+            return None
+        stored_moved_hash, stored_moved_coords, children = expansion
+
+        if stored_moved_hash == state_hash[1]:
+            nodes = [new_node(move, None, score, child_hash)
+                     for move, child_hash, score in children]
+        else:
+            moved_coords = self._moved_coords(search_state)
+            if not stored_moved_coords <= moved_coords:
+                self.misses += 1
+                return None
+            # The children's moved hashes change by the same ants as the parent's.
+            moved_delta = stored_moved_hash ^ state_hash[1]
+            nodes = [new_node(move, None, score, (child_hash[0], child_hash[1] ^ moved_delta))
+                     for move, child_hash, score in children
+                     if move.moveType != MOVE_ANT or move.coordList[0] not in moved_coords]
+        self.hits += 1
+        self._expansions.move_to_end(state_hash[0])
+        return nodes
+
+    def put(self, search_state, state_hash: Tuple[int, int], nodes: List["Node"]) -> None:
+        """
+        put
+
+        Stores the expansion of a position, evicting the least recently used expansions
+        if there are too many nodes.
+
+        :param search_state: The GameState that was expanded.
+        :param state_hash: The (position, moved) hash pair of search_state.
+        :param nodes: The scored child nodes of search_state.
+        """
+        if len(nodes) > self.max_nodes:
+            return
+        old_expansion = self._expansions.pop(state_hash[0], None)
+        if old_expansion is not None:
+            self.num_nodes -= len(old_expansion[2])
+        self._expansions[state_hash[0]] = (
+            state_hash[1], self._moved_coords(search_state),
+            [(node.move, node.state_hash, node.state_evaluation) for node in nodes])
+        self.num_nodes += len(nodes)
+        while self.num_nodes > self.max_nodes:
+            self.num_nodes -= len(self._expansions.popitem(last=False)[1][2])
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        clear
+
+        Removes all expansions (the counters are kept).
+        """
+        self._expansions.clear()
+        self.num_nodes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        stats
+
+        :return: The counters of the tree as a dictionary.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._expansions),
+            "nodes": self.num_nodes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class SearchState:
+    """
+    SearchState
+
+    Compact, search-only encoding of a GameState.
+    Everything is stored as plain values in per-player lists, built in a single pass
+    over the inventories, instead of Ant and Construction objects:
+
+    - ant_coords, ant_types, ant_health, ant_carrying, ant_moved: one entry per ant,
+      in the order of the player's inventory.
+    - type_index[player][ant type]: the indices of the player's ants of that type,
+      so getting e.g. my workers is a constant-time lookup.
+    - anthill_coords, tunnel_coords (+ capture health), food_coords and grass_coords.
+    - geometry: the StaticGeometry (distance grids etc.) of the food, anthills and tunnels.
+
+    Conversion in both directions only depends on the number of pieces (not the board size).
+    """
+    __slots__ = ("whose_turn", "phase", "food_counts", "ant_coords", "ant_types", "ant_health",
+                 "ant_carrying", "ant_moved", "type_index", "occupied", "anthill_coords",
+                 "anthill_capture_health", "tunnel_coords", "tunnel_capture_health",
+                 "food_coords", "grass_coords", "geometry")
+    # The slots a pickled SearchState keeps (see __getstate__).
+    PICKLED_SLOTS = __slots__[:-1]
+
+    def __init__(self, whose_turn: int, phase: int):
+        """
+        __init__
+
+        Creates a new, empty SearchState (use from_game_state to fill one in).
+
+        :param whose_turn: The player whose turn it is.
+        :param phase: The phase of the game.
+        """
+        self.whose_turn = whose_turn
+        self.phase = phase
+        self.food_counts = [0, 0]
+        self.ant_coords: List[List[tuple]] = [[], []]
+        self.ant_types: List[List[int]] = [[], []]
+        self.ant_health: List[List[int]] = [[], []]
+        self.ant_carrying: List[List[bool]] = [[], []]
+        self.ant_moved: List[List[bool]] = [[], []]
+        self.type_index: List[List[List[int]]] = [[[] for _ in range(R_SOLDIER + 1)]
+                                                  for _ in range(2)]
+        self.occupied: Dict[tuple, Tuple[int, int]] = {}
+        self.anthill_coords: List[Optional[tuple]] = [None, None]
+        self.anthill_capture_health = [0, 0]
+        self.tunnel_coords: List[Optional[tuple]] = [None, None]
+        self.tunnel_capture_health = [0, 0]
+        self.food_coords: List[tuple] = []
+        self.grass_coords: List[tuple] = []
+        self.geometry: Optional[StaticGeometry] = None
+
+    def __getstate__(self) -> tuple:
+        """
+        __getstate__
+
+        A pickled SearchState (like the ones sent to the workers of the parallel search)
+        leaves out its geometry, which is bigger than the rest of the state put together.
+
+        :return: The values of every slot but geometry.
+        """
+        return tuple(getattr(self, name) for name in SearchState.PICKLED_SLOTS)
+
+    def __setstate__(self, state: tuple) -> None:
+        """
+        __setstate__
+
+        Rebuilds the geometry of an unpickled SearchState (cached per layout,
+        see StaticGeometry.for_layout).
+
+        :param state: The values returned by __getstate__.
+        """
+        for name, value in zip(SearchState.PICKLED_SLOTS, state):
+            setattr(self, name, value)
+        self.geometry = StaticGeometry.for_layout(tuple(self.food_coords),
+                                                  tuple(self.anthill_coords),
+                                                  tuple(self.tunnel_coords),
+                                                  tuple(self.grass_coords))
+
+    @staticmethod
+    def from_game_state(current_state: GameState,
+                        layout: "SearchState" = None) -> "SearchState":
+        """
+        from_game_state
+
+        :param current_state: The GameState to encode.
+        :param layout: A SearchState of the same game (like the parent node's).
+                       Food, grass, anthills and tunnels never move, so if given,
+                       their coords are shared with it instead of scanning the constructions.
+        :return: The SearchState for current_state.
+        """
+        search_state = SearchState(current_state.whoseTurn, current_state.phase)
+        occupied = search_state.occupied
+        for player in (PLAYER_ONE, PLAYER_TWO):
+            inventory = current_state.inventories[player]
+            search_state.food_counts[player] = inventory.foodCount
+
+            ant_coords = search_state.ant_coords[player]
+            ant_types = search_state.ant_types[player]
+            type_index = search_state.type_index[player]
+            for i, ant in enumerate(inventory.ants):
+                ant_coords.append(ant.coords)
+                ant_types.append(ant.type)
+                search_state.ant_health[player].append(ant.health)
+                search_state.ant_carrying[player].append(ant.carrying)
+                search_state.ant_moved[player].append(ant.hasMoved)
+                type_index[ant.type].append(i)
+                # Same as getAntAt: the first ant found at the coords wins.
+                if ant.coords not in occupied:
+                    occupied[ant.coords] = (player, i)
+
+        if layout is not None:
+            search_state.food_coords = layout.food_coords
+            search_state.grass_coords = layout.grass_coords
+            search_state.anthill_coords = layout.anthill_coords
+            search_state.tunnel_coords = layout.tunnel_coords
+            search_state.geometry = layout.geometry
+            for player in (PLAYER_ONE, PLAYER_TWO):
+                inventory = current_state.inventories[player]
+                search_state.anthill_capture_health[player] = inventory.getAnthill().captureHealth
+                tunnels = inventory.getTunnels()
+                if tunnels:
+                    search_state.tunnel_capture_health[player] = tunnels[0].captureHealth
+            return search_state
+
+        for player, inventory in enumerate(current_state.inventories):
+            for constr in inventory.constrs:
+                if constr.type == FOOD:
+                    search_state.food_coords.append(constr.coords)
+                elif constr.type == GRASS:
+                    search_state.grass_coords.append(constr.coords)
+                elif constr.type == ANTHILL and player != NEUTRAL:
+                    # Same as Inventory.getAnthill: the first anthill wins.
+                    if search_state.anthill_coords[player] is None:
+                        search_state.anthill_coords[player] = constr.coords
+                        search_state.anthill_capture_health[player] = constr.captureHealth
+                elif constr.type == TUNNEL and player != NEUTRAL:
+                    if search_state.tunnel_coords[player] is None:
+                        search_state.tunnel_coords[player] = constr.coords
+                        search_state.tunnel_capture_health[player] = constr.captureHealth
+        search_state.geometry = StaticGeometry.for_layout(tuple(search_state.food_coords),
+                                                          tuple(search_state.anthill_coords),
+                                                          tuple(search_state.tunnel_coords),
+                                                          tuple(search_state.grass_coords))
+        return search_state
+
+    def to_game_state(self) -> GameState:
+        """
+        to_game_state
+
+        Builds a fresh GameState (without a board, like fastclone) from this SearchState.
+        Food and grass go into the neutral inventory.
+
+        :return: The GameState for this SearchState.
+        """
+        inventories = []
+        for player in (PLAYER_ONE, PLAYER_TWO):
+            ants = []
+            for i, coords in enumerate(self.ant_coords[player]):
+                ant = Ant(coords, self.ant_types[player][i], player)
+                ant.health = self.ant_health[player][i]
+                ant.carrying = self.ant_carrying[player][i]
+                ant.hasMoved = self.ant_moved[player][i]
+                ants.append(ant)
+
+            constrs = []
+            buildings = ((self.anthill_coords[player], ANTHILL, self.anthill_capture_health),
+                         (self.tunnel_coords[player], TUNNEL, self.tunnel_capture_health))
+            for coords, constr_type, capture_health in buildings:
+                if coords is not None:
+                    building = Construction(coords, constr_type)
+                    building.captureHealth = capture_health[player]
+                    # Buildings know which player owns them.
+                    building.player = player
+                    constrs.append(building)
+            inventories.append(Inventory(player, ants, constrs, self.food_counts[player]))
+
+        neutral_constrs = [Construction(coords, FOOD) for coords in self.food_coords]
+        neutral_constrs.extend(Construction(coords, GRASS) for coords in self.grass_coords)
+        inventories.append(Inventory(NEUTRAL, [], neutral_constrs, 0))
+        return GameState(None, inventories, self.phase, self.whose_turn)
+
+    def ant_at(self, coords: tuple) -> Optional[Tuple[int, int]]:
+        """
+        ant_at
+
+        :param coords: The coords to check.
+        :return: The (player, index) of the ant at the coords, or None if there isn't one.
+        """
+        return self.occupied.get(coords)
+
+    def closest_food(self, player: int) -> tuple:
+        """
+        closest_food
+
+        Same as Items.my_closest_food: on a tie, the last food found wins.
+
+        :param player: The player whose anthill and tunnel are used.
+        :return: The coords of the food closest to the player's anthill or tunnel.
+        """
+        closest_food_coords = self.geometry.closest_food[player]
+        if closest_food_coords is None:
+            raise ValueError("There is no food on the board.")
+        return closest_food_coords
+
+
+class StaticGeometry:
+    """
+    StaticGeometry
+
+    The facts about the board that don't change between moves:
+    where the food, anthills and tunnels are, the food closest to each player's anthill
+    or tunnel, and for all 100 cells, the distance to the player's nearest dropoff
+    (anthill or tunnel) and to the player's closest food.
+    It also has the RoutePlanner of the grass (see routes).
+
+    One StaticGeometry is built per layout (usually once per game, right after setup)
+    and cached, so it's only rebuilt when the food or constructions change.
+    """
+    # The number of layouts kept in the cache (a game only needs one).
+    MAX_CACHED_LAYOUTS = 8
+    _cache: OrderedDict = OrderedDict()
+    # Guarded, so players can search in threads of the same process.
+    _cache_lock = threading.Lock()
+
+    def __init__(self, food_coords: tuple, anthill_coords: tuple, tunnel_coords: tuple,
+                 grass_coords: tuple = ()):
+        """
+        __init__
+
+        Creates a new StaticGeometry (use for_layout to get a cached one).
 
-        :param current_state: A clone of the current state (GameState).
-        :param attacking_ant: The ant currently making the attack (Ant).
-        :param enemy_locations: The locations of the enemies that can be attacked (Location[])
-        :return:
+        :param food_coords: The coords of all the food (in getConstrList order).
+        :param anthill_coords: The coords of each player's anthill.
+        :param tunnel_coords: The coords of each player's tunnel.
+        :param grass_coords: The coords of all the grass.
         """
-        return enemy_locations[random.randint(0, len(enemy_locations) - 1)]
+        self.food_coords = food_coords
+        self.anthill_coords = anthill_coords
+        self.tunnel_coords = tunnel_coords
+        self.grass_coords = grass_coords
+        self._routes: Optional[RoutePlanner] = None
+        self.closest_food: List[Optional[tuple]] = []
+        self.dropoff_dist: List[Optional[Dict[tuple, int]]] = []
+        self.food_dist: List[Optional[Dict[tuple, int]]] = []
 
-    def registerWin(self, has_won):
+        for player in (PLAYER_ONE, PLAYER_TWO):
+            if anthill_coords[player] is None or tunnel_coords[player] is None:
+                self.closest_food.append(None)
+                self.dropoff_dist.append(None)
+                self.food_dist.append(None)
+                continue
+            dropoff_dist = self._distance_grid(anthill_coords[player], tunnel_coords[player])
+
+            # Want the food closest to either the tunnel or anthill (on a tie, the last one).
+            closest_food_coords = None
+            for coords in food_coords:
+                if closest_food_coords is None or \
+                        dropoff_dist[coords] <= dropoff_dist[closest_food_coords]:
+                    closest_food_coords = coords
+
+            self.closest_food.append(closest_food_coords)
+            self.dropoff_dist.append(dropoff_dist)
+            self.food_dist.append(self._distance_grid(closest_food_coords)
+                                  if closest_food_coords is not None else None)
+
+    @staticmethod
+    def _distance_grid(*targets: tuple) -> Dict[tuple, int]:
         """
-        registerWin
+        _distance_grid
 
-        This agent doesn't learn.
+        :param targets: The coords to measure the distance to.
+        :return: For every cell on the board, the approxDist to the closest target.
+        """
+        return {coords: min(DIST_TABLE[coords][target] for target in targets)
+                for coords in BOARD_COORDS}
 
-        :param has_won: Whether the agent has won or not.
+    @property
+    def routes(self) -> "RoutePlanner":
         """
-        pass
+        routes
 
-    def _has_unwanted_conditions(self, my_workers: List[Ant], my_drones: List[Ant],
-                                 my_soldiers: List[Ant], my_r_soldiers: List[Ant]) -> bool:
+        :return: The (cached) RoutePlanner for the grass of the layout.
         """
-        Helper function that checks for unwanted conditions in the GameState.
-        If these exist, my agent will evaluate the game state at -0.99.
+        if self._routes is None:
+            self._routes = RoutePlanner.for_layout(self.grass_coords)
+        return self._routes
 
-        :param my_workers: My tunnel.
-        :param my_drones: The list of my drones.
-        :param my_soldiers: The list of my soldiers.
-        :param my_r_soldiers: The list of my ranged soldiers.
-        :return: True (unwanted condition exist), otherwise False.
+    def worker_targets(self, player: int, carrying: bool) -> Optional[tuple]:
         """
+        worker_targets
 
-        # Want one worker no matter what.
-        if len(my_workers) != 1:
-            return True
+        :param player: The player that owns the worker.
+        :param carrying: Whether the worker is carrying food.
+        :return: The player's dropoffs if carrying, or else the player's closest food
+                 (None if the player doesn't have them).
+        """
+        if self.dropoff_dist[player] is None:
+            return None
+        if carrying:
+            return self.anthill_coords[player], self.tunnel_coords[player]
+        if self.closest_food[player] is None:
+            return None
+        return self.closest_food[player],
 
-        # Want no ranged soldiers or soldiers.
-        # Also want only 1 drone (although 0 initially is okay).
-        if my_r_soldiers or my_soldiers or len(my_drones) not in [0, 1]:
-            return True
-        return False
+    @staticmethod
+    def for_layout(food_coords: tuple, anthill_coords: tuple,
+                   tunnel_coords: tuple, grass_coords: tuple = ()) -> "StaticGeometry":
+        """
+        for_layout
 
-    def _gather_food(self, dist_rewards: Dict[int, float], current_state: GameState,
-                     my_closest_food: Construction, my_workers: List[Ant],
-                     my_anthill: Construction, my_tunnel: Construction) -> float:
-        """
-        _gather_food
-
-        Helper function that rewards (or punishes) the agent if my workers get (or don't get) food.
-
-        :param dist_rewards: The dictionary of rewards and punishments for given distances.
-        :param current_state: The current GameState object.
-        :param my_closest_food: The closest food to my anthill or tunnel.
-        :param my_workers: The list of my workers.
-        :param my_anthill: My anthill.
-        :param my_tunnel: My tunnel.
-        :return: The delta value for the evaluation score.
-        """
-
-        evaluation_score_delta = 0.0
-
-        # To get the queen (and anything else besides the worker) off my anthill.
-        ant_at_anthill = getAntAt(current_state, my_anthill.coords)
-        if ant_at_anthill and ant_at_anthill.type != WORKER:
-            evaluation_score_delta -= 1.00
-
-        # The worker doesn't get rewarded or punished by default.
-        DEFAULT_WORKER_REWARD = 0.00
-        if my_workers:
-            for worker in my_workers:
-                # If the worker is carrying food, need to get to my anthill or tunnel.
-                if worker.carrying:
-                    dist_to_anthill = approxDist(worker.coords, my_anthill.coords)
-                    dist_to_tunnel = approxDist(worker.coords, my_tunnel.coords)
-                    min_construction_dist = min(dist_to_anthill, dist_to_tunnel)
-                    evaluation_score_delta += dist_rewards.get(min_construction_dist,
-                                                               DEFAULT_WORKER_REWARD)
-                # If the worker is not carrying food, need to get to the food source.
-                else:
-                    dist_to_closest_food = approxDist(worker.coords, my_closest_food.coords)
-                    evaluation_score_delta += dist_rewards.get(dist_to_closest_food,
-                                                               DEFAULT_WORKER_REWARD)
-        return evaluation_score_delta
+        :param food_coords: The coords of all the food (in getConstrList order).
+        :param anthill_coords: The coords of each player's anthill.
+        :param tunnel_coords: The coords of each player's tunnel.
+        :param grass_coords: The coords of all the grass.
+        :return: The (cached) StaticGeometry for the layout.
+        """
+        layout_key = (food_coords, anthill_coords, tunnel_coords, grass_coords)
+        with StaticGeometry._cache_lock:
+            geometry = StaticGeometry._cache.get(layout_key)
+            if geometry is None:
+                geometry = StaticGeometry(food_coords, anthill_coords, tunnel_coords,
+                                          grass_coords)
+                StaticGeometry._cache[layout_key] = geometry
+                if len(StaticGeometry._cache) > StaticGeometry.MAX_CACHED_LAYOUTS:
+                    StaticGeometry._cache.popitem(last=False)
+            else:
+                StaticGeometry._cache.move_to_end(layout_key)
+        return geometry
 
-    def _kill_enemy_workers(self, dist_rewards: Dict[int, float], my_drones: List[Ant],
-                            enemy_workers: List[Ant]) -> float:
+    @staticmethod
+    def from_game_state(current_state: GameState) -> "StaticGeometry":
         """
-        _kill_enemy_workers
+        from_game_state
 
-        Helper function that rewards (or punishes) my agent for killing the enemy workers.
+        Only the constructions are scanned (the same way SearchState.from_game_state does).
 
-        :param dist_rewards: The dictionary of rewards and punishments for given distances.
-        :param my_drones: The list of my drones.
-        :param enemy_workers: The list of the enemy workers.
-        :return: The delta value for the evaluation score.
+        :param current_state: A GameState of the game.
+        :return: The (cached) StaticGeometry for the layout of the state.
         """
+        food_coords = []
+        grass_coords = []
+        anthill_coords = [None, None]
+        tunnel_coords = [None, None]
+        for player, inventory in enumerate(current_state.inventories):
+            for constr in inventory.constrs:
+                if constr.type == FOOD:
+                    food_coords.append(constr.coords)
+                elif constr.type == GRASS:
+                    grass_coords.append(constr.coords)
+                elif constr.type == ANTHILL and player != NEUTRAL:
+                    if anthill_coords[player] is None:
+                        anthill_coords[player] = constr.coords
+                elif constr.type == TUNNEL and player != NEUTRAL:
+                    if tunnel_coords[player] is None:
+                        tunnel_coords[player] = constr.coords
+        return StaticGeometry.for_layout(tuple(food_coords), tuple(anthill_coords),
+                                         tuple(tunnel_coords), tuple(grass_coords))
 
-        evaluation_score_delta = 0.0
 
-        # Punish the drone by default (otherwise use dist_rewards dictionary).
-        DEFAULT_DRONE_REWARD = -0.60
+class RoutePlanner:
+    """
+    RoutePlanner
 
-        # Punish the agent if the enemy has one worker
-        if len(enemy_workers) == 1:
-            evaluation_score_delta -= 0.85
+    Shortest routes over the board for each kind of ant: stepping onto grass costs
+    GRASS_MOVE_COST movement points (unless the ant ignores grass), and a cell that costs
+    more than the ant's movement can't be entered at all. A cost grid holds, for every cell
+    that can reach the targets, the movement cost of the cheapest route to the closest one.
 
-        # Rewards (or punishes) the agent for getting my drone close to the enemy worker.
-        # Only cares if there is exactly one worker.
-        if len(enemy_workers) == 1:
-            for drone in my_drones:
-                dist_to_worker = approxDist(drone.coords, enemy_workers[0].coords)
-                evaluation_score_delta += dist_rewards.get(dist_to_worker, DEFAULT_DRONE_REWARD)
-        return evaluation_score_delta
+    The grids only depend on the grass, so one RoutePlanner is kept per grass layout,
+    and its grids are built with Dijkstra's algorithm the first time they're needed
+    and cached. Ants block the cells they stand on; patched_grid only redoes the part of
+    a grid they can change (and caches it too), and route follows the grid to give
+    an ant's move.
+    """
+    # The cost of the cells that can't reach the targets.
+    UNREACHABLE = 99
+    # The number of grass layouts kept in the cache (a game only needs one).
+    MAX_CACHED_LAYOUTS = 8
+    # The number of cost grids kept by each RoutePlanner.
+    MAX_CACHED_GRIDS = 512
+    _cache: OrderedDict = OrderedDict()
+    # Guarded, so players can search in threads of the same process.
+    _cache_lock = threading.Lock()
 
-    def evaluate_game_state(self, current_state) -> float:
+    def __init__(self, grass_coords: frozenset):
         """
-        evaluate_game_state
+        __init__
 
-        Given a game state, calculates an evaluation score between -1.0 and 1.0.
-        The agent's main objectives are to gather food and kill the enemy worker.
+        Creates a new RoutePlanner (use for_layout to get a cached one).
 
-        :param current_state: The current game state.
-        :return: The evaluation score (float)
+        :param grass_coords: The coords of all the grass.
         """
+        self.grass_coords = grass_coords
+        self._grids: OrderedDict = OrderedDict()
+        self._grids_lock = threading.Lock()
 
-        evaluation_score = 0.0
-
-        # Get all the relevant items I need.
-        items = Items(current_state)
-        my_closest_food = items.my_closest_food
-        my_anthill = items.my_anthill
-        my_tunnel = items.my_tunnel
-        my_workers = items.my_workers
-        my_drones = items.my_drones
-        my_soldiers = items.my_soldiers
-        my_r_soldiers = items.my_r_soldiers
-        enemy_workers = items.enemy_workers
-
-        # All the distance costs for the drone and worker.
-        dist_rewards: Dict[int, float] = {
-            0: 0.70,
-            1: 0.55,
-            2: 0.40,
-            3: 0.30,
-            4: 0.20,
-            5: 0.00,
-            6: -0.15,
-            7: -0.30,
-            8: -0.40,
-            9: -0.45
-        }
+    @staticmethod
+    def for_layout(grass_coords: tuple) -> "RoutePlanner":
+        """
+        for_layout
 
-        # Just return -0.99 if an unwanted condition exists in the GameState.
-        if self._has_unwanted_conditions(my_workers, my_drones, my_soldiers, my_r_soldiers):
-            return -0.99
+        :param grass_coords: The coords of all the grass.
+        :return: The (cached) RoutePlanner for the grass.
+        """
+        layout_key = frozenset(grass_coords)
+        with RoutePlanner._cache_lock:
+            planner = RoutePlanner._cache.get(layout_key)
+            if planner is None:
+                planner = RoutePlanner(layout_key)
+                RoutePlanner._cache[layout_key] = planner
+                if len(RoutePlanner._cache) > RoutePlanner.MAX_CACHED_LAYOUTS:
+                    RoutePlanner._cache.popitem(last=False)
+            else:
+                RoutePlanner._cache.move_to_end(layout_key)
+        return planner
 
-        # Agent is rewarded for gathering food and killing the enemy workers.
-        evaluation_score += self._gather_food(dist_rewards, current_state, my_closest_food,
-                                              my_workers, my_anthill, my_tunnel)
-        evaluation_score += self._kill_enemy_workers(dist_rewards, my_drones, enemy_workers)
+    def move_cost(self, coords: tuple, ignores_grass: bool) -> int:
+        """
+        move_cost
 
-        # Check if there is a winner
-        winner = getWinner(current_state)
-        if winner == 1:
-            return 1.0
-        elif winner == 0:
-            return -1.0
+        :param coords: The coords of a cell.
+        :param ignores_grass: Whether the ant ignores grass.
+        :return: The movement points it takes to step onto the cell.
+        """
+        if not ignores_grass and coords in self.grass_coords:
+            return GRASS_MOVE_COST
+        return 1
 
-        # Make sure to return valid number
-        if evaluation_score >= 1.0:
-            return 0.99
-        elif evaluation_score <= -1.0:
-            return -0.99
-        return evaluation_score
+    def cost_grid(self, targets: tuple, ant_type: int) -> Dict[tuple, int]:
+        """
+        cost_grid
 
-    def find_best_move(self, current_state, current_depth):
+        :param targets: The coords of the targets.
+        :param ant_type: The type of the ant.
+        :return: The (cached) cost of the cheapest route from each cell to the closest target,
+                 ignoring the other ants (the cells that can't reach one are left out).
         """
-        find_best_move                      <!-- RECURSIVE -->
+        grid_key = (targets, UNIT_STATS[ant_type][MOVEMENT], UNIT_STATS[ant_type][IGNORES_GRASS])
+        return self._cached_grid(grid_key, lambda: self._dijkstra(targets, grid_key[1],
+                                                                  grid_key[2], frozenset()))
 
-        The best move is found by recursively traversing the search tree.
-        An average of the evaluation scores is used to determine an overall score.
+    def _cached_grid(self, grid_key: tuple, build_grid: Callable[[], Dict[tuple, int]]
+                     ) -> Dict[tuple, int]:
+        """
+        _cached_grid
 
-        :param current_state: The current GameState.
-        :param current_depth: The current depth level in the tree.
-        :return: The Move that the agent wishes to perform.
+        :param grid_key: The key of the grid.
+        :param build_grid: Builds the grid if it isn't cached.
+        :return: The (cached) grid.
         """
+        with self._grids_lock:
+            grid = self._grids.get(grid_key)
+            if grid is not None:
+                self._grids.move_to_end(grid_key)
+                return grid
+        grid = build_grid()
+        with self._grids_lock:
+            self._grids[grid_key] = grid
+            if len(self._grids) > RoutePlanner.MAX_CACHED_GRIDS:
+                self._grids.popitem(last=False)
+        return grid
 
-        DEPTH_LIMIT = 2
-        all_legal_moves = listAllLegalMoves(current_state)
-        all_nodes = []
+    def patched_grid(self, targets: tuple, ant_type: int, occupied: set,
+                     start: Optional[tuple] = None) -> Dict[tuple, int]:
+        """
+        patched_grid
 
-        for move in all_legal_moves:
-            # Ignore the END_TURN move.
-            if move.moveType == "END_TURN":
-                continue
+        The cost grid of the targets with the occupied cells blocked (they keep their cost,
+        but no route goes through them). A route through a blocked cell costs more than
+        that cell's own cost, so the cells that cost no more than the cheapest blocked cell
+        keep their cost, and only the rest of the grid is searched again.
 
-            next_state_reached = self.getNextState(current_state, move)
-            node = Node(move, next_state_reached, self.evaluate_game_state(next_state_reached))
-            all_nodes.append(node)
+        :param targets: The coords of the targets (never blocked).
+        :param ant_type: The type of the ant.
+        :param occupied: The coords of the ants.
+        :param start: The coords of the ant that's moving (never blocked).
+        :return: The patched cost grid.
+        """
+        grid = self.cost_grid(targets, ant_type)
+        blocked = frozenset(coords for coords in occupied
+                            if coords in grid and coords != start and coords not in targets)
+        if not blocked:
+            return grid
+        movement = UNIT_STATS[ant_type][MOVEMENT]
+        ignores_grass = UNIT_STATS[ant_type][IGNORES_GRASS]
 
-        best_nodes = self._get_best_nodes(all_nodes)
-        if current_depth < DEPTH_LIMIT:
-            for i, node in enumerate(best_nodes):
-                best_nodes[i].state_evaluation = self.find_best_move(node.state, current_depth + 1)
+        def patch_grid() -> Dict[tuple, int]:
+            """ Searches the part of the grid the blocked cells can change again. """
+            threshold = min(grid[coords] for coords in blocked)
+            known = {coords: cost for coords, cost in grid.items() if cost <= threshold}
+            return self._dijkstra(targets, movement, ignores_grass, blocked, known)
 
-        if current_depth > 0:
-            return self.average_evaluation_score(best_nodes)
-        else:
-            # Citation: https://stackoverflow.com/questions/13067615/
-            # python-getting-the-max-value-of-y-from-a-list-of-objects
-            return max(best_nodes, key=lambda x: x.state_evaluation).move
+        # The search keeps coming back to the same few ant positions,
+        # so the patched grids are cached along with the others.
+        return self._cached_grid((targets, movement, ignores_grass, blocked), patch_grid)
 
-    def _get_best_nodes(self, nodes: list) -> list:
+    def _dijkstra(self, targets: tuple, movement: int, ignores_grass: bool, blocked: frozenset,
+                  known: Optional[Dict[tuple, int]] = None) -> Dict[tuple, int]:
         """
-        _get_best_nodes
+        _dijkstra
 
-        Helper function used for finding the best nodes to prune the tree properly.
+        Searches outward from the targets. Stepping from a cell onto its neighbor costs
+        the neighbor's move_cost, so searching backward, a cell's cost is passed on to its
+        neighbors plus its own move_cost.
 
-        :param nodes: The list of nodes to check.
-        :return: The best nodes (number determined by NUM_BEST_NODES constant).
+        :param targets: The coords of the targets.
+        :param movement: The movement points of the ant.
+        :param ignores_grass: Whether the ant ignores grass.
+        :param blocked: The cells no route goes through.
+        :param known: Cells whose cost is already final (the search continues from them).
+        :return: The cost grid.
         """
-        NUM_BEST_NODES = 5
-        sorted_nodes = sorted(nodes, key=lambda node: node.state_evaluation, reverse=True)
-        return sorted_nodes[:NUM_BEST_NODES]
+        grid = dict(known) if known else {}
+        heap = []
 
-    def average_evaluation_score(self, nodes: list) -> float:
-        """
-        Helper method to determine the overall evaluation score of a list of nodes.
-        The average method is used.
+        def push_neighbors(coords: tuple, cost: int) -> None:
+            """ Passes the cost of the cell on to its neighbors. """
+            step_cost = self.move_cost(coords, ignores_grass)
+            if coords in blocked or step_cost > movement:
+                return
+            for neighbor in listAdjacent(coords):
+                if neighbor not in grid:
+                    heapq.heappush(heap, (cost + step_cost, neighbor))
 
-        :param nodes: The list of nodes to check.
-        :return: The average evaluation score of all the checked nodes.
+        if known:
+            for coords, cost in known.items():
+                push_neighbors(coords, cost)
+        else:
+            heap = [(0, coords) for coords in targets]
+        while heap:
+            cost, coords = heapq.heappop(heap)
+            if coords in grid:
+                continue
+            grid[coords] = cost
+            push_neighbors(coords, cost)
+        return grid
+
+    def travel_cost(self, targets: Optional[tuple], ant_type: int, coords: tuple) -> int:
         """
-        return sum(node.state_evaluation for node in nodes) / len(nodes)
+        travel_cost
 
-    def getNextState(self, currentState, move):
+        :param targets: The coords of the targets (None if there are none).
+        :param ant_type: The type of the ant.
+        :param coords: The coords of the ant.
+        :return: The cost of the ant's cheapest route to the closest target
+                 (at most MAX_DIST, like approxDist).
         """
-        Revised version of getNextState from AIPlayerUtils.
-        Copied from Nux's email to the class.
+        if targets is None:
+            return MAX_DIST
+        return min(self.cost_grid(targets, ant_type).get(coords, MAX_DIST), MAX_DIST)
 
-        :param currentState: The current GameState.
-        :param move: The move to be performed.
-        :return: The next GameState from the specified move.
+    def route(self, start: tuple, targets: tuple, ant_type: int, occupied: set,
+              patch: bool = True) -> Optional[list]:
         """
+        route
 
-        # variables I will need
-        myGameState = currentState.fastclone()
-        myInv = getCurrPlayerInventory(myGameState)
-        me = myGameState.whoseTurn
-        myAnts = myInv.ants
-        myTunnels = myInv.getTunnels()
-        myAntHill = myInv.getAnthill()
+        The path of an ant as far along its shortest route to the closest target
+        as its movement allows. The cost grid is only patched (see patched_grid) when an ant
+        stands on a cell cheaper than the start, since only those can be in the way,
+        and the walk down the grid doesn't get around it (see _walk_is_clear).
 
-        # If enemy ant is on my anthill or tunnel update capture health
-        ant = getAntAt(myGameState, myAntHill.coords)
-        if ant is not None:
-            if ant.player != me:
-                myAntHill.captureHealth -= 1
+        :param start: The coords of the ant.
+        :param targets: The coords of the targets.
+        :param ant_type: The type of the ant.
+        :param occupied: The coords of all the ants (including this one).
+        :param patch: If False, None is returned instead of patching the grid.
+        :return: The path (a legal MOVE_ANT coord list), or None if the ant can't get closer.
+        """
+        grid = self.cost_grid(targets, ant_type)
+        if start not in grid:
+            return None
+        ignores_grass = UNIT_STATS[ant_type][IGNORES_GRASS]
+        if any(grid.get(coords, RoutePlanner.UNREACHABLE) < grid[start] for coords in occupied
+               if coords != start and coords not in targets) and \
+                not self._walk_is_clear(grid, start, targets, occupied, ant_type):
+            if not patch:
+                return None
+            grid = self.patched_grid(targets, ant_type, occupied, start)
+            if start not in grid:
+                return None
 
-        # If an ant is built update list of ants
-        antTypes = [WORKER, DRONE, SOLDIER, R_SOLDIER]
-        if move.moveType == BUILD:
-            if move.buildType in antTypes:
-                ant = Ant(myInv.getAnthill().coords, move.buildType, me)
-                myInv.ants.append(ant)
-                # Update food count depending on ant built
-                if move.buildType == WORKER:
-                    myInv.foodCount -= 1
-                elif move.buildType == DRONE or move.buildType == R_SOLDIER:
-                    myInv.foodCount -= 2
-                elif move.buildType == SOLDIER:
-                    myInv.foodCount -= 3
-            # ants are no longer allowed to build tunnels, so this is an error
-            elif move.buildType == TUNNEL:
-                print("Attempted tunnel build in getNextState()")
-                return currentState
+        movement_left = UNIT_STATS[ant_type][MOVEMENT]
+        path = [start]
+        coords = start
+        while coords not in targets:
+            next_coords = self._next_step(grid, coords, occupied, ignores_grass, movement_left)
+            if next_coords is None:
+                break
+            movement_left -= self.move_cost(next_coords, ignores_grass)
+            path.append(next_coords)
+            coords = next_coords
+        return path if len(path) > 1 else None
 
-        # If an ant is moved update their coordinates and has moved
-        elif move.moveType == MOVE_ANT:
-            newCoord = move.coordList[-1]
-            startingCoord = move.coordList[0]
-            for ant in myAnts:
-                if ant.coords == startingCoord:
-                    ant.coords = newCoord
-                    # TODO: should this be set true? Design decision
-                    ant.hasMoved = False
-                    attackable = listAttackable(ant.coords, UNIT_STATS[ant.type][RANGE])
-                    for coord in attackable:
-                        foundAnt = getAntAt(myGameState, coord)
-                        if foundAnt is not None:  # If ant is adjacent my ant
-                            if foundAnt.player != me:  # if the ant is not me
-                                foundAnt.health = foundAnt.health - UNIT_STATS[ant.type][
-                                    ATTACK]  # attack
-                                # If an enemy is attacked and loses all its health
-                                # remove it from the other players
-                                # inventory
-                                if foundAnt.health <= 0:
-                                    myGameState.inventories[1 - me].ants.remove(foundAnt)
-                                # If attacked an ant already don't attack any more
-                                break
-        return myGameState
+    def _next_step(self, grid: Dict[tuple, int], coords: tuple, occupied: set,
+                   ignores_grass: bool, movement_left: int) -> Optional[tuple]:
+        """
+        _next_step
 
+        :param grid: The cost grid to follow.
+        :param coords: The coords of the ant.
+        :param occupied: The coords of all the ants.
+        :param ignores_grass: Whether the ant ignores grass.
+        :param movement_left: The movement points the ant has left.
+        :return: The free neighbor with the lowest cost below the cell's own
+                 (the first one on a tie), or None if there isn't one.
+        """
+        next_coords = None
+        for neighbor in listAdjacent(coords):
+            if neighbor in grid and neighbor not in occupied and \
+                    grid[neighbor] < grid[coords] and \
+                    self.move_cost(neighbor, ignores_grass) <= movement_left and \
+                    (next_coords is None or grid[neighbor] < grid[next_coords]):
+                next_coords = neighbor
+        return next_coords
 
-class Node:
-    def __init__(self, move: Move, state: GameState, state_evaluation: float):
+    def _walk_is_clear(self, grid: Dict[tuple, int], start: tuple, targets: tuple,
+                       occupied: set, ant_type: int) -> bool:
         """
-        Node
+        _walk_is_clear
 
-        Class that represents a single node in the search tree.
+        Whether the ants can be left out of the grid: if the walk down the grid
+        (the one route takes, carried on over the next turns) gets all the way to a target
+        around the ants, with every step as cheap as the grid says, the ants can't make
+        any cell of it cost more. Every other cell can only cost more with the ants
+        in the way, so the patched grid would lead the same way.
 
-        :param move: The move that is taken from the parent node to the current node.
-        :param state: The resulting state of the move.
-        :param state_evaluation: The state evaluation score for the node.
+        :param grid: The cost grid of the targets (without the ants).
+        :param start: The coords of the ant.
+        :param targets: The coords of the targets.
+        :param occupied: The coords of all the ants.
+        :param ant_type: The type of the ant.
+        :return: True if route can follow the grid as it is.
         """
-        self.move = move
-        self.state = state
-        self.state_evaluation = state_evaluation
+        ignores_grass = UNIT_STATS[ant_type][IGNORES_GRASS]
+        movement = UNIT_STATS[ant_type][MOVEMENT]
+        movement_left = movement
+        # Whether route has stopped (the rest of the walk is taken on the next turns).
+        route_done = False
+        coords = start
+        while coords not in targets:
+            next_coords = self._next_step(grid, coords, occupied, ignores_grass, movement_left)
+            if next_coords is None:
+                route_done = True
+                movement_left = movement
+                next_coords = self._next_step(grid, coords, occupied, ignores_grass,
+                                              movement_left)
+            if route_done and any(
+                    neighbor in targets and
+                    grid[neighbor] + self.move_cost(neighbor, ignores_grass) == grid[coords]
+                    for neighbor in listAdjacent(coords)):
+                # An ant on a target doesn't block the routes through its neighbors.
+                return True
+            if next_coords is None:
+                return False
+            step_cost = self.move_cost(next_coords, ignores_grass)
+            if grid[next_coords] + step_cost != grid[coords]:
+                return False
+            movement_left -= step_cost
+            coords = next_coords
+        return True
 
 
 class Items:
@@ -415,15 +3970,19 @@ class Items:
     Third, it handles the logic for getting the inventory and me/enemy,
     so these lines of code aren't repeated needlessly in the main AIPlayer class.
     """
-    def __init__(self, current_state: GameState):
+    def __init__(self, current_state: GameState, geometry: StaticGeometry = None):
         """
         __init__
 
         Creates a new Items object.
 
         :param current_state: The current GameState.
+        :param geometry: The StaticGeometry of the game, if known
+                         (otherwise it's looked up the first time it's needed).
         """
         self._current_state = current_state
+        self._geometry = geometry
+        self._my_tunnel: Optional[Construction] = None
 
         # I should either be 0 or 1 (enemy is just 1 or 0, respectively)
         self._me: int = current_state.whoseTurn
@@ -461,17 +4020,13 @@ class Items:
 
         :return: My food that is the closest to my tunnel.
         """
-        # Distance to food and the corresponding food.
-        food_distances_dict: Dict[int, Construction] = {}
-        foods = getConstrList(self._current_state, None, (FOOD,))
-        for food in foods:
-            # Want the food closest to either the tunnel or anthill.
-            food_dist_to_tunnel = approxDist(self.my_tunnel.coords, food.coords)
-            food_dist_to_anthill = approxDist(self.my_anthill.coords, food.coords)
-            food_distances_dict[min(food_dist_to_anthill, food_dist_to_tunnel)] = food
-
-        # Return the food that has the minimum cost to get to.
-        return food_distances_dict[min(food_distances_dict)]
+        if self._geometry is None:
+            self._geometry = StaticGeometry.from_game_state(self._current_state)
+        closest_food_coords = self._geometry.closest_food[self._me]
+        for food in self.my_food:
+            if food.coords == closest_food_coords:
+                return food
+        raise ValueError("There is no food on the board.")
 
     @property
     def my_ants(self) -> List[Ant]:
@@ -534,7 +4089,9 @@ class Items:
 
         :return: My tunnel.
         """
-        return getConstrList(self._current_state, self._me, (TUNNEL,))[0]
+        if self._my_tunnel is None:
+            self._my_tunnel = getConstrList(self._current_state, self._me, (TUNNEL,))[0]
+        return self._my_tunnel
 
     @property
     def enemy_workers(self) -> List[Ant]:
@@ -546,6 +4103,283 @@ class Items:
         return getAntList(self._current_state, self._enemy, (WORKER,))
 
 
+# The AIPlayer of a worker process of the parallel search (see _init_search_worker).
+_worker_player: Optional[AIPlayer] = None
+
+# The AIPlayer of the ponder process (see _init_ponder_worker).
+_ponder_player: Optional[AIPlayer] = None
+
+
+def _move_key(move: Move) -> tuple:
+    """
+    _move_key
+
+    :param move: A move.
+    :return: A hashable key that identifies the move (used for the move ordering tables).
+    """
+    if move.coordList:
+        return move.moveType, move.coordList[0], move.coordList[-1], move.buildType
+    return move.moveType, None, None, move.buildType
+
+
+def _flip_coords(coords: tuple) -> tuple:
+    """
+    _flip_coords
+
+    :param coords: Coords on the board.
+    :return: The coords seen from the other player's side of the board.
+    """
+    return BOARD_LENGTH - 1 - coords[0], BOARD_LENGTH - 1 - coords[1]
+
+
+def _flip_move_key(move_key: tuple) -> tuple:
+    """
+    _flip_move_key
+
+    :param move_key: The _move_key of a move.
+    :return: The _move_key of the same move seen from the other player's side of the board.
+    """
+    move_type, start, dest, build_type = move_key
+    return (move_type, _flip_coords(start) if start is not None else None,
+            _flip_coords(dest) if dest is not None else None, build_type)
+
+
+class OpeningBook:
+    """
+    OpeningBook
+
+    Best moves for positions from the start of the game, found by deep offline searches
+    (see tools.book). The positions are keyed by ZobristHasher.hash_opening,
+    so a position is found no matter where the enemy put its grass or my other food
+    (an exact hash would never come up again against an opponent that places at random).
+    The file is a sorted array of fixed-width records: the key of the position
+    (as a little-endian u64), then the move type, build type, and start and end coords
+    of the move, seen from my side of the board (a byte each, NO_VALUE when there's none).
+    The file is only read the first time it's needed, and it's searched with bisect
+    without unpacking it.
+    """
+    RECORD = struct.Struct("<Q6B")
+    NO_VALUE = 255
+
+    def __init__(self, path: Optional[str], data: Optional[bytes] = None):
+        """
+        __init__
+
+        Creates a new OpeningBook (the file isn't read yet).
+
+        :param path: The path of the book file.
+        :param data: The contents of a book (instead of reading the file).
+        """
+        self.path = path
+        self._data = data
+
+    def _records(self) -> bytes:
+        """
+        _records
+
+        :return: The contents of the book (read from the file the first time).
+        """
+        if self._data is None:
+            try:
+                with open(self.path, "rb") as book_file:
+                    self._data = book_file.read()
+            except OSError:
+                self._data = b""
+        return self._data
+
+    def __len__(self) -> int:
+        return len(self._records()) // self.RECORD.size
+
+    def __getitem__(self, index: int) -> int:
+        """
+        __getitem__
+
+        :param index: The index of a record.
+        :return: The position hash of the record (so bisect can search the book).
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.RECORD.unpack_from(self._records(), index * self.RECORD.size)[0]
+
+    def lookup(self, position_key: int) -> Optional[tuple]:
+        """
+        lookup
+
+        :param position_key: The hash_opening of the position.
+        :return: The _move_key of the book move, or None if the position isn't in the book.
+        """
+        index = bisect.bisect_left(self, position_key)
+        if index == len(self) or self[index] != position_key:
+            return None
+        _, move_type, build_type, start_x, start_y, dest_x, dest_y = \
+            self.RECORD.unpack_from(self._records(), index * self.RECORD.size)
+        no_value = self.NO_VALUE
+        return (move_type,
+                (start_x, start_y) if start_x != no_value else None,
+                (dest_x, dest_y) if dest_x != no_value else None,
+                build_type if build_type != no_value else None)
+
+    @staticmethod
+    def encode(entries: Dict[int, tuple]) -> bytes:
+        """
+        encode
+
+        :param entries: The _move_key of the best move of each position
+                        (keyed by its hash_opening).
+        :return: The contents of the book.
+        """
+        no_value = OpeningBook.NO_VALUE
+        records = []
+        for position_key in sorted(entries):
+            move_type, start, dest, build_type = entries[position_key]
+            start = start if start is not None else (no_value, no_value)
+            dest = dest if dest is not None else (no_value, no_value)
+            records.append(OpeningBook.RECORD.pack(
+                position_key, move_type, build_type if build_type is not None else no_value,
+                start[0], start[1], dest[0], dest[1]))
+        return b"".join(records)
+
+    @staticmethod
+    def write(path: str, entries: Dict[int, tuple]) -> None:
+        """
+        write
+
+        :param path: The path of the book file.
+        :param entries: The _move_key of the best move of each position
+                        (keyed by its hash_opening).
+        """
+        with open(path, "wb") as book_file:
+            book_file.write(OpeningBook.encode(entries))
+
+
+def _describe_move(move: Move) -> dict:
+    """
+    _describe_move
+
+    :param move: A move.
+    :return: The move as a JSON-friendly dictionary.
+    """
+    return {
+        "moveType": move.moveType,
+        "coordList": [list(coords) for coords in move.coordList] if move.coordList else None,
+        "buildType": move.buildType
+    }
+
+
+def _init_search_worker(player_id: int, config: SearchConfig,
+                        eval_weights: EvalWeights) -> None:
+    """
+    _init_search_worker
+
+    Creates the AIPlayer used by this worker process.
+    It lives as long as the process, so its transposition tables stay warm between turns.
+
+    :param player_id: The ID of the player that owns the pool.
+    :param config: The search options to use.
+    :param eval_weights: The evaluation weights to use.
+    """
+    global _worker_player
+    _worker_player = AIPlayer(player_id, config, opening_book_path=None,
+                              eval_weights=eval_weights)
+
+
+def _init_ponder_worker(player_id: int, config: SearchConfig, eval_weights: EvalWeights,
+                        stop_event) -> None:
+    """
+    _init_ponder_worker
+
+    Creates the AIPlayer used by the ponder process (see AIPlayer._start_pondering).
+
+    :param player_id: The ID of the player that ponders.
+    :param config: The search options to use.
+    :param eval_weights: The evaluation weights to use.
+    :param stop_event: The multiprocessing Event set to stop its search.
+    """
+    global _ponder_player
+    _ponder_player = AIPlayer(player_id, config, opening_book_path=None,
+                              eval_weights=eval_weights)
+    _ponder_player._stop_event = stop_event
+
+
+def _ponder_task(search_state: GameState, me: int, time_budget: Optional[float],
+                 ponder_positions: int) -> Dict[int, tuple]:
+    """
+    _ponder_task
+
+    Ponders in the ponder process (see AIPlayer._ponder).
+
+    :param search_state: The position the last move of the player leads to.
+    :param me: The ID of the player.
+    :param time_budget: The time budget of every search.
+    :param ponder_positions: Max number of positions to search.
+    :return: The _move_key of the best move in each searched position (keyed by its hash).
+    """
+    results = {}
+    _ponder_player._ponder(search_state, me, time_budget, ponder_positions, results)
+    return results
+
+
+def _end_pondered_game(has_won: bool) -> None:
+    """
+    _end_pondered_game
+
+    Clears the tables of the ponder process at the end of a game.
+
+    :param has_won: Whether the player has won or not.
+    """
+    _ponder_player.registerWin(has_won)
+
+
+def _available_cpus() -> int:
+    """
+    _available_cpus
+
+    :return: The number of CPUs this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _search_subtree(search_state: SearchState, depth_limit: int,
+                    stop_time: Optional[float] = None) -> Optional[float]:
+    """
+    _search_subtree
+
+    Searches one root subtree in a worker process.
+
+    :param search_state: The SearchState at the root of the subtree
+                         (its geometry is rebuilt here, see SearchState.__setstate__).
+    :param depth_limit: The depth to search to.
+    :param stop_time: The time.time() to stop searching at (None for no time limit).
+    :return: The score of the subtree, or None if it ran out of time.
+    """
+    if stop_time is not None:
+        _worker_player._deadline = time.perf_counter() + stop_time - time.time()
+    try:
+        return _worker_player._search(search_state.to_game_state(), 1, None, depth_limit)
+    except SearchTimeout:
+        return None
+    finally:
+        _worker_player._deadline = None
+
+
+def build_geometry_tables() -> None:
+    """
+    build_geometry_tables
+
+    Fills DIST_TABLE and ATTACKABLE_TABLE by calling approxDist and listAttackable
+    for every cell (and every ant range), so the lookups give exactly the same results.
+    """
+    DIST_TABLE.clear()
+    ATTACKABLE_TABLE.clear()
+    for coords in BOARD_COORDS:
+        DIST_TABLE[coords] = {other: approxDist(coords, other) for other in BOARD_COORDS}
+    for attack_range in ATTACK_RANGES:
+        for coords in BOARD_COORDS:
+            ATTACKABLE_TABLE[(coords, attack_range)] = listAttackable(coords, attack_range)
+
+
 def create_test_game_state() -> GameState:
     """
     create_test_game_state
@@ -596,7 +4430,7 @@ def run_unit_tests() -> None:
     """
     run_unit_tests
 
-    Runs the unit tests for the agent.
+    Runs the unit tests for the agent (python HadBarAgent.py --self-test).
     """
     test_game_state = create_test_game_state()
     my_player = AIPlayer(0)
@@ -614,6 +4448,28 @@ def run_unit_tests() -> None:
             actual_best_move.coordList != expected_best_move.coordList:
         print("Test for find_best_move failed!")
 
+    # Test when the root is searched in parallel.
+    # An ordinary depth 2 search should stay serial, and a depth 4 one shouldn't.
+    num_children = len(listAllLegalMoves(test_game_state))
+    if my_player._parallel_root_work(num_children, 5, 2) >= PARALLEL_MIN_ROOT_WORK or \
+            my_player._parallel_root_work(num_children, 5, 4) < PARALLEL_MIN_ROOT_WORK:
+        print("Test for _parallel_root_work failed!")
+    # A depth 3 search is split between the workers (even a single one), both by find_best_move
+    # and by iterative_deepening, and should pick the same move as the serial search.
+    serial_player = AIPlayer(0, SearchConfig(depth_limit=3, max_depth=3))
+    parallel_player = AIPlayer(0, SearchConfig(depth_limit=3, max_depth=3, num_workers=1))
+    try:
+        serial_moves = [serial_player.find_best_move(test_game_state, 0),
+                        serial_player.iterative_deepening(test_game_state, 60.0)]
+        parallel_moves = [parallel_player.find_best_move(test_game_state, 0),
+                          parallel_player.iterative_deepening(test_game_state, 60.0)]
+        if parallel_player._process_pool is None or \
+                [_move_key(move) for move in parallel_moves] != \
+                [_move_key(move) for move in serial_moves]:
+            print("Test for _search_root_in_parallel failed!")
+    finally:
+        parallel_player.shutdown_workers()
+
     # Test the average_evaluation_score method.
     # It should average to 0.0 with the given nodes.
     node_list = [Node(Move(None), test_game_state, 1.0), Node(Move(None), test_game_state, -1.0)]
@@ -621,6 +4477,345 @@ def run_unit_tests() -> None:
     if average_eval_score != 0.0:
         print("Test for average_evaluation_score failed!")
 
+    # Test the _get_best_nodes method.
+    # It should keep the same nodes (in the same order) as a full stable sort.
+    tied_nodes = [Node(Move(None), None, float(score)) for score in (0, 2, 1, 2, 0, 1, 2, 1)]
+    if my_player._get_best_nodes(tied_nodes) != \
+            sorted(tied_nodes, key=lambda node: node.state_evaluation, reverse=True)[:5]:
+        print("Test for _get_best_nodes failed!")
+
+    # Test the NodePool class.
+    # Released nodes should be reused, and no more than max_free should be kept.
+    node_pool = NodePool(1)
+    node_pool.release(tied_nodes[:2])
+    if len(node_pool) != 1 or node_pool.acquire(None, None, 3.0) is not tied_nodes[0] or \
+            len(node_pool) != 0:
+        print("Test for NodePool failed!")
+
+    # Test the ZobristHasher class.
+    # A clone should hash the same, and the incremental hash should match a full rehash.
+    hasher = ZobristHasher()
+    clone_state = test_game_state.fastclone()
+    original_hash = hasher.hash_state(clone_state)
+    if original_hash != hasher.hash_state(test_game_state):
+        print("Test for hash_state failed!")
+    undo_record = my_player.make_move(clone_state, Move(MOVE_ANT, [(2, 8), (3, 8)]))
+    if hasher.hash_move(original_hash, undo_record) != hasher.hash_state(clone_state):
+        print("Test for hash_move failed!")
+    my_player.unmake_move(clone_state, undo_record)
+
+    # Test the SearchState class.
+    # Converting to a SearchState and back should give the same state.
+    round_trip_state = SearchState.from_game_state(test_game_state).to_game_state()
+    if hasher.hash_state(round_trip_state) != original_hash:
+        print("Test for SearchState failed!")
+
+    # Test the StaticGeometry class.
+    # The closest food should be the same one that Items finds.
+    geometry = StaticGeometry.from_game_state(test_game_state)
+    if geometry.closest_food[0] != (9, 1) or \
+            Items(test_game_state, geometry).my_closest_food.coords != (9, 1) or \
+            geometry.dropoff_dist[0][(5, 5)] != 9:
+        print("Test for StaticGeometry failed!")
+
+    # Test the RoutePlanner class.
+    # Patching a cost grid should give the same grid as searching it again from scratch,
+    # a route that skips the patch should be the same as a patched one,
+    # and the route moves should be legal.
+    routes = geometry.routes
+    patching_routes = RoutePlanner(routes.grass_coords)
+    patching_routes._walk_is_clear = lambda *args: False
+    route_rng = random.Random(0)
+    for _ in range(40):
+        targets = tuple(route_rng.sample(BOARD_COORDS, route_rng.randint(1, 2)))
+        occupied = set(route_rng.sample(BOARD_COORDS, 12))
+        start = route_rng.choice(sorted(occupied))
+        for ant_type in (WORKER, DRONE, R_SOLDIER):
+            blocked = frozenset(occupied) - frozenset(targets)
+            if routes.patched_grid(targets, ant_type, occupied) != \
+                    routes._dijkstra(targets, UNIT_STATS[ant_type][MOVEMENT],
+                                     UNIT_STATS[ant_type][IGNORES_GRASS], blocked) or \
+                    routes.route(start, targets, ant_type, occupied) != \
+                    patching_routes.route(start, targets, ant_type, occupied):
+                print("Test for RoutePlanner failed!")
+    worker_move = my_player.route_move(test_game_state, getAntAt(test_game_state, (8, 0)))
+    dropoffs = geometry.worker_targets(0, True)
+    if worker_move is None or _move_key(worker_move) not in \
+            {_move_key(move) for move in listAllLegalMoves(test_game_state)} or \
+            routes.travel_cost(dropoffs, WORKER, worker_move.coordList[-1]) >= \
+            routes.travel_cost(dropoffs, WORKER, (8, 0)):
+        print("Test for RoutePlanner failed!")
+
+    # Test the _routed_legal_moves method.
+    # Following the worker's route instead of listing all of its moves
+    # should find the same best move with fewer nodes.
+    for depth_limit in (1, 2):
+        routed_player = AIPlayer(0, SearchConfig(depth_limit=depth_limit, route_distances=True))
+        listing_player = AIPlayer(0, SearchConfig(depth_limit=depth_limit, route_distances=True))
+        listing_player._routed_legal_moves = lambda current_state, _: \
+            listAllLegalMoves(current_state)
+        if _move_key(routed_player.find_best_move(test_game_state, 0)) != \
+                _move_key(listing_player.find_best_move(test_game_state, 0)) or \
+                routed_player.nodes_searched >= listing_player.nodes_searched:
+            print("Test for _routed_legal_moves failed!")
+
+    # Test the _incremental_evaluation method.
+    # Every child it scores should get the same score as evaluate_game_state.
+    child_states = [my_player.getNextState(test_game_state, move)
+                    for move in listAllLegalMoves(test_game_state)]
+    debug_player = AIPlayer(0, SearchConfig(debug_incremental_evaluation=True,
+                                            search_tree_size=0))
+    try:
+        debug_player._expand(test_game_state.fastclone(), hasher.hash_state(test_game_state))
+    except AssertionError:
+        print("Test for _incremental_evaluation failed!")
+
+    # Test the make_move and unmake_move methods.
+    # Every move should give the same state as getNextState and unmake_move should undo it.
+    for move in listAllLegalMoves(clone_state):
+        expected_hash = hasher.hash_state(my_player.getNextState(clone_state, move))
+        undo_record = my_player.make_move(clone_state, move)
+        if hasher.hash_state(clone_state) != expected_hash:
+            print("Test for make_move failed!")
+        my_player.unmake_move(clone_state, undo_record)
+        if hasher.hash_state(clone_state) != original_hash:
+            print("Test for unmake_move failed!")
+
+    # Test the AntIndex class.
+    # Along random games, every move should hit the same ant a getAntAt scan finds,
+    # make_move should match getNextState, the index should match a fresh one,
+    # and unmake_move should put the ant lists back in their order.
+    index_rng = random.Random(0)
+    for _ in range(3):
+        walk_state = test_game_state.fastclone()
+        walk_order = [[id(ant) for ant in inventory.ants] for inventory in walk_state.inventories]
+        walk_records = []
+        for _ in range(40):
+            for move in listAllLegalMoves(walk_state):
+                expected_victim = None
+                if move.moveType == MOVE_ANT:
+                    mover = getAntAt(walk_state, move.coordList[0])
+                    attackable = ATTACKABLE_TABLE[(move.coordList[-1],
+                                                   UNIT_STATS[mover.type][RANGE])]
+                    expected_victim = next(
+                        (ant for ant in (getAntAt(walk_state, coords) for coords in attackable)
+                         if ant is not None and ant.player != mover.player), None)
+                expected_hash = hasher.hash_state(my_player.getNextState(walk_state, move))
+                undo_record = my_player.make_move(walk_state, move)
+                walk_index = my_player._ant_index(walk_state)
+                if undo_record.victim is not expected_victim or \
+                        hasher.hash_state(walk_state) != expected_hash or \
+                        walk_index.cells != AntIndex(walk_state).cells or \
+                        walk_index.positions != AntIndex(walk_state).positions:
+                    print("Test for AntIndex failed!")
+                my_player.unmake_move(walk_state, undo_record)
+            if getWinner(walk_state) is not None:
+                break
+            walk_records.append(my_player.make_move(
+                walk_state, index_rng.choice(listAllLegalMoves(walk_state)), full_rules=True))
+        for undo_record in reversed(walk_records):
+            my_player.unmake_move(walk_state, undo_record)
+        if hasher.hash_state(walk_state) != original_hash or \
+                [[id(ant) for ant in inventory.ants]
+                 for inventory in walk_state.inventories] != walk_order or \
+                my_player._ant_index(walk_state).cells != AntIndex(walk_state).cells:
+            print("Test for AntIndex failed!")
+    # A state the game changed between getMove calls should be indexed again.
+    getAntAt(walk_state, (2, 8)).coords = (3, 8)
+    my_player.getMove(walk_state)
+    if my_player._ant_index(walk_state).cells != AntIndex(walk_state).cells:
+        print("Test for AntIndex failed!")
+    # The index of a state should go away with the state.
+    indexed_state = walk_state.fastclone()
+    my_player._ant_index(indexed_state)
+    indexed_id = id(indexed_state)
+    del indexed_state
+    if indexed_id in my_player._ant_indexes:
+        print("Test for AntIndex failed!")
+
+    # Test the full rules of make_move.
+    # Ending the turn should hand it to the opponent, and the incremental hash should still
+    # match a full rehash.
+    my_tunnel_coords = getConstrList(clone_state, 0, (TUNNEL,))[0].coords
+    move_record = my_player.make_move(clone_state, Move(MOVE_ANT, [(8, 0), my_tunnel_coords]),
+                                      full_rules=True)
+    moved_hash = hasher.hash_move(original_hash, move_record)
+    end_record = my_player.make_move(clone_state, Move(END), full_rules=True)
+    if clone_state.whoseTurn != 1 or clone_state.inventories[0].foodCount != 4 or \
+            hasher.hash_move(moved_hash, end_record) != hasher.hash_state(clone_state):
+        print("Test for make_move with full_rules failed!")
+    my_player.unmake_move(clone_state, end_record)
+    my_player.unmake_move(clone_state, move_record)
+    if hasher.hash_state(clone_state) != original_hash:
+        print("Test for unmake_move with full_rules failed!")
+
+    # Test the generate_moves method.
+    # It should generate one move for every distinct move of listAllLegalMoves.
+    legal_move_keys = {_move_key(move) for move in listAllLegalMoves(test_game_state)}
+    generated_move_keys = [_move_key(move) for move in my_player.generate_moves(test_game_state)]
+    if len(generated_move_keys) != len(legal_move_keys) or \
+            set(generated_move_keys) != legal_move_keys:
+        print("Test for generate_moves failed!")
+
+    # Test the alpha-beta and expectimax searches.
+    # Searching just my next move should find a move as good as the best static one.
+    best_static_score = max(my_player.evaluate_game_state(state) for state in child_states)
+    for search_mode in ("alphabeta", "expectimax"):
+        search_player = AIPlayer(0, SearchConfig(search_mode=search_mode, depth_limit=1))
+        search_move = search_player.getMove(test_game_state)
+        if my_player.evaluate_game_state(my_player.getNextState(test_game_state, search_move)) \
+                != best_static_score:
+            print("Test for search_game_tree (%s) failed!" % search_mode)
+
+    # Test the Monte Carlo tree search.
+    # With one playout per root move and no playout moves, every move is scored statically,
+    # so it should find a move as good as the best static one.
+    mcts_player = AIPlayer(0, SearchConfig(search_mode="mcts",
+                                           mcts_playouts=len(generated_move_keys),
+                                           mcts_batch_size=1, rollout_depth=0))
+    mcts_move = mcts_player.getMove(test_game_state)
+    if my_player.evaluate_game_state(my_player.getNextState(test_game_state, mcts_move)) != \
+            best_static_score or mcts_player.nodes_searched != len(generated_move_keys):
+        print("Test for monte_carlo_search failed!")
+
+    # Test the SearchTree class.
+    # After the best move is played, the position should be found with the mover's moves
+    # left out.
+    tree_player = AIPlayer(0)
+    played_move = tree_player.find_best_move(test_game_state, 0)
+    played_state = tree_player.getNextState(test_game_state, played_move)
+    getAntAt(played_state, played_move.coordList[-1]).hasMoved = True
+    played_hash = hasher.hash_state(played_state)
+    reused_nodes = tree_player.search_tree.get(played_state, played_hash)
+    expected_nodes = AIPlayer(0, SearchConfig(search_tree_size=0))._expand(
+        played_state.fastclone(), played_hash)
+    if reused_nodes is None or \
+            [(_move_key(node.move), node.state_hash, node.state_evaluation)
+             for node in reused_nodes] != \
+            [(_move_key(node.move), node.state_hash, node.state_evaluation)
+             for node in expected_nodes]:
+        print("Test for SearchTree failed!")
+
+    # Test the profiling of getMove.
+    # It should report the same move, and the line should start with it.
+    reported_stats = []
+    profiled_player = AIPlayer(0, profile=True, stats_callback=reported_stats.append)
+    profiled_move = profiled_player.getMove(test_game_state)
+    if len(reported_stats) != 1 or reported_stats[0]["line"][0] != _describe_move(profiled_move) \
+            or _move_key(profiled_move) != _move_key(actual_best_move) or \
+            reported_stats[0]["branching"].keys() != {"0", "1", "2"}:
+        print("Test for getMove with profile failed!")
+
+    # Test the getPlacement method.
+    # Everything should go on free cells, and the food as far from the enemy as possible.
+    setup_state = GameState.getBlankState()
+    setup_state.phase = SETUP_PHASE_1
+    placement = my_player.getPlacement(setup_state)
+    if len(set(placement)) != 11 or any(coords[1] not in MY_SETUP_ROWS for coords in placement):
+        print("Test for getPlacement failed!")
+    setup_state = test_game_state.fastclone()
+    setup_state.phase = SETUP_PHASE_2
+    taken = {constr.coords for constr in getConstrList(setup_state, None)}
+    enemy_buildings = [constr.coords
+                       for constr in getConstrList(setup_state, None, (ANTHILL, TUNNEL))
+                       if constr.coords[1] in ENEMY_SETUP_ROWS]
+    food_placement = my_player.getPlacement(setup_state)
+    farthest_dist = max(min(approxDist(coords, building) for building in enemy_buildings)
+                        for coords in BOARD_COORDS
+                        if coords[1] in ENEMY_SETUP_ROWS and coords not in taken)
+    if len(set(food_placement)) != 2 or any(coords in taken for coords in food_placement) or \
+            min(approxDist(food_placement[0], building) for building in enemy_buildings) != \
+            farthest_dist:
+        print("Test for getPlacement failed!")
+
+    # Test the OpeningBook class.
+    # The book move should be found (among the legal moves), and other positions shouldn't.
+    # The key shouldn't depend on what the enemy has far from my side of the board.
+    book_key, flipped = hasher.hash_opening(test_game_state)
+    book_move_key = _move_key(expected_best_move)
+    if flipped:
+        book_move_key = _flip_move_key(book_move_key)
+    book = OpeningBook(None, OpeningBook.encode({book_key: book_move_key,
+                                                 1: _move_key(Move(END))}))
+    book_player = AIPlayer(0)
+    book_player.opening_book = book
+    book_move = book_player._book_move(test_game_state)
+    far_food_state = test_game_state.fastclone()
+    far_food_state.inventories[1 - far_food_state.whoseTurn].foodCount += 1
+    if len(book) != 2 or book.lookup(book_key ^ 1) is not None or book_move is None or \
+            _move_key(book_move) != _move_key(expected_best_move) or \
+            hasher.hash_opening(far_food_state)[0] != book_key or \
+            _flip_move_key(_flip_move_key(book_move_key)) != book_move_key:
+        print("Test for OpeningBook failed!")
+
+    # Test the EvalWeights class and evaluation_features.
+    # The default weights should round-trip, and the dot product of the features with
+    # the weights should be the (unclamped) score.
+    default_weights = EvalWeights()
+    features = my_player.evaluation_features(test_game_state)
+    if EvalWeights.from_dict(default_weights.to_dict()).to_vector() != \
+            default_weights.to_vector() or features is None or \
+            abs(sum(weight * feature for weight, feature in
+                    zip(default_weights.to_vector(), features)) -
+                my_player.evaluate_game_state(test_game_state)) > 1e-9:
+        print("Test for EvalWeights failed!")
+    # With route distances, the workers past the last distance get its reward.
+    route_player = AIPlayer(0, SearchConfig(route_distances=True))
+    route_features = route_player.evaluation_features(test_game_state)
+    if default_weights.worker_rewards(True)[MAX_DIST] != DIST_REWARDS[max(DIST_REWARDS)] or \
+            route_features is None or \
+            abs(sum(weight * feature for weight, feature in
+                    zip(default_weights.to_vector(), route_features)) -
+                route_player.evaluate_game_state(test_game_state)) > 1e-9:
+        print("Test for EvalWeights failed!")
+
+    # Test pondering (it's skipped without a spare CPU).
+    # After my move, the position the game reaches should be answered by the pondered move,
+    # which should be the same move a fresh search finds.
+    # Pondering shouldn't make getMove slower either.
+    if _available_cpus() >= 2:
+        ponder_player = AIPlayer(0, ponder=True, ponder_positions=1, opening_book_path=None)
+        ponder_state = test_game_state.fastclone()
+        ponder_move = ponder_player.getMove(ponder_state)
+        ponder_player._ponder_future.result()
+        my_player.make_move(ponder_state, ponder_move, full_rules=True)
+        pondered_move = ponder_player.getMove(ponder_state)
+        ponder_player.registerWin(False)
+        if ponder_player.ponder_hits != 1 or _move_key(pondered_move) != \
+                _move_key(AIPlayer(0, opening_book_path=None).getMove(ponder_state)):
+            print("Test for pondering failed!")
+
+        move_times = {}
+        for ponder in (False, True):
+            timed_player = AIPlayer(0, ponder=ponder, ponder_positions=64,
+                                    opening_book_path=None)
+            timed_player.getMove(test_game_state)
+            start_time = time.perf_counter()
+            for _ in range(5):
+                timed_player.getMove(test_game_state)
+            move_times[ponder] = time.perf_counter() - start_time
+            timed_player.shutdown_workers()
+        ponder_player.shutdown_workers()
+        if move_times[True] > 1.5 * move_times[False] + 0.025:
+            print("Test for pondering (getMove time) failed!")
+
+    # Test the TranspositionTable class.
+    # It should never hold more than max_entries and should count hits and misses.
+    table = TranspositionTable(2)
+    for key in range(3):
+        table.put(key, float(key))
+    if len(table) != 2 or table.get(0) is not None or table.get(2) != 2.0 or \
+            table.hits != 1 or table.misses != 1:
+        print("Test for TranspositionTable failed!")
+
 
-# Run the unit tests
-run_unit_tests()
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="HadBarAgent (the tools are run with "
+                                                 "python -m tools)")
+    parser.add_argument("--self-test", action="store_true",
+                        help="run the unit tests (failures are printed)")
+    args = parser.parse_args()
+    if args.self_test:
+        run_unit_tests()
+        print("Self-test finished")
@@ -0,0 +1,2 @@
+# The offline tools of HadBarAgent: benchmarks, self-play, the opening book builder,
+# game records and evaluation tuning (run "python -m tools --help" from the agent's directory).
@@ -0,0 +1,73 @@
+from HadBarAgent import OPENING_BOOK_PATH
+from tools.benchmarks import benchmark_import, run_benchmarks
+from tools.book import build_opening_book, opening_book_positions
+from tools.selfplay import run_self_play
+from tools.texel import EVAL_WEIGHTS_PATH, fit_eval_weights, record_training_positions, \
+    texel_error
+import HadBarAgent
+import tools.records
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="HadBarAgent tools")
+    parser.add_argument("--self-test", action="store_true",
+                        help="run the unit tests (failures are printed) and check the import")
+    parser.add_argument("--benchmark", nargs="?", metavar="RESULTS_PATH",
+                        const="HadBarAgent_benchmarks.json",
+                        help="run the benchmark suite and write the results as JSON "
+                             "(by default to the current directory)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the benchmark corpus or of the first self-play game")
+    parser.add_argument("--self-play", type=int, metavar="GAMES",
+                        help="play this many headless games against the --opponent")
+    parser.add_argument("--opponent", choices=("random", "placement", "self"), default="random",
+                        help="the self-play opponent")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="number of worker processes for the self-play games")
+    parser.add_argument("--build-book", nargs="?", metavar="BOOK_PATH", const=OPENING_BOOK_PATH,
+                        help="build the opening book from games against the --opponent")
+    parser.add_argument("--record-positions", metavar="DATASET_PATH",
+                        help="append the positions of --games games against the --opponent "
+                             "to a dataset for --fit-weights")
+    parser.add_argument("--games", type=int, default=100,
+                        help="number of games played by --record-positions and --build-book")
+    parser.add_argument("--fit-weights", metavar="DATASET_PATH",
+                        help="tune the evaluation weights on a dataset of --record-positions")
+    parser.add_argument("--weights-out", default=EVAL_WEIGHTS_PATH,
+                        help="where --fit-weights writes the tuned weights")
+    args = parser.parse_args()
+    if args.self_test:
+        HadBarAgent.run_unit_tests()
+        tools.records.run_unit_tests()
+        import_results = benchmark_import(repeats=1)
+        if import_results["tables_built"] or import_results["printed_lines"]:
+            print("Test for benchmark_import failed!")
+        print("Self-test finished (import took %.1f ms)" % import_results["import_ms"])
+    if args.benchmark is not None:
+        print(json.dumps(run_benchmarks(args.benchmark, args.seed), indent=2, sort_keys=True))
+    if args.self_play is not None:
+        opponent = {} if args.opponent == "self" else args.opponent
+        print(json.dumps(run_self_play(({}, opponent), args.self_play, args.seed, args.workers),
+                         indent=2, sort_keys=True))
+    if args.build_book is not None:
+        opponent = {} if args.opponent == "self" else args.opponent
+        print("%d positions written to %s"
+              % (build_opening_book(args.build_book, (opponent,), args.games, seed=args.seed),
+                 args.build_book))
+        for hit_rate_seed in (args.seed, args.seed + 1000):
+            book_results = opening_book_positions(args.build_book, (opponent,),
+                                                  seed=hit_rate_seed)
+            print("book hits (seed %d): %d of %d" % (hit_rate_seed, book_results["hits"],
+                                                     book_results["lookups"]))
+    if args.record_positions is not None:
+        opponent = {} if args.opponent == "self" else args.opponent
+        print("%d positions appended to %s"
+              % (record_training_positions(args.record_positions, ({}, opponent), args.games,
+                                           args.seed),
+                 args.record_positions))
+    if args.fit_weights is not None:
+        print("error before: %.6f" % texel_error(args.fit_weights))
+        fitted = fit_eval_weights(args.fit_weights, output_path=args.weights_out)
+        print("error after: %.6f" % texel_error(args.fit_weights, fitted))
+        print(json.dumps(fitted.to_dict(), indent=2))
@@ -0,0 +1,319 @@
+from AIPlayerUtils import *
+from Constants import *
+from GameState import GameState
+from HadBarAgent import ATTACK_RANGES, ATTACKABLE_TABLE, BOARD_COORDS, DIST_TABLE, AIPlayer, \
+    SearchConfig, ZobristHasher, build_geometry_tables
+from typing import Dict, List, Optional
+import HadBarAgent
+import os
+import random
+import sys
+import time
+
+
+def benchmark_geometry_tables(repeats: int = 20) -> Dict[str, float]:
+    """
+    benchmark_geometry_tables
+
+    Micro-benchmark of the geometry tables against approxDist and listAttackable.
+    Also checks that both give the same results (prints a message if they don't).
+
+    :param repeats: The number of times every cell (pair) is looked up.
+    :return: The time (in seconds) each way took.
+    """
+    for coords in BOARD_COORDS:
+        for other in BOARD_COORDS:
+            if DIST_TABLE[coords][other] != approxDist(coords, other):
+                print("Test for DIST_TABLE failed!")
+                break
+        for attack_range in ATTACK_RANGES:
+            if ATTACKABLE_TABLE[(coords, attack_range)] != listAttackable(coords, attack_range):
+                print("Test for ATTACKABLE_TABLE failed!")
+                break
+
+    results: Dict[str, float] = {}
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for coords in BOARD_COORDS:
+            for other in BOARD_COORDS:
+                approxDist(coords, other)
+    results["approxDist"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for coords in BOARD_COORDS:
+            distances = DIST_TABLE[coords]
+            for other in BOARD_COORDS:
+                distances[other]
+    results["DIST_TABLE"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for coords in BOARD_COORDS:
+            for attack_range in ATTACK_RANGES:
+                listAttackable(coords, attack_range)
+    results["listAttackable"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for coords in BOARD_COORDS:
+            for attack_range in ATTACK_RANGES:
+                ATTACKABLE_TABLE[(coords, attack_range)]
+    results["ATTACKABLE_TABLE"] = time.perf_counter() - start_time
+    return results
+
+
+def benchmark_import(repeats: int = 5) -> dict:
+    """
+    benchmark_import
+
+    Times importing the agent in fresh interpreters, which is what the referee
+    and every worker process pay before the first move.
+    Importing should be cheap: no tables built, no tests run and nothing printed.
+
+    :param repeats: The number of fresh interpreters to time.
+    :return: The fastest import time, and whether the import built the geometry tables
+             or printed anything.
+    """
+    import subprocess
+    module_dir, module_file = os.path.split(os.path.abspath(HadBarAgent.__file__))
+    probe = ("import time\n"
+             "start_time = time.perf_counter()\n"
+             "import %s as agent\n"
+             "print(time.perf_counter() - start_time, len(agent.DIST_TABLE))"
+             % os.path.splitext(module_file)[0])
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        [module_dir] + [path for path in sys.path if path]))
+
+    import_times = []
+    tables_built = False
+    output_lines: List[str] = []
+    for _ in range(repeats):
+        lines = subprocess.run([sys.executable, "-c", probe], env=environment, check=True,
+                               stdout=subprocess.PIPE, universal_newlines=True
+                               ).stdout.splitlines()
+        import_time, table_size = lines[-1].split()
+        import_times.append(float(import_time))
+        tables_built = tables_built or int(table_size) > 0
+        output_lines = lines[:-1]
+    return {
+        "import_ms": round(min(import_times) * 1e3, 3),
+        "tables_built": tables_built,
+        "printed_lines": len(output_lines)
+    }
+
+
+def create_benchmark_states(seed: int = 0,
+                            states_per_phase: int = 4) -> Dict[str, List[GameState]]:
+    """
+    create_benchmark_states
+
+    Creates the fixed corpus of GameStates used by run_benchmarks.
+    The states are built from getBasicState with a seeded random number generator,
+    so the same seed always gives the same corpus.
+
+    :param seed: The seed of the random number generator.
+    :param states_per_phase: The number of states for each phase of the game.
+    :return: The "opening", "midgame" and "endgame" states.
+    """
+    rng = random.Random(seed)
+    # (workers, drones, soldiers, ranged soldiers, max food count) of each player.
+    phase_armies = {
+        "opening": ((1, 2), (0, 0), (0, 0), (0, 0), 3),
+        "midgame": ((2, 3), (1, 2), (0, 1), (0, 1), 7),
+        "endgame": ((1, 3), (2, 3), (1, 2), (1, 2), 10)
+    }
+    corpus: Dict[str, List[GameState]] = {}
+    for phase, (workers, drones, soldiers, r_soldiers, max_food) in phase_armies.items():
+        corpus[phase] = []
+        for index in range(states_per_phase):
+            state = GameState.getBasicState()
+            state.whoseTurn = index % 2
+            occupied_constrs = {constr.coords for inventory in state.inventories
+                                for constr in inventory.constrs}
+            occupied_ants = {ant.coords for inventory in state.inventories
+                             for ant in inventory.ants}
+
+            def free_coords(rows: range, taken: set) -> tuple:
+                """ Picks a random coords in the rows that isn't taken (and takes it). """
+                while True:
+                    coords = (rng.randint(0, BOARD_LENGTH - 1), rng.choice(rows))
+                    if coords not in taken:
+                        taken.add(coords)
+                        return coords
+
+            for player in (PLAYER_ONE, PLAYER_TWO):
+                my_rows = range(0, 4) if player == PLAYER_ONE else range(6, 10)
+                enemy_rows = range(6, 10) if player == PLAYER_ONE else range(0, 4)
+                inventory = state.inventories[player]
+                inventory.foodCount = rng.randint(0, max_food)
+
+                # 9 grass on my side and 2 food on the enemy's side.
+                neutral_constrs = [Construction(free_coords(my_rows, occupied_constrs), GRASS)
+                                   for _ in range(9)]
+                neutral_constrs += [Construction(free_coords(enemy_rows, occupied_constrs), FOOD)
+                                    for _ in range(2)]
+                state.inventories[NEUTRAL].constrs.extend(neutral_constrs)
+
+                # Later in the game the ants spread over the whole board and are hurt.
+                ant_rows = my_rows if phase == "opening" else range(0, BOARD_LENGTH)
+                for ant_type, count_range in zip((WORKER, DRONE, SOLDIER, R_SOLDIER),
+                                                 (workers, drones, soldiers, r_soldiers)):
+                    for _ in range(rng.randint(*count_range)):
+                        ant = Ant(free_coords(ant_rows, occupied_ants), ant_type, player)
+                        ant.carrying = ant_type == WORKER and rng.random() < 0.5
+                        if phase == "endgame":
+                            ant.health = rng.randint(1, UNIT_STATS[ant_type][HEALTH])
+                        inventory.ants.append(ant)
+
+            # Keep the board in sync with the inventories.
+            if state.board is not None:
+                for inventory in state.inventories:
+                    for constr in inventory.constrs:
+                        state.board[constr.coords[0]][constr.coords[1]].constr = constr
+                    for ant in inventory.ants:
+                        state.board[ant.coords[0]][ant.coords[1]].ant = ant
+            corpus[phase].append(state)
+    return corpus
+
+
+def benchmark_parallel_search(states: List[GameState], depth_limit: int = 2,
+                              num_workers: int = 2) -> dict:
+    """
+    benchmark_parallel_search
+
+    Measures what searching the root in parallel costs on top of the search itself,
+    which is what PARALLEL_MIN_ROOT_WORK is calibrated from. A pool of one worker does
+    the same work as the serial search, plus making the subtree states, sending them
+    and rebuilding them, so the difference between the two is the overhead.
+    With num_workers workers (and as many free CPUs), the parallel search only wins
+    once the overhead is less than the (1 - 1 / num_workers) of the work it saves.
+
+    :param states: The states to search.
+    :param depth_limit: The depth of the searches.
+    :param num_workers: The number of workers to find the break-even work of.
+    :return: The serial time per unit of work (see AIPlayer._parallel_root_work),
+             the overhead per parallel search and the break-even work.
+    """
+    serial_player = AIPlayer(PLAYER_ONE, SearchConfig(depth_limit=depth_limit))
+    parallel_player = AIPlayer(PLAYER_ONE, SearchConfig(depth_limit=depth_limit, num_workers=1))
+    hasher = ZobristHasher()
+    serial_time = 0.0
+    parallel_time = 0.0
+    work = 0
+    try:
+        # Start the worker process before anything is timed.
+        parallel_player._get_process_pool().submit(build_geometry_tables).result()
+        for state in states:
+            # Every search starts with empty transposition tables.
+            serial_player.registerWin(False)
+            start_time = time.perf_counter()
+            serial_player.find_best_move(state, 0)
+            serial_time += time.perf_counter() - start_time
+
+            parallel_player.registerWin(False)
+            search_state = state.fastclone()
+            start_time = time.perf_counter()
+            child_nodes = parallel_player._expand(search_state, hasher.hash_state(search_state))
+            best_nodes = parallel_player._get_best_nodes(child_nodes)
+            parallel_player._search_root_in_parallel(search_state, best_nodes, depth_limit)
+            parallel_time += time.perf_counter() - start_time
+            work += parallel_player._parallel_root_work(len(child_nodes), len(best_nodes),
+                                                        depth_limit)
+    finally:
+        parallel_player.shutdown_workers()
+
+    work_time = serial_time / work
+    overhead = max(parallel_time - serial_time, 0.0) / len(states)
+    return {
+        "work_us": round(work_time * 1e6, 3),
+        "overhead_ms": round(overhead * 1e3, 3),
+        "break_even_work": round(overhead / (work_time * (1 - 1 / num_workers)))
+    }
+
+
+def run_benchmarks(output_path: Optional[str] = None, seed: int = 0, states_per_phase: int = 4,
+                   repeats: int = 3, depth_limit: int = 2) -> dict:
+    """
+    run_benchmarks
+
+    Times importing the agent (see benchmark_import), and evaluate_game_state, getNextState
+    and find_best_move on the benchmark corpus (see create_benchmark_states),
+    measures the peak memory of find_best_move and the overhead of searching the root
+    in parallel (see benchmark_parallel_search).
+    The results are written as JSON so they can be compared across commits.
+    The geometry tables and the StaticGeometry of each state are built before anything
+    is timed, since a game only builds them once.
+
+    :param output_path: Where to write the results (None to not write them).
+    :param seed: The seed of the benchmark corpus.
+    :param states_per_phase: The number of states for each phase of the game.
+    :param repeats: The number of times each state is evaluated and each move is made.
+    :param depth_limit: The depth of the find_best_move searches.
+    :return: The results.
+    """
+    import json
+    import tracemalloc
+    corpus = create_benchmark_states(seed, states_per_phase)
+    results = {
+        "python": sys.version.split()[0],
+        "seed": seed,
+        "states_per_phase": states_per_phase,
+        "depth_limit": depth_limit,
+        "import": benchmark_import(),
+        "phases": {}
+    }
+    build_geometry_tables()
+    for phase, states in corpus.items():
+        player = AIPlayer(PLAYER_ONE, SearchConfig(depth_limit=depth_limit))
+        for state in states:
+            player.evaluate_game_state(state)
+
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            for state in states:
+                player.evaluate_game_state(state)
+        evaluation_time = (time.perf_counter() - start_time) / (repeats * len(states))
+
+        moves = [(state, move) for state in states for move in listAllLegalMoves(state)]
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            for state, move in moves:
+                player.getNextState(state, move)
+        next_state_time = (time.perf_counter() - start_time) / (repeats * len(moves))
+
+        # Every search starts with empty transposition tables.
+        search_time = 0.0
+        nodes_searched = 0
+        for state in states:
+            player.registerWin(False)
+            player.nodes_searched = 0
+            start_time = time.perf_counter()
+            player.find_best_move(state, 0)
+            search_time += time.perf_counter() - start_time
+            nodes_searched += player.nodes_searched
+
+        # The memory is measured separately, since tracemalloc slows everything down.
+        peak_memory = 0
+        for state in states:
+            player.registerWin(False)
+            tracemalloc.start()
+            player.find_best_move(state, 0)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        results["phases"][phase] = {
+            "evaluate_game_state_us": round(evaluation_time * 1e6, 3),
+            "getNextState_us": round(next_state_time * 1e6, 3),
+            "find_best_move_ms": round(search_time * 1e3 / len(states), 3),
+            "nodes_per_move": nodes_searched / len(states),
+            "nodes_per_sec": round(nodes_searched / search_time, 1) if search_time else None,
+            "peak_memory_kb": round(peak_memory / 1024, 1)
+        }
+    results["parallel_search"] = benchmark_parallel_search(
+        [state for states in corpus.values() for state in states], depth_limit)
+
+    if output_path is not None:
+        with open(output_path, "w") as results_file:
+            json.dump(results, results_file, indent=2, sort_keys=True)
+    return results
@@ -0,0 +1,94 @@
+from AIPlayerUtils import *
+from Constants import *
+from GameState import GameState
+from HadBarAgent import OPENING_BOOK_PATH, AIPlayer, OpeningBook, SearchConfig, ZobristHasher, \
+    _flip_move_key, _move_key
+from Player import Player
+from tools.selfplay import play_game
+from typing import Dict, Optional
+
+
+def build_opening_book(output_path: str = OPENING_BOOK_PATH, opponents: tuple = ("random",),
+                       games_per_opponent: int = 20, book_turns: int = 4, seed: int = 0,
+                       config: Optional[SearchConfig] = None, max_rounds: int = 20) -> int:
+    """
+    build_opening_book
+
+    Builds the opening book: plays headless games (see play_game) against the opponents,
+    collects the positions where the agent is to move in the first book_turns turns
+    (by ZobristHasher.hash_opening), finds the best move of each with a deep search,
+    and writes the book.
+    The agent plays the moves of the book built so far, so the games follow the book's
+    own lines (a book move the shallow search wouldn't make leads to new positions).
+    That's repeated until the games don't reach any position that isn't in the book.
+
+    :param output_path: Where to write the book.
+    :param opponents: The opponent specs to play against (see _create_player).
+    :param games_per_opponent: The number of games played against each opponent.
+    :param book_turns: The number of turns from the start of the game that go in the book.
+    :param seed: The seed of the first game.
+    :param config: The search options of the deep search.
+    :param max_rounds: Max number of times the games are played.
+    :return: The number of positions in the book.
+    """
+    if config is None:
+        config = SearchConfig(depth_limit=3, num_best_nodes=8)
+    searcher = AIPlayer(PLAYER_ONE, config, opening_book_path=None)
+    hasher = ZobristHasher()
+    entries: Dict[int, tuple] = {}
+    # Start from an empty book, so the positions don't depend on an old one.
+    OpeningBook.write(output_path, entries)
+    for _ in range(max_rounds):
+        new_positions = opening_book_positions(output_path, opponents, games_per_opponent,
+                                               book_turns, seed)["missed"]
+        if not new_positions:
+            break
+        for position_key, current_state in new_positions.items():
+            move_key = _move_key(searcher.getMove(current_state))
+            # The book moves are seen from my side of the board (like the keys).
+            if hasher.hash_opening(current_state)[1]:
+                move_key = _flip_move_key(move_key)
+            entries[position_key] = move_key
+        OpeningBook.write(output_path, entries)
+    return len(entries)
+
+
+def opening_book_positions(book_path: str, opponents: tuple = ("random",),
+                           games_per_opponent: int = 20, book_turns: int = 4,
+                           seed: int = 0) -> dict:
+    """
+    opening_book_positions
+
+    Plays headless games (see play_game) against the opponents with the agent using
+    the book, and checks the positions where the agent is to move in the first book_turns
+    turns against the book.
+
+    :param book_path: The path of the book.
+    :param opponents: The opponent specs to play against (see _create_player).
+    :param games_per_opponent: The number of games played against each opponent.
+    :param book_turns: The number of turns from the start of the game that are checked.
+    :param seed: The seed of the first game.
+    :return: The number of positions checked ("lookups") and found in the book ("hits"),
+             and the positions that weren't found, by hash_opening ("missed").
+    """
+    hasher = ZobristHasher()
+    book = OpeningBook(book_path)
+    results = {"lookups": 0, "hits": 0, "missed": {}}
+
+    def check_position(current_state: GameState, turn: int, player: Player) -> None:
+        """ Looks the positions where the agent is to move early in the game up. """
+        if turn < book_turns and isinstance(player, AIPlayer):
+            position_key = hasher.hash_opening(current_state)[0]
+            results["lookups"] += 1
+            if book.lookup(position_key) is not None:
+                results["hits"] += 1
+            else:
+                results["missed"].setdefault(position_key, current_state.fastclone())
+
+    agent_spec = {"opening_book_path": book_path}
+    for opponent in opponents:
+        for game in range(games_per_opponent):
+            player_specs = (agent_spec, opponent) if game % 2 == 0 else (opponent, agent_spec)
+            play_game(player_specs, seed + game, max_turns=book_turns,
+                      position_callback=check_position)
+    return results
@@ -0,0 +1,474 @@
+from AIPlayerUtils import *
+from Constants import *
+from GameState import GameState
+from HadBarAgent import AIPlayer, SearchState, StaticGeometry, ZobristHasher, _move_key, \
+    create_test_game_state
+from typing import Iterator, List, Optional, Tuple
+import os
+import struct
+
+
+class GameRecordFormat:
+    """
+    GameRecordFormat
+
+    The layout of a game record file: a header (magic, version and record size),
+    then fixed-width little-endian records, one per getMove call or finished game.
+    A record holds the game ID, the number of the move in the game, what kind of record
+    it is, the recording player, the whole position (phase, turn, food counts, the
+    anthills, tunnels, food and grass, and every ant in inventory order), the move,
+    the search time and nodes, and the result of the game (for outcome records).
+    Coords are stored as a cell byte (x + y * BOARD_LENGTH, NO_VALUE for none),
+    and each ant as its cell, its type and flags (carrying, hasMoved) and its health.
+    """
+    MAGIC = b"HBGR"
+    VERSION = 1
+    NO_VALUE = 255
+    MOVE_RECORD, OUTCOME_RECORD = 0, 1
+    # The most pieces a record has room for.
+    MAX_ANTS = 16
+    MAX_FOOD = 8
+    MAX_GRASS = 40
+    MAX_PATH = 8
+
+    HEADER = struct.Struct("<4sHH")
+    RECORD = struct.Struct("<IHBBBB2B2B2B2B2BB%dsB%ds" % (MAX_FOOD, MAX_GRASS) +
+                           "B%ds" % (3 * MAX_ANTS) * 2 + "BBB%dsfIb" % MAX_PATH)
+    # Flags of an ant (next to its type).
+    CARRYING = 0x08
+    MOVED = 0x10
+    TYPE_MASK = 0x07
+
+    @staticmethod
+    def encode_cells(coords_list: List[tuple], size: int) -> bytes:
+        """
+        encode_cells
+
+        :param coords_list: The coords to encode.
+        :param size: The size of the field (the coords are padded with NO_VALUE).
+        :return: The cells.
+        """
+        if len(coords_list) > size:
+            raise ValueError("%d coords don't fit in a field of %d" % (len(coords_list), size))
+        return bytes([x + y * BOARD_LENGTH for x, y in coords_list] +
+                     [GameRecordFormat.NO_VALUE] * (size - len(coords_list)))
+
+    @staticmethod
+    def decode_cells(cells: bytes, count: int) -> List[tuple]:
+        """
+        decode_cells
+
+        :param cells: The field to decode.
+        :param count: The number of cells in use.
+        :return: The coords.
+        """
+        return [(cell % BOARD_LENGTH, cell // BOARD_LENGTH) for cell in cells[:count]]
+
+    @staticmethod
+    def encode_cell(coords: Optional[tuple]) -> int:
+        """
+        encode_cell
+
+        :param coords: Some coords (or None).
+        :return: The cell byte.
+        """
+        if coords is None:
+            return GameRecordFormat.NO_VALUE
+        return coords[0] + coords[1] * BOARD_LENGTH
+
+    @staticmethod
+    def decode_cell(cell: int) -> Optional[tuple]:
+        """
+        decode_cell
+
+        :param cell: A cell byte.
+        :return: The coords (or None).
+        """
+        if cell == GameRecordFormat.NO_VALUE:
+            return None
+        return cell % BOARD_LENGTH, cell // BOARD_LENGTH
+
+
+class GameRecordWriter:
+    """
+    GameRecordWriter
+
+    Appends records to a game record file (see GameRecordFormat) through a buffer,
+    so recording a move doesn't cost a system call. The buffer is flushed at the end
+    of every game. Only one writer should append to a file at a time.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        """
+        __init__
+
+        Opens the file for appending (and writes the header if it's new).
+
+        :param path: The path of the game record file.
+        :param buffer_size: The size of the write buffer in bytes.
+        """
+        record_format = GameRecordFormat
+        self.path = path
+        self._file = open(path, "ab", buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(record_format.HEADER.pack(record_format.MAGIC,
+                                                       record_format.VERSION,
+                                                       record_format.RECORD.size))
+            num_records = 0
+        else:
+            num_records = (self._file.tell() - record_format.HEADER.size) // \
+                record_format.RECORD.size
+        # Every game gets the index of the next record as its ID, so IDs never repeat.
+        self.game_id = num_records
+        self.num_records = num_records
+        self.move_number = 0
+        # The positions that didn't fit in a record (too many pieces).
+        self.skipped = 0
+
+    def write_move(self, player: int, current_state: GameState, move: Move,
+                   search_time_ms: float = 0.0, nodes: int = 0) -> bool:
+        """
+        write_move
+
+        Appends the record of a getMove call.
+
+        :param player: The player that moved.
+        :param current_state: The state getMove was called with.
+        :param move: The move it returned.
+        :param search_time_ms: The time the call took.
+        :param nodes: The number of nodes searched.
+        :return: Whether the record was written (False if the position didn't fit).
+        """
+        try:
+            record = self._encode(GameRecordFormat.MOVE_RECORD, player,
+                                  SearchState.from_game_state(current_state), move,
+                                  search_time_ms, nodes, -1)
+        except ValueError:
+            self.skipped += 1
+            return False
+        self._file.write(record)
+        self.num_records += 1
+        self.move_number += 1
+        return True
+
+    def write_outcome(self, player: int, has_won: bool) -> None:
+        """
+        write_outcome
+
+        Appends the outcome of the game, flushes the file and starts a new game.
+
+        :param player: The recording player.
+        :param has_won: Whether the player won.
+        """
+        self._file.write(self._encode(GameRecordFormat.OUTCOME_RECORD, player, None, None,
+                                      0.0, 0, int(has_won)))
+        self.num_records += 1
+        self._file.flush()
+        self.game_id = self.num_records
+        self.move_number = 0
+
+    def _encode(self, kind: int, player: int, search_state: Optional[SearchState],
+                move: Optional[Move], search_time_ms: float, nodes: int, result: int) -> bytes:
+        """
+        _encode
+
+        :param kind: MOVE_RECORD or OUTCOME_RECORD.
+        :param player: The recording player.
+        :param search_state: The position (None for an outcome).
+        :param move: The move (None for an outcome).
+        :param search_time_ms: The time of the search.
+        :param nodes: The number of nodes searched.
+        :param result: 1 if the player won, 0 if it lost, -1 if the game isn't over.
+        :return: The record.
+        """
+        record_format = GameRecordFormat
+        no_value = record_format.NO_VALUE
+        if search_state is None:
+            search_state = SearchState(player, PLAY_PHASE)
+        ant_fields = []
+        for ant_player in (PLAYER_ONE, PLAYER_TWO):
+            num_ants = len(search_state.ant_coords[ant_player])
+            if num_ants > record_format.MAX_ANTS:
+                raise ValueError("%d ants don't fit in a record" % num_ants)
+            ants = bytearray([no_value] * (3 * record_format.MAX_ANTS))
+            for i, coords in enumerate(search_state.ant_coords[ant_player]):
+                ants[3 * i] = record_format.encode_cell(coords)
+                ants[3 * i + 1] = search_state.ant_types[ant_player][i] | \
+                    (record_format.CARRYING if search_state.ant_carrying[ant_player][i] else 0) | \
+                    (record_format.MOVED if search_state.ant_moved[ant_player][i] else 0)
+                ants[3 * i + 2] = search_state.ant_health[ant_player][i]
+            ant_fields.extend((num_ants, bytes(ants)))
+
+        move_type = build_type = no_value
+        path = []
+        if move is not None:
+            move_type = move.moveType
+            build_type = move.buildType if move.buildType is not None else no_value
+            path = move.coordList or []
+        return record_format.RECORD.pack(
+            self.game_id, min(self.move_number, 0xFFFF), kind, player,
+            search_state.whose_turn, search_state.phase,
+            *search_state.food_counts, *search_state.anthill_capture_health,
+            *search_state.tunnel_capture_health,
+            *[record_format.encode_cell(coords) for coords in search_state.anthill_coords],
+            *[record_format.encode_cell(coords) for coords in search_state.tunnel_coords],
+            len(search_state.food_coords),
+            record_format.encode_cells(search_state.food_coords, record_format.MAX_FOOD),
+            len(search_state.grass_coords),
+            record_format.encode_cells(search_state.grass_coords, record_format.MAX_GRASS),
+            *ant_fields,
+            move_type, build_type, len(path),
+            record_format.encode_cells(path, record_format.MAX_PATH),
+            search_time_ms, min(nodes, 0xFFFFFFFF), result)
+
+    def flush(self) -> None:
+        """
+        flush
+
+        Writes the buffered records to the file.
+        """
+        self._file.flush()
+
+    def close(self) -> None:
+        """
+        close
+
+        Flushes and closes the file.
+        """
+        self._file.close()
+
+
+class GameRecord:
+    """
+    GameRecord
+
+    A lightweight view of one record of a game record file (see GameRecordReader).
+    The fields are unpacked when the view is made; the position is only decoded
+    when search_state or game_state is called.
+    """
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: tuple):
+        """
+        __init__
+
+        :param fields: The unpacked fields of the record (GameRecordFormat.RECORD).
+        """
+        self.fields = fields
+
+    @property
+    def game_id(self) -> int:
+        return self.fields[0]
+
+    @property
+    def move_number(self) -> int:
+        return self.fields[1]
+
+    @property
+    def kind(self) -> int:
+        return self.fields[2]
+
+    @property
+    def player(self) -> int:
+        return self.fields[3]
+
+    @property
+    def search_time_ms(self) -> float:
+        return self.fields[-3]
+
+    @property
+    def nodes(self) -> int:
+        return self.fields[-2]
+
+    @property
+    def result(self) -> Optional[int]:
+        """
+        result
+
+        :return: 1 if the player won, 0 if it lost, None for a move record.
+        """
+        return self.fields[-1] if self.fields[-1] >= 0 else None
+
+    @property
+    def move(self) -> Optional[Move]:
+        """
+        move
+
+        :return: The move of a move record (None for an outcome).
+        """
+        move_type, build_type, path_length, path = self.fields[-7:-3]
+        if move_type == GameRecordFormat.NO_VALUE:
+            return None
+        return Move(move_type, GameRecordFormat.decode_cells(path, path_length) or None,
+                    build_type if build_type != GameRecordFormat.NO_VALUE else None)
+
+    def search_state(self) -> SearchState:
+        """
+        search_state
+
+        :return: The position of the record as a SearchState.
+        """
+        record_format = GameRecordFormat
+        (_, _, _, _, whose_turn, phase, food_count_1, food_count_2, anthill_health_1,
+         anthill_health_2, tunnel_health_1, tunnel_health_2, anthill_1, anthill_2, tunnel_1,
+         tunnel_2, num_food, food, num_grass, grass, num_ants_1, ants_1, num_ants_2,
+         ants_2) = self.fields[:24]
+        search_state = SearchState(whose_turn, phase)
+        search_state.food_counts = [food_count_1, food_count_2]
+        search_state.anthill_capture_health = [anthill_health_1, anthill_health_2]
+        search_state.tunnel_capture_health = [tunnel_health_1, tunnel_health_2]
+        search_state.anthill_coords = [record_format.decode_cell(anthill_1),
+                                       record_format.decode_cell(anthill_2)]
+        search_state.tunnel_coords = [record_format.decode_cell(tunnel_1),
+                                      record_format.decode_cell(tunnel_2)]
+        search_state.food_coords = record_format.decode_cells(food, num_food)
+        search_state.grass_coords = record_format.decode_cells(grass, num_grass)
+
+        for player, num_ants, ants in ((PLAYER_ONE, num_ants_1, ants_1),
+                                       (PLAYER_TWO, num_ants_2, ants_2)):
+            for i in range(num_ants):
+                coords = record_format.decode_cell(ants[3 * i])
+                ant_type = ants[3 * i + 1] & record_format.TYPE_MASK
+                search_state.ant_coords[player].append(coords)
+                search_state.ant_types[player].append(ant_type)
+                search_state.ant_health[player].append(ants[3 * i + 2])
+                search_state.ant_carrying[player].append(
+                    bool(ants[3 * i + 1] & record_format.CARRYING))
+                search_state.ant_moved[player].append(bool(ants[3 * i + 1] & record_format.MOVED))
+                search_state.type_index[player][ant_type].append(i)
+                # Same as getAntAt: the first ant found at the coords wins.
+                if coords not in search_state.occupied:
+                    search_state.occupied[coords] = (player, i)
+        search_state.geometry = StaticGeometry.for_layout(tuple(search_state.food_coords),
+                                                          tuple(search_state.anthill_coords),
+                                                          tuple(search_state.tunnel_coords),
+                                                          tuple(search_state.grass_coords))
+        return search_state
+
+    def game_state(self) -> GameState:
+        """
+        game_state
+
+        :return: The position of the record as a full GameState (see SearchState.to_game_state).
+        """
+        return self.search_state().to_game_state()
+
+
+class GameRecordReader:
+    """
+    GameRecordReader
+
+    Reads a game record file (see GameRecordFormat) through a read-only memory map,
+    so files with millions of records can be streamed (or indexed) without reading
+    them into memory.
+    """
+
+    def __init__(self, path: Optional[str], data: Optional[bytes] = None):
+        """
+        __init__
+
+        Opens a game record file.
+
+        :param path: The path of the game record file.
+        :param data: The contents of a game record file (instead of mapping the file).
+        """
+        import mmap
+        record_format = GameRecordFormat
+        self.path = path
+        self._file = None
+        self._map = None
+        if data is None:
+            self._file = open(path, "rb")
+            if os.fstat(self._file.fileno()).st_size > 0:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                data = self._map
+            else:
+                data = b""
+        self._data = data
+        if len(data) >= record_format.HEADER.size:
+            magic, version, record_size = record_format.HEADER.unpack_from(data, 0)
+            if magic != record_format.MAGIC or version != record_format.VERSION or \
+                    record_size != record_format.RECORD.size:
+                self.close()
+                raise ValueError("%s isn't a version %d game record file"
+                                 % (path, record_format.VERSION))
+
+    def __len__(self) -> int:
+        return max(0, len(self._data) - GameRecordFormat.HEADER.size) // \
+            GameRecordFormat.RECORD.size
+
+    def __getitem__(self, index: int) -> GameRecord:
+        """
+        __getitem__
+
+        :param index: The index of a record.
+        :return: The view of the record.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return GameRecord(GameRecordFormat.RECORD.unpack_from(
+            self._data, GameRecordFormat.HEADER.size + index * GameRecordFormat.RECORD.size))
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def game_states(self) -> Iterator[Tuple[GameRecord, GameState]]:
+        """
+        game_states
+
+        :return: Every move record along with its position as a full GameState.
+        """
+        for record in self:
+            if record.kind == GameRecordFormat.MOVE_RECORD:
+                yield record, record.game_state()
+
+    def close(self) -> None:
+        """
+        close
+
+        Unmaps and closes the file.
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "GameRecordReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def run_unit_tests() -> None:
+    """
+    run_unit_tests
+
+    Tests the game record format (failures are printed).
+    """
+    import tempfile
+    hasher = ZobristHasher()
+    test_game_state = create_test_game_state()
+
+    # Test the game record format.
+    # The positions and moves written by getMove should read back the same,
+    # and the outcome should end the game.
+    with tempfile.TemporaryDirectory() as record_dir:
+        record_path = os.path.join(record_dir, "games.bin")
+        record_player = AIPlayer(0, record_path=record_path, opening_book_path=None)
+        record_move = record_player.getMove(test_game_state)
+        record_player.registerWin(True)
+        record_player.game_record.close()
+        with GameRecordReader(record_path) as reader:
+            records = list(reader)
+            if len(records) != 2 or records[0].kind != GameRecordFormat.MOVE_RECORD or \
+                    hasher.hash_state(records[0].game_state()) != \
+                    hasher.hash_state(SearchState.from_game_state(test_game_state)
+                                      .to_game_state()) or \
+                    _move_key(records[0].move) != _move_key(record_move) or \
+                    records[0].result is not None or records[1].result != 1 or \
+                    records[1].game_id != records[0].game_id or records[1].move is not None:
+                print("Test for GameRecordReader failed!")
@@ -0,0 +1,301 @@
+from AIPlayerUtils import *
+from Constants import *
+from GameState import GameState
+from HadBarAgent import AIPlayer, SearchConfig, _flip_coords, _move_key
+from Player import Player
+from typing import Callable, List, Optional
+import random
+import time
+
+
+class RandomOpponent(Player):
+    """
+    RandomOpponent
+
+    Opponent for play_game: places everything at random and plays random legal moves.
+    It has its own seeded random number generator, so its games can be replayed.
+    """
+    def __init__(self, input_player_id: int, seed: int = 0):
+        """
+        __init__
+
+        Creates a new RandomOpponent.
+
+        :param input_player_id: The player's ID as an integer.
+        :param seed: The seed of the random number generator.
+        """
+        super(RandomOpponent, self).__init__(input_player_id, "Random")
+        self._rng = random.Random(seed)
+
+    def getPlacement(self, current_state):
+        """
+        getPlacement
+
+        :param current_state: The state of the game (always seen from player one's side).
+        :return: 11 free coords on my side (phase 1) or 2 on the enemy's side (phase 2).
+        """
+        taken = {constr.coords for inventory in current_state.inventories
+                 for constr in inventory.constrs}
+        if current_state.phase == SETUP_PHASE_1:
+            num_to_place, rows = 11, range(0, 4)
+        else:
+            num_to_place, rows = 2, range(6, 10)
+        free_coords = [(x, y) for x in range(BOARD_LENGTH) for y in rows if (x, y) not in taken]
+        return self._rng.sample(free_coords, num_to_place)
+
+    def getMove(self, current_state):
+        return self._rng.choice(listAllLegalMoves(current_state))
+
+    def getAttack(self, current_state, attacking_ant, enemy_locations):
+        return self._rng.choice(enemy_locations)
+
+    def registerWin(self, has_won):
+        pass
+
+
+class PlacementOnlyOpponent(RandomOpponent):
+    """
+    PlacementOnlyOpponent
+
+    Opponent for play_game that places everything at random and then just ends every turn.
+    """
+    def getMove(self, current_state):
+        return Move(END, None, None)
+
+
+def _create_player(player_spec, player_id: int, seed: int) -> Player:
+    """
+    _create_player
+
+    :param player_spec: "random", "placement" or a dict of AIPlayer constructor options
+                        (the search options go in it as a SearchConfig, under "config").
+    :param player_id: The ID of the player.
+    :param seed: The seed of the game.
+    :return: The player.
+    """
+    if player_spec == "random":
+        return RandomOpponent(player_id, seed * 2 + player_id)
+    if player_spec == "placement":
+        return PlacementOnlyOpponent(player_id, seed * 2 + player_id)
+    return AIPlayer(player_id, **player_spec)
+
+
+def _setup_view(current_state: GameState, player: int) -> GameState:
+    """
+    _setup_view
+
+    getPlacement always places as player one (my side is rows 0 to 3),
+    so player two is shown the constructions from its side of the board.
+
+    :param current_state: The state of the game during setup.
+    :param player: The player that is placing.
+    :return: The state of the game as the player sees it (with a board).
+    """
+    view = GameState.getBlankState()
+    view.phase = current_state.phase
+    view.whoseTurn = player
+    for inventory_index, inventory in enumerate(current_state.inventories):
+        for constr in inventory.constrs:
+            coords = _flip_coords(constr.coords) if player == PLAYER_TWO else constr.coords
+            view_constr = Construction(coords, constr.type)
+            view.inventories[inventory_index].constrs.append(view_constr)
+            view.board[coords[0]][coords[1]].constr = view_constr
+    return view
+
+
+def _place_constructions(current_state: GameState, player: int, coords_list: List[tuple]) -> None:
+    """
+    _place_constructions
+
+    Places what getPlacement asked for: in setup phase 1 the anthill, tunnel and 9 grass
+    on the player's side, in setup phase 2 the 2 food on the enemy's side.
+
+    :param current_state: The state of the game during setup (modified in place).
+    :param player: The player that is placing.
+    :param coords_list: The coords returned by getPlacement (on the real board).
+    """
+    if current_state.phase == SETUP_PHASE_1:
+        constr_types = [ANTHILL, TUNNEL] + [GRASS] * 9
+        rows_player = player
+    else:
+        constr_types = [FOOD] * 2
+        rows_player = 1 - player
+    rows = range(0, 4) if rows_player == PLAYER_ONE else range(6, 10)
+
+    taken = {constr.coords for inventory in current_state.inventories
+             for constr in inventory.constrs}
+    if len(coords_list) != len(constr_types):
+        raise ValueError("Player %d placed %d constructions instead of %d"
+                         % (player, len(coords_list), len(constr_types)))
+    for coords, constr_type in zip(coords_list, constr_types):
+        coords = tuple(coords)
+        if coords in taken or not legalCoord(coords) or coords[1] not in rows:
+            raise ValueError("Player %d can't place a construction at %s" % (player, coords))
+        taken.add(coords)
+        constr = Construction(coords, constr_type)
+        if constr_type in (ANTHILL, TUNNEL):
+            # Buildings know which player owns them.
+            constr.player = player
+            current_state.inventories[player].constrs.append(constr)
+        else:
+            current_state.inventories[NEUTRAL].constrs.append(constr)
+
+
+def play_game(player_specs: tuple, seed: int = 0, max_turns: int = 300,
+              max_moves_per_turn: int = 100,
+              position_callback: Optional[Callable[..., None]] = None) -> dict:
+    """
+    play_game
+
+    Plays a headless game between two players, without the referee.
+    The setup phases use getPlacement, and the moves are played with the full rules of
+    make_move (attacks hit the first enemy in range, like in getNextState).
+    Both players start with their queen on the anthill and a worker on the tunnel.
+    A player loses if it makes an illegal move (or places a construction illegally).
+
+    :param player_specs: The (player one, player two) specs (see _create_player).
+    :param seed: The seed of the game (the same seed always plays the same game).
+    :param max_turns: The game is a draw after this many turns.
+    :param max_moves_per_turn: The turn is ended for a player that makes this many moves.
+    :param position_callback: Called with the state passed to getMove, the turn number and
+                              the player before every getMove call.
+    :return: The winner (None for a draw), the number of turns,
+             and the total time and number of moves of each player.
+    """
+    # AIPlayer.getPlacement uses the random module.
+    random.seed(seed)
+    players = [_create_player(player_spec, player_id, seed)
+               for player_id, player_spec in enumerate(player_specs)]
+    referee = AIPlayer(PLAYER_ONE, SearchConfig(evaluation_table_size=1, subtree_table_size=1,
+                                                search_tree_size=0))
+    move_times = [0.0, 0.0]
+    move_counts = [0, 0]
+    winner = None
+    turns = 0
+
+    current_state = GameState.getBlankState()
+    try:
+        for phase in (SETUP_PHASE_1, SETUP_PHASE_2):
+            current_state.phase = phase
+            for player in (PLAYER_ONE, PLAYER_TWO):
+                current_state.whoseTurn = player
+                coords_list = players[player].getPlacement(_setup_view(current_state, player))
+                if player == PLAYER_TWO:
+                    coords_list = [_flip_coords(coords) for coords in coords_list]
+                _place_constructions(current_state, player, coords_list)
+    except ValueError:
+        winner = 1 - current_state.whoseTurn
+
+    current_state = GameState(None, current_state.inventories, PLAY_PHASE, PLAYER_ONE)
+    if winner is None:
+        for player in (PLAYER_ONE, PLAYER_TWO):
+            inventory = current_state.inventories[player]
+            inventory.ants.append(Ant(inventory.getAnthill().coords, QUEEN, player))
+            inventory.ants.append(Ant(inventory.getTunnels()[0].coords, WORKER, player))
+
+    moves_this_turn = 0
+    while winner is None and turns < max_turns:
+        me = current_state.whoseTurn
+        if moves_this_turn >= max_moves_per_turn:
+            move = Move(END, None, None)
+        else:
+            player_state = current_state.fastclone()
+            if position_callback is not None:
+                position_callback(player_state, turns, players[me])
+            start_time = time.perf_counter()
+            move = players[me].getMove(player_state)
+            move_times[me] += time.perf_counter() - start_time
+            move_counts[me] += 1
+            legal_move_keys = {_move_key(legal_move)
+                               for legal_move in listAllLegalMoves(current_state)}
+            if move is None or _move_key(move) not in legal_move_keys:
+                winner = 1 - me
+                break
+
+        referee.make_move(current_state, move, full_rules=True)
+        moves_this_turn += 1
+        if move.moveType == END:
+            turns += 1
+            moves_this_turn = 0
+        result = getWinner(current_state)
+        if result is not None:
+            winner = current_state.whoseTurn if result == 1 else 1 - current_state.whoseTurn
+
+    for player_id, player in enumerate(players):
+        player.registerWin(winner == player_id)
+        if isinstance(player, AIPlayer):
+            player.shutdown_workers()
+    return {"winner": winner, "turns": turns, "move_times": move_times,
+            "move_counts": move_counts}
+
+
+def _play_game_task(task: tuple) -> dict:
+    """
+    _play_game_task
+
+    play_game for the process pool of run_self_play.
+
+    :param task: The arguments of play_game.
+    :return: The result of play_game.
+    """
+    return play_game(*task)
+
+
+def run_self_play(player_specs: tuple = ({}, "random"), num_games: int = 100, seed: int = 0,
+                  num_workers: int = 0, max_turns: int = 300) -> dict:
+    """
+    run_self_play
+
+    Plays a match between two player specs (see _create_player) with play_game.
+    Game i uses seed + i, and the players swap sides every game.
+    The results are from the point of view of the first player spec.
+
+    :param player_specs: The two player specs.
+    :param num_games: The number of games to play.
+    :param seed: The seed of the first game.
+    :param num_workers: If more than 0, the games are played by this many worker processes.
+    :param max_turns: The games are draws after this many turns.
+    :return: The wins, losses and draws, the win rate, the average number of turns,
+             the ms per move of each player spec and the games per second.
+    """
+    tasks = []
+    for game in range(num_games):
+        game_specs = tuple(player_specs) if game % 2 == 0 else tuple(reversed(player_specs))
+        tasks.append((game_specs, seed + game, max_turns))
+
+    start_time = time.perf_counter()
+    if num_workers > 0:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            results = list(pool.map(_play_game_task, tasks))
+    else:
+        results = [_play_game_task(task) for task in tasks]
+    elapsed_time = time.perf_counter() - start_time
+
+    wins = losses = 0
+    move_times = [0.0, 0.0]
+    move_counts = [0, 0]
+    for game, result in enumerate(results):
+        # The seat of each player spec in this game.
+        seats = (0, 1) if game % 2 == 0 else (1, 0)
+        if result["winner"] == seats[0]:
+            wins += 1
+        elif result["winner"] == seats[1]:
+            losses += 1
+        for spec_index, seat in enumerate(seats):
+            move_times[spec_index] += result["move_times"][seat]
+            move_counts[spec_index] += result["move_counts"][seat]
+
+    return {
+        "games": num_games,
+        "seed": seed,
+        "wins": wins,
+        "losses": losses,
+        "draws": num_games - wins - losses,
+        "win_rate": wins / num_games if num_games else 0.0,
+        "average_turns": sum(result["turns"] for result in results) / num_games
+        if num_games else 0.0,
+        "ms_per_move": [move_times[i] * 1e3 / move_counts[i] if move_counts[i] else None
+                        for i in range(2)],
+        "games_per_second": num_games / elapsed_time if elapsed_time else None
+    }
@@ -0,0 +1,150 @@
+from AIPlayerUtils import *
+from Constants import *
+from GameState import GameState
+from HadBarAgent import AIPlayer, EvalWeights
+from Player import Player
+from tools.selfplay import play_game
+from typing import Iterator, List, Optional, Tuple
+import itertools
+import math
+import os
+
+# Where fit_eval_weights writes the tuned evaluation weights by default (see EvalWeights).
+EVAL_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "HadBarAgent_weights.json")
+
+
+def record_training_positions(dataset_path: str, player_specs: tuple = ({}, "random"),
+                              num_games: int = 100, seed: int = 0, max_turns: int = 300) -> int:
+    """
+    record_training_positions
+
+    Plays headless games (see play_game) and appends the evaluation features of every
+    position a player had to move in, with the result of the game for that player
+    (1.0 for a win, 0.5 for a draw and 0.0 for a loss), to a dataset for fit_eval_weights.
+    The dataset has a line of JSON per position.
+
+    :param dataset_path: The dataset to append to.
+    :param player_specs: The (player one, player two) specs (see _create_player).
+    :param num_games: The number of games to play (the players switch sides every game).
+    :param seed: The seed of the first game.
+    :param max_turns: The game is a draw after this many turns.
+    :return: The number of positions recorded.
+    """
+    import json
+    featurizer = AIPlayer(PLAYER_ONE, opening_book_path=None)
+    num_positions = 0
+    with open(dataset_path, "a") as dataset_file:
+        for game in range(num_games):
+            specs = player_specs if game % 2 == 0 else player_specs[::-1]
+            positions: List[Tuple[int, List[float]]] = []
+
+            def record_position(current_state: GameState, turn: int, player: Player) -> None:
+                """ Keeps the features of the positions the weights make a difference in. """
+                features = featurizer.evaluation_features(current_state)
+                if features is not None:
+                    positions.append((current_state.whoseTurn, features))
+
+            winner = play_game(specs, seed + game, max_turns=max_turns,
+                               position_callback=record_position)["winner"]
+            for player_id, features in positions:
+                result = 0.5 if winner is None else float(winner == player_id)
+                dataset_file.write(json.dumps({"features": features, "result": result}) + "\n")
+            num_positions += len(positions)
+    return num_positions
+
+
+def _read_training_batches(dataset_path: str,
+                           batch_size: int) -> Iterator[List[Tuple[List[float], float]]]:
+    """
+    _read_training_batches
+
+    Streams a dataset of record_training_positions, so it never has to fit in memory.
+
+    :param dataset_path: The dataset to read.
+    :param batch_size: The number of positions per batch.
+    :return: The batches of (features, result) pairs.
+    """
+    import json
+    with open(dataset_path) as dataset_file:
+        while True:
+            batch = [(position["features"], position["result"]) for position in
+                     map(json.loads, itertools.islice(dataset_file, batch_size))]
+            if not batch:
+                return
+            yield batch
+
+
+def _win_probability(weights: List[float], features: List[float], scale: float) -> float:
+    """
+    _win_probability
+
+    :param weights: The weights as a vector (see EvalWeights.to_vector).
+    :param features: The features of a position (see AIPlayer.evaluation_features).
+    :param scale: How sharply the score maps to a win probability.
+    :return: The sigmoid of the scaled score of the position.
+    """
+    score = sum(weight * feature for weight, feature in zip(weights, features))
+    return 1.0 / (1.0 + math.exp(-scale * score))
+
+
+def texel_error(dataset_path: str, eval_weights: Optional[EvalWeights] = None,
+                scale: float = 4.0, batch_size: int = 4096) -> float:
+    """
+    texel_error
+
+    :param dataset_path: A dataset of record_training_positions.
+    :param eval_weights: The weights to measure (the defaults if None).
+    :param scale: How sharply the score maps to a win probability.
+    :param batch_size: The number of positions read at a time.
+    :return: The mean squared error between the win probabilities and the results.
+    """
+    weights = (eval_weights or EvalWeights()).to_vector()
+    total_error = 0.0
+    num_positions = 0
+    for batch in _read_training_batches(dataset_path, batch_size):
+        for features, result in batch:
+            total_error += (_win_probability(weights, features, scale) - result) ** 2
+        num_positions += len(batch)
+    return total_error / num_positions if num_positions else 0.0
+
+
+def fit_eval_weights(dataset_path: str, eval_weights: Optional[EvalWeights] = None,
+                     epochs: int = 20, batch_size: int = 256, learning_rate: float = 0.5,
+                     scale: float = 4.0, output_path: Optional[str] = None) -> EvalWeights:
+    """
+    fit_eval_weights
+
+    Tunes the evaluation weights on a dataset of record_training_positions (Texel tuning):
+    mini-batch gradient descent on the squared error between the sigmoid of the scaled
+    score of each position and the result of its game. The dataset is streamed a batch
+    at a time, so it can be much bigger than memory.
+
+    :param dataset_path: The dataset to fit.
+    :param eval_weights: The weights to start from (the defaults if None).
+    :param epochs: The number of passes over the dataset.
+    :param batch_size: The number of positions per gradient step.
+    :param learning_rate: The size of the gradient steps.
+    :param scale: How sharply the score maps to a win probability.
+    :param output_path: If given, the fitted weights are saved there.
+    :return: The fitted weights.
+    """
+    weights = (eval_weights or EvalWeights()).to_vector()
+    for _ in range(epochs):
+        for batch in _read_training_batches(dataset_path, batch_size):
+            gradient = [0.0] * len(weights)
+            for features, result in batch:
+                probability = _win_probability(weights, features, scale)
+                error_gradient = 2.0 * (probability - result) * probability * \
+                    (1.0 - probability) * scale
+                for index, feature in enumerate(features):
+                    if feature:
+                        gradient[index] += error_gradient * feature
+            step = learning_rate / len(batch)
+            weights = [weight - step * weight_gradient
+                       for weight, weight_gradient in zip(weights, gradient)]
+
+    fitted_weights = EvalWeights.from_vector(weights)
+    if output_path is not None:
+        fitted_weights.save(output_path)
+    return fitted_weights